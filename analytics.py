@@ -0,0 +1,192 @@
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+# Roster analytics from rollup tables (migration 6). Progress rows are rolled up by week into
+# per-trainer and per-goal sums plus per-goal weight/BMI histograms, so the dashboard reads a few
+# hundred rows instead of aggregating progress. refresh() folds in only the rows added since the
+# last refresh (progress rowid watermark), reading them in chunks and grouping them with NumPy;
+# the write paths call it after inserting. A row is attributed to the member's trainer and goal at the time it is rolled up.
+# Deleting rolled-up rows (or SQLite reusing their rowids) marks the rollups stale, and the next
+# refresh rebuilds them from scratch.
+
+PERCENTILES = (10, 50, 90)
+BUCKET_WIDTH = {"weight": 1.0, "bmi": 0.5}  # histogram resolution, kg and BMI points
+
+REFRESH_CHUNK = 500_000  # progress rows read and aggregated at a time
+DENSE_GROUPS = 20_000_000  # key spaces up to this size are grouped by counting instead of sorting
+
+# Days since 1970-01-01 (a Thursday); (day + 3) // 7 then numbers the weeks starting on Monday
+NEW_ROWS = ("SELECT CAST(julianday(p.date) - 2440587.5 AS INTEGER), m.goal, m.trainer_id, p.weight, p.bmi "
+            "FROM progress p LEFT JOIN members m ON m.member_id = p.member_id "
+            "WHERE p.rowid > ? AND p.rowid <= ?")
+
+UPSERT_TRAINER_WEEK = ("INSERT INTO rollup_trainer_week (week, trainer_id, n, weight_sum, bmi_sum) VALUES (?, ?, ?, ?, ?) "
+                       "ON CONFLICT (week, trainer_id) DO UPDATE SET n = n + excluded.n, "
+                       "weight_sum = weight_sum + excluded.weight_sum, bmi_sum = bmi_sum + excluded.bmi_sum")
+UPSERT_GOAL_WEEK = ("INSERT INTO rollup_goal_week (week, goal, n, weight_sum, bmi_sum) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (week, goal) DO UPDATE SET n = n + excluded.n, "
+                    "weight_sum = weight_sum + excluded.weight_sum, bmi_sum = bmi_sum + excluded.bmi_sum")
+UPSERT_HISTOGRAM = ("INSERT INTO rollup_histogram (week, goal, measure, bucket, n) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (week, goal, measure, bucket) DO UPDATE SET n = n + excluded.n")
+
+ROLLUP_TABLES = ("rollup_trainer_week", "rollup_goal_week", "rollup_histogram")
+
+# Week-over-week deltas come from the previous row of the same series
+WEEKLY_TOTALS = ("SELECT week, SUM(n), SUM(weight_sum) / SUM(n), SUM(bmi_sum) / SUM(n) "
+                 "FROM rollup_goal_week {where} GROUP BY week ORDER BY week")
+TRAINER_WEEKS = ("SELECT week, n, weight_sum / n, bmi_sum / n FROM rollup_trainer_week "
+                 "WHERE trainer_id = ? AND n > 0 ORDER BY week")
+GOALS_IN_WEEK = ("SELECT c.goal, c.n, c.weight_sum / c.n, c.bmi_sum / c.n, "
+                 "c.weight_sum / c.n - p.weight_sum / p.n, c.bmi_sum / c.n - p.bmi_sum / p.n "
+                 "FROM rollup_goal_week c "
+                 "LEFT JOIN rollup_goal_week p ON p.goal = c.goal AND p.week = date(c.week, '-7 days') AND p.n > 0 "
+                 "WHERE c.week = ? AND c.n > 0 ORDER BY c.goal")
+TRAINERS_IN_WEEK = ("SELECT c.trainer_id, t.name, c.n, c.weight_sum / c.n, c.bmi_sum / c.n, "
+                    "c.weight_sum / c.n - p.weight_sum / p.n, c.bmi_sum / c.n - p.bmi_sum / p.n "
+                    "FROM rollup_trainer_week c "
+                    "LEFT JOIN rollup_trainer_week p ON p.trainer_id = c.trainer_id AND p.week = date(c.week, '-7 days') AND p.n > 0 "
+                    "LEFT JOIN trainers t ON t.trainer_id = c.trainer_id "
+                    "WHERE c.week = ? AND c.n > 0 ORDER BY {order} LIMIT ?")
+HISTOGRAM = "SELECT bucket, SUM(n) FROM rollup_histogram WHERE week = ? AND measure = ? {goal} GROUP BY bucket ORDER BY bucket"
+
+TRAINER_ORDER = {"trainer": "c.trainer_id", "members": "c.n DESC, c.trainer_id",
+                 "bmi change": "c.bmi_sum / c.n - p.bmi_sum / p.n, c.trainer_id"}
+
+
+class RefreshReport:
+    def __init__(self, rows, rebuilt, seconds):
+        self.rows = rows
+        self.rebuilt = rebuilt
+        self.seconds = seconds
+
+    def __str__(self):
+        action = "Rebuilt rollups from" if self.rebuilt else "Rolled up"
+        return f"{action} {self.rows} progress row(s) in {self.seconds:.2f}s"
+
+
+def refresh(conn, rebuild=False):
+    start = time.perf_counter()
+    with conn:
+        last_rowid, stale = conn.execute("SELECT last_rowid, stale FROM rollup_state").fetchone()
+        rebuild = rebuild or bool(stale)
+        if rebuild:
+            for table in ROLLUP_TABLES:
+                conn.execute(f"DELETE FROM {table}")
+            last_rowid = 0
+        top = max(conn.execute("SELECT MAX(rowid) FROM progress").fetchone()[0] or 0, last_rowid)
+        rows = 0
+        for low in range(last_rowid, top, REFRESH_CHUNK):
+            rows += _roll_up(conn, conn.execute(NEW_ROWS, (low, min(low + REFRESH_CHUNK, top))).fetchall())
+        conn.execute("UPDATE rollup_state SET last_rowid = ?, stale = 0", (top,))
+    return RefreshReport(rows, rebuild, time.perf_counter() - start)
+
+
+def _week_labels(week_index):
+    return np.datetime_as_string((week_index * 7 - 3).astype('datetime64[D]'), unit='D').tolist()
+
+
+def _roll_up(conn, rows):
+    # Aggregates (day, goal, trainer_id, weight, bmi) rows with NumPy and adds them to the rollups
+    if not rows:
+        return 0
+    days, goals, trainer_ids, weight, bmi = zip(*rows)
+    week = (np.array(days, dtype=np.int64) + 3) // 7
+    goal_labels, goal = np.unique(np.array([g or "" for g in goals], dtype=object), return_inverse=True)
+    trainer = np.fromiter((t or 0 for t in trainer_ids), dtype=np.int64, count=len(rows))
+    weight = np.array(weight, dtype=np.float64)
+    bmi = np.array(bmi, dtype=np.float64)
+
+    def groups(*keys):
+        # Unique key tuples, each row's group, and the number of groups. The keys are packed into
+        # one integer first: a 1-D unique is far cheaper than a row-wise one.
+        lows = [key.min() for key in keys]
+        shape = tuple(int(key.max() - low) + 1 for key, low in zip(keys, lows))
+        packed = np.ravel_multi_index(tuple(key - low for key, low in zip(keys, lows)), shape)
+        if np.prod(shape) <= DENSE_GROUPS:
+            # Counting sort: number the occupied slots of the packed key space in order
+            occupied = np.bincount(packed, minlength=int(np.prod(shape))) > 0
+            unique = np.flatnonzero(occupied)
+            group = (np.cumsum(occupied) - 1)[packed]
+        else:
+            unique, group = np.unique(packed, return_inverse=True)
+        unique = np.stack(np.unravel_index(unique, shape), axis=1) + np.array(lows)
+        return unique, group.ravel(), len(unique)
+
+    unique, group, n = groups(week, trainer)
+    conn.executemany(UPSERT_TRAINER_WEEK, zip(_week_labels(unique[:, 0]), unique[:, 1].tolist(),
+                                              np.bincount(group, minlength=n).tolist(),
+                                              np.bincount(group, weight, n).tolist(), np.bincount(group, bmi, n).tolist()))
+
+    unique, group, n = groups(week, goal)
+    conn.executemany(UPSERT_GOAL_WEEK, zip(_week_labels(unique[:, 0]), goal_labels[unique[:, 1]].tolist(),
+                                           np.bincount(group, minlength=n).tolist(),
+                                           np.bincount(group, weight, n).tolist(), np.bincount(group, bmi, n).tolist()))
+
+    for measure, values in (("weight", weight), ("bmi", bmi)):
+        bucket = np.floor(values / BUCKET_WIDTH[measure]).astype(np.int64)
+        unique, group, n = groups(week, goal, bucket)
+        conn.executemany(UPSERT_HISTOGRAM, zip(_week_labels(unique[:, 0]), goal_labels[unique[:, 1]].tolist(),
+                                               [measure] * n, unique[:, 2].tolist(),
+                                               np.bincount(group, minlength=n).tolist()))
+    return len(rows)
+
+
+def _with_deltas(rows):
+    # (week, n, weight, bmi) rows in week order -> adds weight and BMI change since the previous week
+    result, previous = [], None
+    for week, n, weight, bmi in rows:
+        if previous is not None and previous[0] == _previous_week(week):
+            result.append((week, n, weight, bmi, weight - previous[2], bmi - previous[3]))
+        else:
+            result.append((week, n, weight, bmi, None, None))
+        previous = (week, n, weight, bmi)
+    return result
+
+
+def _previous_week(week):
+    return (date.fromisoformat(week) - timedelta(days=7)).isoformat()
+
+
+def weeks(conn):
+    return [row[0] for row in conn.execute("SELECT DISTINCT week FROM rollup_goal_week ORDER BY week")]
+
+
+def weekly(conn, goal=None, trainer_id=None):
+    # Trend rows: (week, rows, mean weight, mean BMI, weight change, BMI change)
+    if trainer_id is not None:
+        return _with_deltas(conn.execute(TRAINER_WEEKS, (trainer_id,)).fetchall())
+    if goal is not None:
+        return _with_deltas(conn.execute(WEEKLY_TOTALS.format(where="WHERE goal = ?"), (goal,)).fetchall())
+    return _with_deltas(conn.execute(WEEKLY_TOTALS.format(where="")).fetchall())
+
+
+def goals_in_week(conn, week):
+    # (goal, rows, mean weight, mean BMI, weight change, BMI change, weight percentiles, BMI percentiles)
+    return [(*row, percentiles(conn, week, "weight", row[0]), percentiles(conn, week, "bmi", row[0]))
+            for row in conn.execute(GOALS_IN_WEEK, (week,))]
+
+
+def trainers_in_week(conn, week, order="members", limit=1000):
+    # (trainer_id, name, rows, mean weight, mean BMI, weight change, BMI change)
+    return conn.execute(TRAINERS_IN_WEEK.format(order=TRAINER_ORDER[order]), (week, limit)).fetchall()
+
+
+def percentiles(conn, week, measure, goal=None, qs=PERCENTILES):
+    # Read off the histogram; each value is the middle of its bucket
+    sql = HISTOGRAM.format(goal="AND goal = ?" if goal is not None else "")
+    parameters = (week, measure, goal) if goal is not None else (week, measure)
+    buckets = conn.execute(sql, parameters).fetchall()
+    total = sum(n for _, n in buckets)
+    if not total:
+        return tuple(None for _ in qs)
+    width = BUCKET_WIDTH[measure]
+    result, seen, i = [], 0, 0
+    for q in qs:
+        target = q / 100 * total
+        while i < len(buckets) - 1 and seen + buckets[i][1] < target:
+            seen += buckets[i][1]
+            i += 1
+        result.append((buckets[i][0] + 0.5) * width)
+    return tuple(result)
@@ -0,0 +1,104 @@
+import tkinter as tk
+from tkinter import ttk
+
+import analytics
+
+# Analytics window: weekly progress trends read from the rollup tables, so opening it or switching
+# weeks costs a few small queries whatever the size of the progress table. The week selector
+# drives the By goal and By trainer tabs; By week shows the whole history.
+
+WEEK_COLUMNS = ("Week", "Rows", "Mean weight", "Weight change", "Mean BMI", "BMI change")
+GOAL_COLUMNS = ("Goal", "Rows", "Mean weight", "Weight change", "Mean BMI", "BMI change",
+                "Weight p10/p50/p90", "BMI p10/p50/p90")
+TRAINER_COLUMNS = ("Trainer", "Rows", "Mean weight", "Weight change", "Mean BMI", "BMI change")
+MAX_TRAINERS = 1000  # trainer rows listed for a week
+
+
+def _number(value, signed=False):
+    if value is None:
+        return "-"
+    return f"{value:+.2f}" if signed else f"{value:.2f}"
+
+
+class AnalyticsWindow:
+    def __init__(self, root, db):
+        self.db = db
+
+        self.window = tk.Toplevel(root)
+        self.window.title("Analytics")
+        self.window.geometry("1000x600")
+        self.window.columnconfigure(0, weight=1)
+        self.window.rowconfigure(1, weight=1)
+
+        controls = ttk.Frame(self.window, padding=5)
+        controls.grid(row=0, column=0, sticky='ew')
+        ttk.Label(controls, text="Week of:").pack(side=tk.LEFT)
+        self.week = tk.StringVar()
+        self.week_box = ttk.Combobox(controls, textvariable=self.week, state='readonly', width=12)
+        self.week_box.pack(side=tk.LEFT, padx=5)
+        self.week_box.bind("<<ComboboxSelected>>", lambda event: self.show_week())
+        ttk.Label(controls, text="Trainers by:").pack(side=tk.LEFT, padx=(15, 0))
+        self.order = tk.StringVar(value="members")
+        order_box = ttk.Combobox(controls, textvariable=self.order, state='readonly', width=12,
+                                 values=list(analytics.TRAINER_ORDER))
+        order_box.pack(side=tk.LEFT, padx=5)
+        order_box.bind("<<ComboboxSelected>>", lambda event: self.show_week())
+        ttk.Button(controls, text="Refresh", command=self.refresh).pack(side=tk.RIGHT)
+
+        notebook = ttk.Notebook(self.window)
+        notebook.grid(row=1, column=0, sticky='nsew', padx=5, pady=5)
+        self.by_week = self._table(notebook, "By week", WEEK_COLUMNS)
+        self.by_goal = self._table(notebook, "By goal", GOAL_COLUMNS)
+        self.by_trainer = self._table(notebook, "By trainer", TRAINER_COLUMNS)
+
+        self.refresh()
+
+    def _table(self, notebook, title, columns):
+        frame = ttk.Frame(notebook)
+        frame.rowconfigure(0, weight=1)
+        frame.columnconfigure(0, weight=1)
+        tree = ttk.Treeview(frame, columns=columns, show='headings')
+        for i, column in enumerate(columns):
+            tree.heading(column, text=column)
+            tree.column(column, width=200 if i == 0 else 110, anchor='w' if i == 0 else 'e')
+        tree.grid(row=0, column=0, sticky='nsew')
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+        scrollbar.grid(row=0, column=1, sticky='ns')
+        tree.configure(yscrollcommand=scrollbar.set)
+        notebook.add(frame, text=title)
+        return tree
+
+    def refresh(self):
+        # Re-reads the week list and every tab, keeping the selected week when it still exists
+        with self.db.reader() as conn:
+            weeks = analytics.weeks(conn)
+            trend = analytics.weekly(conn)
+        self.week_box['values'] = weeks
+        if self.week.get() not in weeks:
+            self.week.set(weeks[-1] if weeks else "")
+
+        self.by_week.delete(*self.by_week.get_children())
+        for week, n, weight, bmi, weight_change, bmi_change in reversed(trend):
+            self.by_week.insert('', tk.END, values=(week, n, _number(weight), _number(weight_change, True),
+                                                    _number(bmi), _number(bmi_change, True)))
+        self.show_week()
+
+    def show_week(self):
+        self.by_goal.delete(*self.by_goal.get_children())
+        self.by_trainer.delete(*self.by_trainer.get_children())
+        week = self.week.get()
+        if not week:
+            return
+        with self.db.reader() as conn:
+            goals = analytics.goals_in_week(conn, week)
+            trainers = analytics.trainers_in_week(conn, week, self.order.get(), MAX_TRAINERS)
+
+        for goal, n, weight, bmi, weight_change, bmi_change, weights, bmis in goals:
+            self.by_goal.insert('', tk.END, values=(goal, n, _number(weight), _number(weight_change, True),
+                                                    _number(bmi), _number(bmi_change, True),
+                                                    "/".join(f"{v:.1f}" for v in weights),
+                                                    "/".join(f"{v:.2f}" for v in bmis)))
+        for trainer_id, name, n, weight, bmi, weight_change, bmi_change in trainers:
+            label = f"{trainer_id} {name}" if trainer_id else "(unassigned)"
+            self.by_trainer.insert('', tk.END, values=(label, n, _number(weight), _number(weight_change, True),
+                                                       _number(bmi), _number(bmi_change, True)))
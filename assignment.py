@@ -0,0 +1,136 @@
+import time
+
+import numpy as np
+
+import core
+import schedule
+
+# Capacity-aware bulk trainer assignment. Every trainer can take MEMBERS_PER_DAY members for each
+# day set in available_days; unassigned members are spread over the trainers eligible for their goal
+# so that all of them end up at the same fill ratio (load / capacity), never above capacity.
+
+MEMBERS_PER_DAY = schedule.MEMBERS_PER_DAY
+# Above this many updates it is cheaper to rebuild the indexes led by trainer_id than to maintain them row by row
+INDEX_REBUILD_THRESHOLD = 100_000
+TRAINER_INDEXES = {
+    "idx_members_trainer": "trainer_id",
+    "idx_members_trainer_name": "trainer_id, name",
+    "idx_members_trainer_goal": "trainer_id, goal",
+}
+
+
+class AssignmentReport:
+    def __init__(self, assigned, unassigned, plan_seconds, apply_seconds):
+        self.assigned = assigned
+        self.unassigned = unassigned  # no eligible trainer or every eligible trainer is full
+        self.plan_seconds = plan_seconds
+        self.apply_seconds = apply_seconds
+
+    def __str__(self):
+        return (f"Assigned {self.assigned} member(s), {self.unassigned} left unassigned "
+                f"(plan {self.plan_seconds:.3f}s, apply {self.apply_seconds:.3f}s)")
+
+
+def trainer_capacity(available_days, members_per_day=MEMBERS_PER_DAY):
+    return members_per_day * schedule.day_count(available_days)
+
+
+def fill_evenly(count, capacity, load):
+    # How many new members each trainer gets so that (load + share) / capacity is as level as possible
+    free = np.maximum(capacity - load, 0)
+    if free.sum() <= count:
+        return free
+
+    # Binary search the highest common fill ratio that does not hand out more than count members
+    low, high = 0.0, 1.0
+    for _ in range(50):
+        ratio = (low + high) / 2
+        share = np.clip(np.floor(ratio * capacity) - load, 0, free).astype(np.int64)
+        if share.sum() <= count:
+            low = ratio
+        else:
+            high = ratio
+    share = np.clip(np.floor(low * capacity) - load, 0, free).astype(np.int64)
+
+    # Hand out what rounding left over to the trainers that would stay least full
+    while share.sum() < count:
+        open_slots = np.flatnonzero(share < free)
+        fill = (load[open_slots] + share[open_slots] + 1) / capacity[open_slots]
+        take = open_slots[np.argsort(fill, kind='stable')[:count - share.sum()]]
+        share[take] += 1
+    return share
+
+
+def plan_assignments(members, trainers, load, members_per_day=MEMBERS_PER_DAY):
+    # members: (member_id, goal) rows; trainers: (trainer_id, expertise, available_days) rows;
+    # load: {trainer_id: members already assigned}. Returns (member_ids, trainer_ids) arrays.
+    trainer_ids = np.array([t[0] for t in trainers], dtype=np.int64)
+    capacity = np.array([trainer_capacity(t[2], members_per_day) for t in trainers], dtype=np.int64)
+    current = np.array([load.get(t[0], 0) for t in trainers], dtype=np.int64)
+
+    # goal -> indices of the trainers whose expertise offers it, built once
+    by_expertise = {}
+    for i, (_, expertise, _) in enumerate(trainers):
+        by_expertise.setdefault(expertise, []).append(i)
+    eligible = {}
+    for expertise, goals in core.GOAL_OPTIONS.items():
+        for goal in goals:
+            eligible.setdefault(goal, []).extend(by_expertise.get(expertise, []))
+
+    by_goal = {}
+    for member_id, goal in members:
+        by_goal.setdefault(goal, []).append(member_id)
+
+    assigned_members, assigned_trainers = [], []
+    # Goals with the fewest eligible trainers go first so shared trainers are not used up elsewhere
+    for goal in sorted(by_goal, key=lambda g: len(eligible.get(g, ()))):
+        candidates = np.array(eligible.get(goal, ()), dtype=np.int64)
+        if not len(candidates):
+            continue
+        member_ids = np.array(by_goal[goal], dtype=np.int64)
+        share = fill_evenly(len(member_ids), capacity[candidates], current[candidates])
+        current[candidates] += share
+        chosen = np.repeat(trainer_ids[candidates], share)
+        assigned_members.append(member_ids[:len(chosen)])
+        assigned_trainers.append(chosen)
+
+    if not assigned_members:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(assigned_members), np.concatenate(assigned_trainers)
+
+
+def apply_assignments(conn, member_ids, trainer_ids):
+    # One temp-table join instead of an UPDATE per member
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS assignment (member_id INTEGER PRIMARY KEY, trainer_id INTEGER)")
+    conn.execute("DELETE FROM temp.assignment")
+    order = np.argsort(member_ids)
+    conn.executemany("INSERT INTO temp.assignment (member_id, trainer_id) VALUES (?, ?)",
+                     zip(member_ids[order].tolist(), trainer_ids[order].tolist()))
+
+    rebuild_index = len(member_ids) > INDEX_REBUILD_THRESHOLD
+    if rebuild_index:
+        for index in TRAINER_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {index}")
+    conn.execute("UPDATE members SET trainer_id = (SELECT a.trainer_id FROM temp.assignment a WHERE a.member_id = members.member_id) "
+                 "WHERE member_id IN (SELECT member_id FROM temp.assignment)")
+    if rebuild_index:
+        for index, columns in TRAINER_INDEXES.items():
+            conn.execute(f"CREATE INDEX {index} ON members({columns})")
+    conn.execute("DELETE FROM temp.assignment")
+
+
+def assign_unassigned_members(conn, members_per_day=MEMBERS_PER_DAY, progress=None, on_written=None):
+    start = time.perf_counter()
+    members = conn.execute("SELECT member_id, goal FROM members WHERE trainer_id IS NULL").fetchall()
+    trainers = conn.execute("SELECT trainer_id, expertise, available_days FROM trainers").fetchall()
+    load = dict(conn.execute("SELECT trainer_id, COUNT(*) FROM members WHERE trainer_id IS NOT NULL GROUP BY trainer_id"))
+    member_ids, trainer_ids = plan_assignments(members, trainers, load, members_per_day)
+    planned = time.perf_counter()
+    if progress:
+        progress(1, 2)  # last chance to cancel before anything is written
+
+    with conn:
+        apply_assignments(conn, member_ids, trainer_ids)
+    if on_written:
+        on_written(member_ids.tolist())
+    return AssignmentReport(len(member_ids), len(members) - len(member_ids), planned - start, time.perf_counter() - planned)
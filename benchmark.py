@@ -0,0 +1,228 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+import core
+import generator
+import paging
+import schedule
+
+# Headless benchmark suite. Every (scale, storage) case seeds a fresh database with the generator
+# and times the core operations on it in a process of its own, so peak RSS is per case. Results are
+# written as JSON; compared against a saved baseline, any metric that got worse by more than the
+# threshold is reported as a regression and the run exits with status 1.
+#   python benchmark.py --scales 1k 100k --save-baseline
+#   python benchmark.py --scales 1k 100k --baseline benchmark_baseline.json
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+STORAGES = ("memory", "disk")
+MEMBERS_PER_TRAINER = 100
+UNASSIGNED_SHARE = 10  # every Nth member is unassigned before the assignment run
+LATENCY_SAMPLES = 500
+WARMUP_SAMPLES = 20  # latency calls made before timing starts
+THRESHOLD = 0.2  # relative slowdown (or memory growth) tolerated before a metric counts as a regression
+BASELINE_PATH = "benchmark_baseline.json"
+
+# Direction of each compared metric: higher is better for throughput, lower for latency and memory
+HIGHER_IS_BETTER = {"rows_per_second"}
+LOWER_IS_BETTER = {"p50_ms", "p95_ms", "p99_ms", "peak_rss_mb"}
+# Differences below these are timer noise, whatever the ratio
+MIN_TIMED_SECONDS = 0.05
+MIN_LATENCY_MS = 0.05
+
+
+def _peak_rss_mb():
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+
+
+def _throughput(rows, seconds):
+    return {"rows": rows, "seconds": round(seconds, 4), "rows_per_second": round(rows / seconds if seconds else 0.0, 1)}
+
+
+def _latency(samples):
+    ms = np.array(samples) * 1000
+    return {"samples": len(samples), "p50_ms": round(float(np.percentile(ms, 50)), 4),
+            "p95_ms": round(float(np.percentile(ms, 95)), 4), "p99_ms": round(float(np.percentile(ms, 99)), 4),
+            "per_second": round(len(samples) / (ms.sum() / 1000), 1)}
+
+
+def _time_each(calls):
+    calls = list(calls)
+    for call in calls[:WARMUP_SAMPLES]:
+        call()
+    samples = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run_case(members, storage, seed=42):
+    # Times every operation on one freshly seeded database; returns {operation: metrics}
+    with tempfile.TemporaryDirectory() as directory:
+        path = ":memory:" if storage == "memory" else os.path.join(directory, "benchmark.db")
+        db = core.open_database(path)
+        try:
+            return _run_operations(db, members, seed)
+        finally:
+            db.close()
+
+
+def _run_operations(db, members, seed):
+    rng = np.random.default_rng(seed)
+    results = {}
+    trainers = max(members // MEMBERS_PER_TRAINER, len(core.EXPERTISE_TYPES))
+
+    start = time.perf_counter()
+    generator.generate_trainers(db, trainers, seed)
+    report = generator.generate_members(db, members, seed)
+    results["generate"] = _throughput(trainers + report.rows, time.perf_counter() - start)
+
+    with db.transaction() as conn:
+        unassigned = conn.execute("UPDATE members SET trainer_id = NULL WHERE member_id % ? = 0",
+                                  (UNASSIGNED_SHARE,)).rowcount
+    start = time.perf_counter()
+    core.assign_unassigned_members(db)
+    results["assign"] = _throughput(unassigned, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    written, _ = core.simulate_progress(db, 1)
+    results["simulate"] = _throughput(written, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    written, _ = core.simulate_horizon(db, 4)
+    results["simulate_horizon"] = _throughput(written, time.perf_counter() - start)
+
+    # What display_member_progress does on a cache miss
+    member_ids = rng.integers(1, members + 1, LATENCY_SAMPLES).tolist()
+    results["member_detail"] = _latency(_time_each(lambda m=m: core.member_detail(db, m) for m in member_ids))
+
+    goals = list(core.NUTRITION_COEFFICIENTS)
+    results["member_page"] = _latency(_time_each(
+        lambda g=goals[i % len(goals)]: paging.fetch_page(db, paging.MEMBERS, "Name", filters={"goal": g})
+        for i in range(LATENCY_SAMPLES)))
+
+    days = rng.integers(1, 1 << len(core.WEEKDAYS), LATENCY_SAMPLES).tolist()
+    results["trainer_search"] = _latency(_time_each(
+        lambda e=core.EXPERTISE_TYPES[i % len(core.EXPERTISE_TYPES)], d=d: core.trainers_available(db, e, core.mask_days(d))
+        for i, d in enumerate(days)))
+
+    start = time.perf_counter()
+    with db.reader() as conn:
+        schedule.free_capacity_by_day(conn)
+    results["free_capacity"] = _throughput(trainers, time.perf_counter() - start)
+
+    results["peak_rss_mb"] = round(_peak_rss_mb(), 1)
+    return results
+
+
+def run_suite(scales, storages, seed=42):
+    # Each case gets a new worker process, so its peak RSS is its own
+    results = {}
+    for scale in scales:
+        for storage in storages:
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                results[f"{scale}/{storage}"] = pool.submit(run_case, SCALES[scale], storage, seed).result()
+            print(f"{scale}/{storage}: {summarise(results[f'{scale}/{storage}'])}", file=sys.stderr)
+    return {"meta": environment(seed), "results": results}
+
+
+def environment(seed):
+    return {"python": platform.python_version(), "sqlite": sqlite3.sqlite_version, "numpy": np.__version__,
+            "platform": platform.platform(), "cpus": os.cpu_count(), "seed": seed,
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def summarise(case):
+    parts = []
+    for operation, metrics in case.items():
+        if operation == "peak_rss_mb":
+            parts.append(f"peak {metrics} MB")
+        elif "rows_per_second" in metrics:
+            parts.append(f"{operation} {metrics['rows_per_second']:,.0f} rows/s")
+        else:
+            parts.append(f"{operation} p95 {metrics['p95_ms']:.2f} ms")
+    return ", ".join(parts)
+
+
+def _metrics(case):
+    # (operation, metric) -> value for every comparable number in a case that is above the noise floor
+    for operation, metrics in case.items():
+        if operation == "peak_rss_mb":
+            yield (operation, operation), metrics
+            continue
+        for metric, value in metrics.items():
+            if metric in HIGHER_IS_BETTER and metrics["seconds"] >= MIN_TIMED_SECONDS:
+                yield (operation, metric), value
+            elif metric in LOWER_IS_BETTER and value >= MIN_LATENCY_MS:
+                yield (operation, metric), value
+
+
+def compare(baseline, current, threshold=THRESHOLD):
+    # Returns one message per metric that regressed by more than threshold; metrics missing from
+    # either side, or under the noise floor in the baseline, are skipped
+    regressions = []
+    for name, case in current["results"].items():
+        base = dict(_metrics(baseline["results"].get(name, {})))
+        for (operation, metric), value in _metrics(case):
+            before = base.get((operation, metric))
+            if not before or value is None:
+                continue
+            if metric in HIGHER_IS_BETTER:
+                change = (before - value) / before
+            else:
+                change = (value - before) / before
+            if change > threshold:
+                regressions.append(f"{name} {operation} {metric}: {before} -> {value} ({change:+.0%} worse)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the gym tool's core operations")
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=list(SCALES))
+    parser.add_argument("--storage", nargs="+", choices=STORAGES, default=list(STORAGES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write this run's results as JSON")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args(argv)
+
+    current = run_suite(args.scales, args.storage, args.seed)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline first.")
+        return 0
+
+    with open(args.baseline) as f:
+        regressions = compare(json.load(f), current, args.threshold)
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    if regressions:
+        return 1
+    print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
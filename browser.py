@@ -0,0 +1,158 @@
+import tkinter as tk
+from tkinter import ttk
+
+import core
+import paging
+
+# Paged ttk.Treeview over a paging.Listing. Rows are fetched one keyset page at a time as the
+# user scrolls; at most MAX_PAGES pages are kept in the tree, so memory stays bounded however
+# large the table is. Sorting and filtering happen in SQL.
+
+MAX_PAGES = 5
+EDGE = 0.1  # fetch the neighbouring page once the view is this close to the top or bottom
+
+
+class TableBrowser:
+    def __init__(self, root, db, listing, title, filter_choices):
+        # filter_choices: filter name -> list of values for a combobox, or None for a free entry
+        self.db = db
+        self.listing = listing
+        self.sort = "ID"
+        self.descending = False
+        self.pages = []  # [(first key, last key, item ids)] currently shown, top to bottom
+        self.at_start = self.at_end = True
+        self.loading = False
+
+        self.window = tk.Toplevel(root)
+        self.window.title(title)
+        self.window.geometry("900x500")
+        self.window.rowconfigure(1, weight=1)
+        self.window.columnconfigure(0, weight=1)
+
+        filter_frame = ttk.Frame(self.window, padding=5)
+        filter_frame.grid(row=0, column=0, columnspan=2, sticky='ew')
+        self.filter_widgets = {}
+        for column, (name, choices) in enumerate(filter_choices.items()):
+            ttk.Label(filter_frame, text=f"{name.capitalize()}:").grid(row=0, column=2 * column, padx=5)
+            if choices is None:
+                widget = ttk.Entry(filter_frame, width=10)
+                widget.bind("<Return>", lambda event: self.reload())
+            else:
+                widget = ttk.Combobox(filter_frame, values=[""] + list(choices), state='readonly')
+                widget.bind("<<ComboboxSelected>>", lambda event: self.reload())
+            widget.grid(row=0, column=2 * column + 1, padx=5)
+            self.filter_widgets[name] = widget
+        ttk.Button(filter_frame, text="Apply", command=self.reload).grid(row=0, column=2 * len(filter_choices), padx=5)
+
+        self.tree = ttk.Treeview(self.window, columns=listing.headings, show='headings')
+        for heading in listing.headings:
+            if heading in listing.sort_keys:
+                self.tree.heading(heading, text=heading, command=lambda h=heading: self.sort_by(h))
+            else:
+                self.tree.heading(heading, text=heading)
+            self.tree.column(heading, width=100)
+        self.tree.grid(row=1, column=0, sticky='nsew')
+
+        self.scrollbar = ttk.Scrollbar(self.window, orient=tk.VERTICAL, command=self.tree.yview)
+        self.scrollbar.grid(row=1, column=1, sticky='ns')
+        self.tree.configure(yscrollcommand=self.on_scroll)
+
+        self.reload()
+
+    def filters(self):
+        values = {name: widget.get() for name, widget in self.filter_widgets.items()}
+        if values.get("trainer"):
+            try:
+                values["trainer"] = int(values["trainer"])
+            except ValueError:
+                values["trainer"] = -1  # matches nothing
+        if values.get("day"):
+            values["day"] = core.DAY_BITS[values["day"]]
+        return values
+
+    def sort_by(self, heading):
+        self.descending = not self.descending if heading == self.sort else False
+        self.sort = heading
+        self.reload()
+
+    def fetch(self, after=None, before=None):
+        return paging.fetch_page(self.db, self.listing, self.sort, self.descending, self.filters(),
+                                 after=after, before=before)
+
+    def add_page(self, rows, at_end):
+        first, last = paging.page_bounds(self.listing, rows)
+        index = tk.END if at_end else 0
+        items = [self.tree.insert('', index, values=[("" if v is None else v) for v in row[:-1]])
+                 for row in (rows if at_end else reversed(rows))]
+        if not at_end:
+            items.reverse()
+        page = (first, last, items)
+        if at_end:
+            self.pages.append(page)
+        else:
+            self.pages.insert(0, page)
+
+    def drop_page(self, from_end):
+        _, _, items = self.pages.pop(-1 if from_end else 0)
+        self.tree.delete(*items)
+        if from_end:
+            self.at_end = False
+        else:
+            self.at_start = False
+
+    def reload(self):
+        self.tree.delete(*self.tree.get_children())
+        self.pages = []
+        rows = self.fetch()
+        self.at_start = True
+        self.at_end = len(rows) < paging.PAGE_SIZE
+        if rows:
+            self.add_page(rows, at_end=True)
+        self.tree.yview_moveto(0)
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self.loading or not self.pages:
+            return
+        first, last = float(first), float(last)
+        self.loading = True
+        try:
+            if last > 1 - EDGE and not self.at_end:
+                self.load_next()
+            elif first < EDGE and not self.at_start:
+                self.load_previous()
+        finally:
+            self.loading = False
+
+    def load_next(self):
+        rows = self.fetch(after=self.pages[-1][1])
+        self.at_end = len(rows) < paging.PAGE_SIZE
+        if not rows:
+            return
+        anchor = self.tree.get_children()[-1]
+        self.add_page(rows, at_end=True)
+        if len(self.pages) > MAX_PAGES:
+            self.drop_page(from_end=False)
+        self.tree.see(anchor)
+
+    def load_previous(self):
+        rows = self.fetch(before=self.pages[0][0])
+        self.at_start = len(rows) < paging.PAGE_SIZE
+        if not rows:
+            return
+        anchor = self.tree.get_children()[0]
+        self.add_page(rows, at_end=False)
+        if len(self.pages) > MAX_PAGES:
+            self.drop_page(from_end=True)
+        self.tree.see(anchor)
+
+
+def browse_members(root, db):
+    return TableBrowser(root, db, paging.MEMBERS, "Members",
+                        {"goal": sorted({goal for goals in core.GOAL_OPTIONS.values() for goal in goals}),
+                         "trainer": None,
+                         "expertise": core.EXPERTISE_TYPES})
+
+
+def browse_trainers(root, db):
+    return TableBrowser(root, db, paging.TRAINERS, "Trainers", {"expertise": core.EXPERTISE_TYPES, "day": core.WEEKDAYS})
@@ -0,0 +1,262 @@
+import argparse
+import sys
+
+import core
+import database
+import instrumentation
+
+# Command-line entry point for running the gym tool without a display:
+#   python cli.py simulate --weeks 4
+#   python cli.py simulate --weeks 52 --horizon
+#   python cli.py scenarios --weeks 12 --replicas 1000 --seed 7
+#   python cli.py assign
+#   python cli.py generate --members 1000000 --trainers 5000 --seed 42
+#   python cli.py export progress --output progress.csv
+#   python cli.py import members.jsonl --strict
+#   python cli.py latest --rebuild
+#   python cli.py trainers Yoga --days Monday Thursday
+#   python cli.py capacity --expertise HIIT
+#   python cli.py nutrition
+#   python cli.py analytics --by goal --week 2024-03-04
+#   python cli.py --sandbox simulate --weeks 52   (in memory; add --commit to keep the result)
+
+MAX_ERRORS_SHOWN = 10  # invalid import rows listed before "... and N more"
+
+
+def _count(minimum):
+    # argparse type for whole numbers no smaller than minimum
+    def parse(text):
+        try:
+            value = int(text)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"expected a whole number, not {text!r}")
+        if value < minimum:
+            raise argparse.ArgumentTypeError(f"must be at least {minimum}, not {value}")
+        return value
+    return parse
+
+
+def cmd_simulate(db, args):
+    simulate = core.simulate_horizon if args.horizon else core.simulate_progress
+    written, skipped = simulate(db, args.weeks)
+    print(f"Simulated {args.weeks} week(s): {written} progress rows written.")
+    if skipped:
+        print(f"{len(skipped)} member(s) skipped without an assigned trainer.")
+
+
+def cmd_scenarios(db, args):
+    result = core.run_scenarios(db, args.weeks, args.replicas, args.seed, args.processes)
+    print(f"{result.replicas} replicas of {result.weeks} week(s) in {result.seconds:.2f}s "
+          f"({result.replicas_per_second:,.1f} replicas/s)")
+    groups = result.trainers if args.by_trainer else result.goals
+    print(f"{'trainer' if args.by_trainer else 'goal':<24}{'members':>8}  {'weight p5/p50/p95 (kg)':<26}bmi p5/p50/p95")
+    for label, stats in groups.items():
+        weight = "/".join(f"{v:.1f}" for v in stats["weight"])
+        bmi = "/".join(f"{v:.1f}" for v in stats["bmi"])
+        print(f"{label:<24}{stats['members']:>8}  {weight:<26}{bmi}")
+
+
+def cmd_assign(db, args):
+    print(core.assign_unassigned_members(db))
+
+
+def cmd_generate(db, args):
+    import generator
+
+    # Trainers first so the generated members can be assigned to them
+    if args.trainers:
+        print(generator.generate_trainers(db, args.trainers, args.seed, args.chunk_size))
+    if args.members:
+        print(generator.generate_members(db, args.members, args.seed, chunk_size=args.chunk_size))
+
+
+def cmd_export(db, args):
+    import transfer
+
+    if args.output:
+        report = core.export_file(db, args.table, args.output, args.format)
+    else:
+        with db.reader() as conn:
+            report = transfer.export_file(conn, args.table, sys.stdout, args.format or "csv")
+    print(report, file=sys.stderr)
+
+
+def cmd_import(db, args):
+    import transfer
+
+    table = args.table or transfer.table_for_path(args.path)
+    report = core.import_file(db, table, args.path, args.format, args.strict)
+    print(report)
+    for error in report.errors[:MAX_ERRORS_SHOWN]:
+        print(f"  {error}", file=sys.stderr)
+    if report.rejected > MAX_ERRORS_SHOWN:
+        print(f"  ... and {report.rejected - MAX_ERRORS_SHOWN} more", file=sys.stderr)
+
+
+def cmd_trainers(db, args):
+    trainers = core.trainers_available(db, args.expertise, args.days, match_all=not args.any)
+    for trainer in trainers:
+        print(f"{trainer.trainer_id}\t{trainer.name}\t{trainer.available_weeks}")
+    print(f"{len(trainers)} {args.expertise} trainer(s)", file=sys.stderr)
+
+
+def cmd_capacity(db, args):
+    for day, slots in core.free_capacity_by_day(db, args.expertise).items():
+        print(f"{day:<10} {slots:>8}")
+
+
+def cmd_nutrition(db, args):
+    print(core.recompute_nutrition(db))
+
+
+def cmd_latest(db, args):
+    import latest
+
+    with db.transaction() as conn:
+        if args.rebuild:
+            print(f"Rebuilt member_latest for {latest.rebuild(conn)} member(s).")
+        stale = latest.verify(conn)
+    if stale:
+        print(f"member_latest is out of date for {len(stale)} member(s), e.g. {stale[:10]}")
+        return 1
+    print("member_latest matches progress.")
+
+
+def _change(value):
+    return f"{value:+.2f}" if value is not None else "-"
+
+
+def cmd_analytics(db, args):
+    import analytics
+
+    if args.rebuild:
+        print(core.refresh_analytics(db, rebuild=True), file=sys.stderr)
+    with db.reader() as conn:
+        weeks = analytics.weeks(conn)
+        if not weeks:
+            print("No progress rolled up yet.")
+            return
+        week = args.week or weeks[-1]
+        if args.by == "week":
+            print(f"{'week':<12}{'rows':>10}{'weight':>9}{'change':>8}{'bmi':>8}{'change':>8}")
+            for row_week, n, weight, bmi, weight_change, bmi_change in analytics.weekly(conn, args.goal, args.trainer):
+                print(f"{row_week:<12}{n:>10}{weight:>9.2f}{_change(weight_change):>8}{bmi:>8.2f}{_change(bmi_change):>8}")
+        elif args.by == "goal":
+            print(f"Week of {week}")
+            print(f"{'goal':<24}{'rows':>8}{'weight':>9}{'change':>8}{'bmi':>8}{'change':>8}  weight p10/p50/p90  bmi p10/p50/p90")
+            for goal, n, weight, bmi, weight_change, bmi_change, weights, bmis in analytics.goals_in_week(conn, week):
+                print(f"{goal:<24}{n:>8}{weight:>9.2f}{_change(weight_change):>8}{bmi:>8.2f}{_change(bmi_change):>8}  "
+                      f"{'/'.join(f'{v:.1f}' for v in weights):<19}{'/'.join(f'{v:.2f}' for v in bmis)}")
+        else:
+            print(f"Week of {week}")
+            print(f"{'trainer':<32}{'rows':>8}{'weight':>9}{'change':>8}{'bmi':>8}{'change':>8}")
+            for trainer_id, name, n, weight, bmi, weight_change, bmi_change in analytics.trainers_in_week(
+                    conn, week, args.order, args.limit):
+                label = f"{trainer_id} {name}" if trainer_id else "(unassigned)"
+                print(f"{label:<32}{n:>8}{weight:>9.2f}{_change(weight_change):>8}{bmi:>8.2f}{_change(bmi_change):>8}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Gym management tool (headless)")
+    parser.add_argument("--db", default=database.DB_PATH, help="path to the sqlite database")
+    parser.add_argument("--log-json", metavar="PATH", help="append slow-query events and a final diagnostics summary as JSON lines")
+    parser.add_argument("--sandbox", action="store_true", help="run the command on an in-memory copy and discard it afterwards")
+    parser.add_argument("--commit", action="store_true", help="with --sandbox: copy the result back to the database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    simulate = commands.add_parser("simulate", help="simulate progress for every assigned member")
+    simulate.add_argument("--weeks", type=_count(1), required=True)
+    simulate.add_argument("--horizon", action="store_true", help="write one compounding row per member per week")
+    simulate.set_defaults(func=cmd_simulate)
+
+    scenarios = commands.add_parser("scenarios", help="Monte Carlo outcome percentiles per goal or trainer")
+    scenarios.add_argument("--weeks", type=_count(1), required=True)
+    scenarios.add_argument("--replicas", type=_count(1), default=1000)
+    scenarios.add_argument("--seed", type=int)
+    scenarios.add_argument("--processes", type=_count(1), help="worker processes (default: CPU count)")
+    scenarios.add_argument("--by-trainer", action="store_true", help="report per trainer instead of per goal")
+    scenarios.set_defaults(func=cmd_scenarios)
+
+    assign = commands.add_parser("assign", help="assign a trainer to every unassigned member")
+    assign.set_defaults(func=cmd_assign)
+
+    generate = commands.add_parser("generate", help="add generated trainers and members")
+    generate.add_argument("--members", type=_count(0), default=0)
+    generate.add_argument("--trainers", type=_count(0), default=0)
+    generate.add_argument("--seed", type=int, help="seed for a reproducible population")
+    generate.add_argument("--chunk-size", type=_count(1), default=50_000, help="rows per executemany batch")
+    generate.set_defaults(func=cmd_generate)
+
+    trainers = commands.add_parser("trainers", help="trainers of an expertise who work the given days")
+    trainers.add_argument("expertise", choices=core.EXPERTISE_TYPES)
+    trainers.add_argument("--days", nargs="+", choices=core.WEEKDAYS, required=True)
+    trainers.add_argument("--any", action="store_true", help="match trainers working any of the days, not all")
+    trainers.set_defaults(func=cmd_trainers)
+
+    capacity = commands.add_parser("capacity", help="free member slots per weekday")
+    capacity.add_argument("--expertise", choices=core.EXPERTISE_TYPES)
+    capacity.set_defaults(func=cmd_capacity)
+
+    nutrition = commands.add_parser("nutrition", help="recompute every member's daily needs from their latest weight")
+    nutrition.set_defaults(func=cmd_nutrition)
+
+    latest = commands.add_parser("latest", help="verify (or --rebuild) the member_latest summary table")
+    latest.add_argument("--rebuild", action="store_true")
+    latest.set_defaults(func=cmd_latest)
+
+    report = commands.add_parser("analytics", help="weekly progress trends from the rollup tables")
+    report.add_argument("--by", choices=["week", "goal", "trainer"], default="week")
+    report.add_argument("--week", help="Monday of the week to break down (default: the latest)")
+    report.add_argument("--goal", help="with --by week: only this goal")
+    report.add_argument("--trainer", type=int, help="with --by week: only this trainer's members")
+    report.add_argument("--order", choices=["members", "trainer", "bmi change"], default="members", help="with --by trainer")
+    report.add_argument("--limit", type=int, default=50, help="with --by trainer: rows shown")
+    report.add_argument("--rebuild", action="store_true", help="rebuild the rollups from every progress row first")
+    report.set_defaults(func=cmd_analytics)
+
+    export = commands.add_parser("export", help="write a table as CSV or JSON lines")
+    export.add_argument("table", nargs="?", default="progress", choices=sorted(core.EXPORT_TABLES))
+    export.add_argument("--output", help="file to write (default: stdout); .jsonl selects JSON lines")
+    export.add_argument("--format", choices=["csv", "jsonl"])
+    export.set_defaults(func=cmd_export)
+
+    load = commands.add_parser("import", help="add the rows of a CSV or JSON-lines file to a table")
+    load.add_argument("path")
+    load.add_argument("--table", choices=sorted(core.EXPORT_TABLES), help="default: from the file name")
+    load.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+    load.add_argument("--strict", action="store_true", help="abort without importing anything on the first invalid row")
+    load.set_defaults(func=cmd_import)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.log_json:
+        instrumentation.enable_json_log(args.log_json)
+    if args.sandbox:
+        import sandbox
+
+        box = sandbox.Sandbox(args.db)
+        db = box.db
+        print(f"Sandbox loaded in {box.load_seconds:.2f}s; {args.db} is left unchanged unless --commit is given.")
+    else:
+        db = core.open_database(args.db)
+    try:
+        status = args.func(db, args) or 0
+        if args.sandbox and args.commit and not status:
+            print(f"Committed the sandbox to {args.db} in {box.commit():.2f}s.")
+        return status
+    except core.GymError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.log_json:
+            instrumentation.log_event("diagnostics", command=args.command, **db.diagnostics())
+        if args.sandbox:
+            box.close()
+        else:
+            db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
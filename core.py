@@ -0,0 +1,346 @@
+import threading
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import database
+import migrations
+
+# GUI-free core of the gym tool: records and service functions shared by the GUI and the CLI.
+# Only the standard library is imported here; NumPy is loaded lazily by the services that need it.
+
+GOAL_OPTIONS = {
+    "Fitness": ["Weight Loss", "Muscle Gain", "General Health"],
+    "Yoga": ["Flexibility Improvement", "Stress Relief", "Mindfulness"],
+    "HIIT": ["Fat Loss", "Endurance", "Strength"],
+    "Weightlifting": ["Muscle Gain", "Strength Building", "Powerlifting"],
+    "Pilates": ["Core Strength", "Flexibility", "Rehabilitation"]
+}
+EXPERTISE_TYPES = list(GOAL_OPTIONS.keys())
+# Daily grams per kg of body weight for each goal: (protein, carb, fiber)
+NUTRIENTS = ("protein", "carb", "fiber")
+NUTRITION_COEFFICIENTS = {
+    "Weight Loss": (1.2, 2.5, 0.025),
+    "Muscle Gain": (1.5, 3.0, 0.03),
+    "General Health": (1.0, 2.0, 0.02),
+    "Flexibility Improvement": (1.0, 2.5, 0.025),
+    "Stress Relief": (1.0, 2.5, 0.025),
+    "Mindfulness": (1.0, 2.0, 0.02),
+    "Fat Loss": (1.4, 2.0, 0.03),
+    "Endurance": (1.3, 4.0, 0.025),
+    "Strength": (1.6, 3.0, 0.025),
+    "Strength Building": (1.6, 3.0, 0.025),
+    "Powerlifting": (1.8, 3.5, 0.025),
+    "Core Strength": (1.3, 2.5, 0.025),
+    "Flexibility": (1.0, 2.5, 0.025),
+    "Rehabilitation": (1.4, 2.0, 0.03),
+}
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+# trainers.available_days is a 7-bit mask: bit 0 is Monday, bit 6 Sunday
+DAY_BITS = {day: 1 << i for i, day in enumerate(WEEKDAYS)}
+
+TRAINER_COLUMNS = "trainer_id, name, expertise, available_days"
+MEMBER_COLUMNS = "member_id, name, birthday, height, weight, activity_level, goal, protein_needed, carb_needed, fiber_needed, trainer_id"
+PROGRESS_COLUMNS = "member_id, date, weight, bmi"
+
+INSERT_TRAINER = "INSERT INTO trainers (name, expertise, available_days) VALUES (?, ?, ?)"
+INSERT_MEMBER = "INSERT INTO members (name, birthday, height, weight, activity_level, goal, protein_needed, carb_needed, fiber_needed, trainer_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+TRAINER_BY_EXPERTISE = "SELECT trainer_id FROM trainers WHERE expertise = ?"
+
+
+class GymError(Exception):
+    # Raised for conditions the user should be told about (missing trainer, nothing to assign, ...)
+    pass
+
+
+class Cancelled(Exception):
+    pass
+
+
+class TaskControl:
+    # Passed to long-running services: receives progress reports and lets another thread cancel.
+    # report() raises Cancelled at the next checkpoint once cancel() was called. Services report
+    # before each write and never after their last commit, so a cancel never follows finished work.
+    def __init__(self, on_progress=None):
+        self.on_progress = on_progress
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def report(self, done, total):
+        if self._cancelled.is_set():
+            raise Cancelled()
+        if self.on_progress:
+            self.on_progress(done, total)
+
+
+def _progress(control):
+    return control.report if control else None
+
+
+def check_count(name, value, minimum=1):
+    # Weeks, replicas, chunk sizes and the like: whole numbers no smaller than minimum
+    if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+        raise GymError(f"{name} must be a whole number of at least {minimum}.")
+
+
+def days_mask(days):
+    try:
+        return sum(DAY_BITS[day] for day in set(days))
+    except KeyError as e:
+        raise GymError(f"Unknown weekday: {e.args[0]}")
+
+
+def mask_days(mask):
+    return [day for day, bit in DAY_BITS.items() if mask & bit]
+
+
+@dataclass
+class Trainer:
+    trainer_id: int
+    name: str
+    expertise: str
+    available_days: int
+
+    @property
+    def available_weeks(self):
+        return ', '.join(mask_days(self.available_days))
+
+
+@dataclass
+class Member:
+    member_id: int
+    name: str
+    birthday: str
+    height: int
+    weight: float
+    activity_level: int
+    goal: str
+    protein_needed: float
+    carb_needed: float
+    fiber_needed: float
+    trainer_id: Optional[int]
+
+
+@dataclass
+class Progress:
+    member_id: int
+    date: str
+    weight: float
+    bmi: float
+
+
+@dataclass
+class MemberProgress:
+    member: Member
+    trainer: Optional[Trainer]
+    progress: List[Progress] = field(default_factory=list)
+    latest: Optional[Progress] = None  # current state from member_latest
+
+
+def open_database(path=database.DB_PATH):
+    db = database.Database(path)
+    with db.transaction() as conn:
+        migrations.migrate(conn)
+    return db
+
+
+def nutrition_needs(goal, weight):
+    # (protein, carb, fiber) in grams per day
+    protein, carb, fiber = NUTRITION_COEFFICIENTS.get(goal, NUTRITION_COEFFICIENTS["General Health"])
+    return protein * weight, carb * weight, fiber * weight
+
+
+def add_trainer(db, name, expertise, available_weeks):
+    if not name or not expertise or not available_weeks:
+        raise GymError("Please fill all fields.")
+    with db.transaction() as conn:
+        return conn.execute(INSERT_TRAINER, (name, expertise, days_mask(available_weeks))).lastrowid
+
+
+def add_member(db, name, birthday, height, weight, activity_level, goal, expertise):
+    if not name or not birthday or not height or not weight or not activity_level or not goal or not expertise:
+        raise GymError("Please fill all fields.")
+
+    try:
+        height = int(height)
+        weight = float(weight)
+        activity_level = int(activity_level)
+    except ValueError:
+        raise GymError("Height must be an integer and weight/activity level must be numeric.")
+
+    # Calculate dietary needs
+    protein_needed, carb_needed, fiber_needed = nutrition_needs(goal, weight)
+
+    # Retrieve the trainer_id based on the selected expertise
+    trainer = db.query_one(TRAINER_BY_EXPERTISE, (expertise,))
+    if not trainer:
+        raise GymError("No trainer available with the selected expertise.")
+
+    with db.transaction() as conn:
+        return conn.execute(INSERT_MEMBER, (name, birthday, height, weight, activity_level, goal,
+                                            protein_needed, carb_needed, fiber_needed, int(trainer[0]))).lastrowid
+
+
+def trainers_available(db, expertise, days, match_all=True):
+    # Trainers of this expertise working every one (match_all) or any of the given days
+    import schedule
+
+    with db.reader() as conn:
+        return [Trainer(*row) for row in schedule.trainers_available(conn, expertise, days_mask(days), match_all)]
+
+
+def free_capacity_by_day(db, expertise=None):
+    # {weekday: member slots still free across the trainers working that day}
+    import schedule
+
+    with db.reader() as conn:
+        return schedule.free_capacity_by_day(conn, expertise)
+
+
+MEMBER_DETAIL_QUERY = ("SELECT m.member_id, m.name, m.birthday, m.height, m.weight, m.activity_level, m.goal, "
+                       "m.protein_needed, m.carb_needed, m.fiber_needed, m.trainer_id, "
+                       "t.trainer_id, t.name, t.expertise, t.available_days, "
+                       "l.date, l.weight, l.bmi "
+                       "FROM members m "
+                       "LEFT JOIN trainers t ON m.trainer_id = t.trainer_id "
+                       "LEFT JOIN member_latest l ON m.member_id = l.member_id "
+                       "WHERE m.member_id = ?")
+
+
+def member_detail(db, member_id, history=True):
+    # A member with their trainer and progress history in date order (left empty without history), or None
+    with db.reader() as conn:
+        row = conn.execute(MEMBER_DETAIL_QUERY, (member_id,)).fetchone()
+        if row is None:
+            return None
+        progress = [Progress(*p) for p in conn.execute(f"SELECT {PROGRESS_COLUMNS} FROM progress WHERE member_id = ? ORDER BY date ASC",
+                                                        (member_id,))] if history else []
+    member = Member(*row[:11])
+    trainer = Trainer(*row[11:15]) if row[11] is not None else None
+    latest = Progress(member_id, *row[15:]) if row[15] is not None else None
+    return MemberProgress(member, trainer, progress, latest)
+
+
+def search_members(db, text, limit=None):
+    # Type-ahead lookup: up to `limit` (member_id, name) pairs whose name has words starting with
+    # the typed ones, sorted by name
+    import search
+
+    with db.reader() as conn:
+        return search.search(conn, text, limit or search.LIMIT)
+
+
+def simulate_progress(db, weeks_passed, control=None):
+    # Returns (progress rows written, names of members skipped for lack of a trainer)
+    import analytics
+    import simulation
+
+    check_count("Weeks", weeks_passed)
+    with db.transaction() as conn:
+        result = simulation.simulate_progress(conn, weeks_passed, progress=_progress(control), on_written=db.members_changed)
+        analytics.refresh(conn)
+        return result
+
+
+def simulate_horizon(db, weeks, control=None):
+    # Week-by-week compounding run over `weeks` weeks; same return value as simulate_progress.
+    # Weeks already written stay in place if the run is cancelled.
+    import analytics
+    import simulation
+
+    check_count("Weeks", weeks)
+    with db.transaction() as conn:
+        try:
+            result = simulation.simulate_horizon(conn, weeks, progress=_progress(control), on_written=db.members_changed)
+        except Cancelled:
+            conn.rollback()
+            analytics.refresh(conn)
+            raise
+        analytics.refresh(conn)
+        return result
+
+
+def run_scenarios(db, weeks, replicas=1000, seed=None, processes=None):
+    # Monte Carlo outcome percentiles per goal and trainer; returns a montecarlo.ScenarioResult
+    import montecarlo
+
+    check_count("Weeks", weeks)
+    check_count("Replicas", replicas)
+    if processes is not None:
+        check_count("Processes", processes)
+    with db.reader() as conn:
+        return montecarlo.run_scenarios(conn, weeks, replicas, seed, processes)
+
+
+def auto_add_trainers(db, count=6, seed=None, control=None):
+    # Returns a generator.GenerationReport with the achieved rows/s
+    import generator
+
+    return generator.generate_trainers(db, count, seed, progress=_progress(control))
+
+
+def auto_add_members(db, count=10, seed=None, control=None):
+    import generator
+
+    return generator.generate_members(db, count, seed, progress=_progress(control))
+
+
+def assign_unassigned_members(db, control=None):
+    # Returns an assignment.AssignmentReport
+    import assignment
+
+    with db.transaction() as conn:
+        if conn.execute("SELECT 1 FROM members WHERE trainer_id IS NULL LIMIT 1").fetchone() is None:
+            raise GymError("No unassigned members to assign.")
+        if conn.execute("SELECT 1 FROM trainers LIMIT 1").fetchone() is None:
+            raise GymError("No trainers available for assignment.")
+        return assignment.assign_unassigned_members(conn, progress=_progress(control), on_written=db.members_changed)
+
+
+def recompute_nutrition(db):
+    # Refreshes every member's daily needs from their latest weight; returns a nutrition.RecomputeReport
+    import nutrition
+
+    with db.transaction() as conn:
+        return nutrition.recompute(conn, on_written=db.members_changed)
+
+
+EXPORT_TABLES = {
+    "trainers": TRAINER_COLUMNS,
+    "members": MEMBER_COLUMNS,
+    "progress": PROGRESS_COLUMNS,
+}
+
+
+def import_file(db, table, path, fmt=None, strict=False, control=None):
+    # Streams a CSV / JSON-lines file into a table; returns a transfer.TransferReport
+    import analytics
+    import transfer
+
+    with db.transaction() as conn:
+        report = transfer.import_file(conn, table, path, fmt, strict, progress=_progress(control),
+                                      on_written=db.members_changed)
+        if table == "progress":
+            analytics.refresh(conn)
+        return report
+
+
+def refresh_analytics(db, rebuild=False):
+    # Folds new progress rows into the rollups (normally done by the write paths); returns an analytics.RefreshReport
+    import analytics
+
+    with db.transaction() as conn:
+        return analytics.refresh(conn, rebuild)
+
+
+def export_file(db, table, path, fmt=None, control=None):
+    import transfer
+
+    fmt = transfer.file_format(path, fmt)
+    with open(path, 'w', newline='', encoding='utf-8') as out, db.reader() as conn:
+        return transfer.export_file(conn, table, out, fmt, progress=_progress(control))
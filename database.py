@@ -0,0 +1,268 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import instrumentation
+
+DB_PATH = 'gym_simulation.db'
+
+# Applied to every connection the layer opens
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -65536",  # 64 MiB page cache
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA busy_timeout = 5000",
+)
+STATEMENT_CACHE_SIZE = 256  # prepared statements kept per connection
+READ_POOL_SIZE = 4
+# An in-memory database that several connections of this process can open by name
+SHARED_MEMORY_URI = "file:{name}?mode=memory&cache=shared"
+
+
+class Stats:
+    # Shared by every connection of one Database. A statement's time is its execute() plus the
+    # fetchone/fetchmany/fetchall calls on its cursor; rows are rows written plus rows fetched.
+    def __init__(self):
+        self.connections_opened = 0
+        self.statements = instrumentation.Timings()  # keyed by SQL text
+        self.slow_queries = deque(maxlen=instrumentation.MAX_SLOW_QUERIES)
+        self._plans = {}  # SQL text -> EXPLAIN QUERY PLAN steps, captured once per slow statement
+
+    @property
+    def statements_executed(self):
+        return self.statements.totals()[0]
+
+    @property
+    def rows(self):
+        return self.statements.totals()[1]
+
+    def executed(self, conn, sql, parameters, seconds, rows):
+        # parameters is None for executemany/executescript, which are never reported as slow
+        self.statements.record(sql, seconds, rows)
+        if parameters is not None and seconds >= instrumentation.SLOW_QUERY_SECONDS:
+            self._record_slow(conn, sql, parameters, seconds, "execute")
+
+    def fetched(self, conn, sql, parameters, seconds, rows):
+        self.statements.add(sql, seconds, rows)
+        if parameters is not None and seconds >= instrumentation.SLOW_QUERY_SECONDS:
+            self._record_slow(conn, sql, parameters, seconds, "fetch")
+
+    def _record_slow(self, conn, sql, parameters, seconds, phase):
+        plan = self._plans.get(sql)
+        if plan is None:
+            try:
+                # Straight to sqlite3 so the EXPLAIN is not itself recorded
+                plan = [row[3] for row in sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, parameters)]
+            except sqlite3.Error:
+                plan = []
+            self._plans[sql] = plan
+        entry = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "sql": sql, "phase": phase,
+                 "ms": round(seconds * 1000, 3), "plan": plan}
+        self.slow_queries.append(entry)
+        instrumentation.log_event("slow_query", logging.WARNING, **entry)
+
+    def reset(self):
+        self.statements.reset()
+        self.slow_queries.clear()
+
+    def as_dict(self):
+        return {"connections_opened": self.connections_opened, "statements_executed": self.statements_executed,
+                "rows": self.rows}
+
+
+class CountingCursor(sqlite3.Cursor):
+    # Rows read by iterating the cursor directly are not timed or counted; that would cost a call per row
+    _sql = _parameters = None
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._sql, self._parameters = sql, parameters
+            self.connection.stats.executed(self.connection, sql, parameters, time.perf_counter() - start, max(self.rowcount, 0))
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._sql, self._parameters = sql, None
+            self.connection.stats.executed(self.connection, sql, None, time.perf_counter() - start, max(self.rowcount, 0))
+
+    def executescript(self, sql_script):
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self._sql, self._parameters = sql_script, None
+            self.connection.stats.executed(self.connection, sql_script, None, time.perf_counter() - start, 0)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self.connection.stats.fetched(self.connection, self._sql, self._parameters, time.perf_counter() - start, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self.connection.stats.fetched(self.connection, self._sql, self._parameters, time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self.connection.stats.fetched(self.connection, self._sql, self._parameters, time.perf_counter() - start, len(rows))
+        return rows
+
+
+class CountingConnection(sqlite3.Connection):
+    # The execute shortcuts are routed through cursor() so every statement is counted once
+    stats = None
+
+    def cursor(self, factory=CountingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+class Database:
+    def __init__(self, path=DB_PATH, read_pool_size=READ_POOL_SIZE):
+        self.path = path
+        self.stats = Stats()
+        self.read_pool_size = read_pool_size
+        self._write_lock = threading.RLock()
+        self._readers = queue.LifoQueue()
+        self._reader_count = 0
+        self._reader_lock = threading.Lock()
+        self._change_listeners = []
+        self._writer = self._connect(path)
+
+    @property
+    def in_memory(self):
+        return self.path == ':memory:'
+
+    @property
+    def shared_memory(self):
+        return self.path.startswith("file:") and "mode=memory" in self.path
+
+    def _connect(self, database, read_only=False):
+        conn = sqlite3.connect(database, check_same_thread=False, uri=database.startswith("file:"),
+                               cached_statements=STATEMENT_CACHE_SIZE, factory=CountingConnection)
+        conn.stats = self.stats
+        self.stats.connections_opened += 1
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+            # Shared-cache connections lock whole tables, so a reader would fail with SQLITE_LOCKED
+            # for as long as the writer has a transaction open; it reads uncommitted rows instead
+            if self.shared_memory:
+                conn.execute("PRAGMA read_uncommitted = ON")
+        return conn
+
+    @property
+    def connection(self):
+        # The long-lived writer connection, for code that needs a plain sqlite3 connection
+        return self._writer
+
+    # Reads go through the pool so they never wait for a long write on another thread
+    def query(self, sql, parameters=()):
+        with self.reader() as conn:
+            return conn.execute(sql, parameters).fetchall()
+
+    def query_one(self, sql, parameters=()):
+        with self.reader() as conn:
+            return conn.execute(sql, parameters).fetchone()
+
+    def add_change_listener(self, listener):
+        # listener(member_ids) is called after writes that changed those members or their progress
+        self._change_listeners.append(listener)
+
+    def members_changed(self, member_ids):
+        for listener in self._change_listeners:
+            listener(member_ids)
+
+    @contextmanager
+    def transaction(self):
+        with self._write_lock:
+            try:
+                yield self._writer
+            except BaseException:
+                self._writer.rollback()
+                # Shared-memory readers see uncommitted rows, so anything cached from them is void now
+                if self.shared_memory:
+                    self.members_changed(None)
+                raise
+            else:
+                self._writer.commit()
+
+    @contextmanager
+    def reader(self):
+        # In-memory databases are private to one connection, so readers share the writer
+        if self.in_memory:
+            with self._write_lock:
+                yield self._writer
+            return
+
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+
+    @contextmanager
+    def readers_paused(self):
+        # Holds every pooled reader, so no read runs while e.g. the whole database is replaced
+        with self._reader_lock:
+            while self._reader_count < self.read_pool_size:
+                self._reader_count += 1
+                self._readers.put(self._connect(self.path, read_only=True))
+        held = [self._readers.get() for _ in range(self.read_pool_size)]
+        try:
+            yield
+        finally:
+            for conn in held:
+                self._readers.put(conn)
+
+    def _acquire_reader(self):
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._reader_lock:
+            if self._reader_count < self.read_pool_size:
+                self._reader_count += 1
+                return self._connect(self.path, read_only=True)
+        return self._readers.get()
+
+    def diagnostics(self):
+        # Snapshot for the diagnostics window and JSON dumps
+        return {**self.stats.as_dict(), "reader_connections": self._reader_count,
+                "statements": self.stats.statements.snapshot(), "slow_queries": list(self.stats.slow_queries)}
+
+    def close(self):
+        with self._write_lock:
+            self._writer.close()
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+            self._reader_count -= 1
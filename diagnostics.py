@@ -0,0 +1,102 @@
+import tkinter as tk
+from tkinter import ttk, filedialog
+
+import instrumentation
+
+# Diagnostics window: connection and row counters, the slowest SQL statements and GUI handlers
+# by total time, and the recent slow queries with their query plans. Refresh re-reads the
+# counters; Dump JSON writes the same snapshot to a file.
+
+STATEMENT_COLUMNS = ("Statement", "Calls", "Total ms", "Mean ms", "Max ms", "Rows")
+HANDLER_COLUMNS = ("Handler", "Calls", "Total ms", "Mean ms", "Max ms")
+MAX_ROWS = 100  # entries listed per table
+
+
+def snapshot(db, member_details=None):
+    data = {"database": db.diagnostics(), "handlers": instrumentation.HANDLER_TIMINGS.snapshot()}
+    if member_details is not None:
+        data["member_cache"] = member_details.stats()
+    return data
+
+
+class DiagnosticsWindow:
+    def __init__(self, root, db, member_details=None):
+        self.db = db
+        self.member_details = member_details
+
+        self.window = tk.Toplevel(root)
+        self.window.title("Diagnostics")
+        self.window.geometry("1000x650")
+        self.window.columnconfigure(0, weight=1)
+
+        self.summary = tk.StringVar()
+        ttk.Label(self.window, textvariable=self.summary, padding=5).grid(row=0, column=0, sticky='w')
+
+        self.statements = self._table(STATEMENT_COLUMNS, row=1, first_width=500)
+        self.handlers = self._table(HANDLER_COLUMNS, row=2, first_width=300)
+        self.window.rowconfigure(1, weight=2)
+        self.window.rowconfigure(2, weight=1)
+
+        ttk.Label(self.window, text="Slow queries (latest first):", padding=(5, 5, 5, 0)).grid(row=3, column=0, sticky='w')
+        self.slow = tk.Text(self.window, height=10, wrap='none')
+        self.slow.grid(row=4, column=0, sticky='nsew', padx=5)
+        self.window.rowconfigure(4, weight=1)
+
+        buttons = ttk.Frame(self.window, padding=5)
+        buttons.grid(row=5, column=0, sticky='e')
+        ttk.Button(buttons, text="Refresh", command=self.refresh).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="Reset", command=self.reset).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="Dump JSON...", command=self.dump).pack(side=tk.LEFT, padx=5)
+
+        self.refresh()
+
+    def _table(self, columns, row, first_width):
+        frame = ttk.Frame(self.window)
+        frame.grid(row=row, column=0, sticky='nsew', padx=5, pady=5)
+        frame.rowconfigure(0, weight=1)
+        frame.columnconfigure(0, weight=1)
+        tree = ttk.Treeview(frame, columns=columns, show='headings', height=8)
+        for i, column in enumerate(columns):
+            tree.heading(column, text=column)
+            tree.column(column, width=first_width if i == 0 else 80, anchor='w' if i == 0 else 'e')
+        tree.grid(row=0, column=0, sticky='nsew')
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+        scrollbar.grid(row=0, column=1, sticky='ns')
+        tree.configure(yscrollcommand=scrollbar.set)
+        return tree
+
+    def refresh(self):
+        data = snapshot(self.db, self.member_details)
+        database = data["database"]
+        summary = (f"Connections opened: {database['connections_opened']} ({database['reader_connections']} pooled readers)   "
+                   f"Statements: {database['statements_executed']}   Rows: {database['rows']}")
+        if "member_cache" in data:
+            cache = data["member_cache"]
+            summary += f"   Member cache: {cache['hits']} hits, {cache['misses']} misses, {cache['size']}/{cache['capacity']}"
+        self.summary.set(summary)
+
+        self.statements.delete(*self.statements.get_children())
+        for entry in database["statements"][:MAX_ROWS]:
+            self.statements.insert('', tk.END, values=(" ".join(entry["name"].split()), entry["count"], entry["total_ms"],
+                                                       entry["mean_ms"], entry["max_ms"], entry["rows"]))
+        self.handlers.delete(*self.handlers.get_children())
+        for entry in data["handlers"][:MAX_ROWS]:
+            self.handlers.insert('', tk.END, values=(entry["name"], entry["count"], entry["total_ms"],
+                                                     entry["mean_ms"], entry["max_ms"]))
+
+        self.slow.delete('1.0', tk.END)
+        for entry in reversed(database["slow_queries"]):
+            self.slow.insert(tk.END, f"{entry['time']}  {entry['ms']} ms  {' '.join(entry['sql'].split())}\n")
+            for step in entry["plan"]:
+                self.slow.insert(tk.END, f"    {step}\n")
+
+    def reset(self):
+        self.db.stats.reset()
+        instrumentation.HANDLER_TIMINGS.reset()
+        self.refresh()
+
+    def dump(self):
+        path = filedialog.asksaveasfilename(parent=self.window, title="Dump diagnostics", initialfile="diagnostics.json",
+                                            filetypes=[("JSON", "*.json")])
+        if path:
+            instrumentation.dump_json(path, snapshot(self.db, self.member_details))
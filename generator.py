@@ -0,0 +1,139 @@
+import time
+from contextlib import nullcontext
+from datetime import date
+
+import numpy as np
+
+import core
+import nutrition
+import search
+
+# Seeded synthetic population generator. Rows are produced and written chunk by chunk, so memory
+# use depends on chunk_size only, and the same seed always yields the same population.
+
+CHUNK_SIZE = 50_000
+
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+               "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen",
+               "Daniel", "Nancy", "Matthew", "Lisa", "Anthony", "Betty", "Mark", "Sandra", "Steven", "Ashley"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+              "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+              "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson"]
+
+# How often members pick each kind of training (same order as core.EXPERTISE_TYPES)
+EXPERTISE_WEIGHTS = {"Fitness": 0.35, "Yoga": 0.15, "HIIT": 0.2, "Weightlifting": 0.2, "Pilates": 0.1}
+
+HEIGHT_MEAN, HEIGHT_SD, HEIGHT_RANGE = 170.0, 10.0, (140, 210)  # cm
+BMI_MEAN, BMI_SD, BMI_RANGE = 26.0, 4.5, (16.0, 45.0)
+AGE_MIN, AGE_SHAPE, AGE_SCALE, AGE_MAX = 18, 2.2, 9.0, 85  # years, gamma distributed above AGE_MIN
+
+# All goals, with each one's row of nutrition coefficients
+GOALS = [goal for expertise in core.EXPERTISE_TYPES for goal in core.GOAL_OPTIONS[expertise]]
+GOAL_EXPERTISE = np.array([core.EXPERTISE_TYPES.index(expertise)
+                           for expertise in core.EXPERTISE_TYPES for _ in core.GOAL_OPTIONS[expertise]])
+NUTRITION = nutrition.COEFFICIENTS[nutrition.goal_codes(GOALS)]
+
+
+class GenerationReport:
+    def __init__(self, table, rows, seconds):
+        self.table = table
+        self.rows = rows
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else float('inf')
+
+    def __str__(self):
+        return f"{self.rows} {self.table} in {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/s)"
+
+
+def _names(rng, n):
+    first = rng.integers(0, len(FIRST_NAMES), n)
+    last = rng.integers(0, len(LAST_NAMES), n)
+    return [f"{FIRST_NAMES[f]} {LAST_NAMES[l]}" for f, l in zip(first.tolist(), last.tolist())]
+
+
+def _write_chunks(db, table, sql, chunks, total, progress=None):
+    start = time.perf_counter()
+    rows = 0
+    for chunk in chunks:
+        # Checked before each write: a cancel keeps the committed chunks and never follows the last one
+        if progress:
+            progress(rows, total)
+        with db.transaction() as conn, (search.deferred_indexing(conn) if table == "members" else nullcontext()):
+            conn.executemany(sql, chunk)
+        rows += len(chunk)
+    return GenerationReport(table, rows, time.perf_counter() - start)
+
+
+def trainer_rows(rng, count, chunk_size=CHUNK_SIZE):
+    for offset in range(0, count, chunk_size):
+        n = min(chunk_size, count - offset)
+        expertise = rng.integers(0, len(core.EXPERTISE_TYPES), n)
+        # Each trainer works 3 to 6 days a week
+        day_counts = rng.integers(3, 7, n)
+        day_order = rng.random((n, len(core.WEEKDAYS))).argsort(axis=1)
+        # Bit d of the mask is set when weekday d is among the trainer's first day_counts picks
+        rank = day_order.argsort(axis=1)
+        masks = ((rank < day_counts[:, None]) << np.arange(len(core.WEEKDAYS))).sum(axis=1)
+        yield list(zip(_names(rng, n), [core.EXPERTISE_TYPES[e] for e in expertise.tolist()], masks.tolist()))
+
+
+def member_rows(rng, count, trainers_by_expertise, today=None, chunk_size=CHUNK_SIZE):
+    today = np.datetime64(today or date.today(), 'D')
+    goal_weights = np.array([EXPERTISE_WEIGHTS[core.EXPERTISE_TYPES[e]] / len(core.GOAL_OPTIONS[core.EXPERTISE_TYPES[e]])
+                             for e in GOAL_EXPERTISE])
+    goal_weights /= goal_weights.sum()
+
+    for offset in range(0, count, chunk_size):
+        n = min(chunk_size, count - offset)
+        height = np.clip(np.rint(rng.normal(HEIGHT_MEAN, HEIGHT_SD, n)), *HEIGHT_RANGE).astype(np.int64)
+        bmi = np.clip(rng.normal(BMI_MEAN, BMI_SD, n), *BMI_RANGE)
+        weight = np.round(bmi * (height / 100) ** 2, 1)
+        age_days = np.minimum(AGE_MIN + rng.gamma(AGE_SHAPE, AGE_SCALE, n), AGE_MAX) * 365.25
+        birthday = np.datetime_as_string(today - age_days.astype('timedelta64[D]'), unit='D')
+        activity_level = rng.binomial(9, 0.5, n) + 1
+        goal = rng.choice(len(GOALS), n, p=goal_weights)
+
+        # Pick a trainer whose expertise offers the member's goal; -1 where there is none
+        trainer_id = np.full(n, -1, dtype=np.int64)
+        expertise = GOAL_EXPERTISE[goal]
+        for e, ids in trainers_by_expertise.items():
+            mask = expertise == e
+            if len(ids) and mask.any():
+                trainer_id[mask] = ids[rng.integers(0, len(ids), mask.sum())]
+
+        protein, carb, fiber = (NUTRITION[goal] * weight[:, None]).T
+        yield list(zip(_names(rng, n), birthday.tolist(), height.tolist(), weight.tolist(), activity_level.tolist(),
+                       [GOALS[g] for g in goal.tolist()],
+                       protein.tolist(), carb.tolist(), fiber.tolist(),
+                       [t if t >= 0 else None for t in trainer_id.tolist()]))
+
+
+def load_trainers_by_expertise(db):
+    # Maps expertise index -> array of trainer ids, loaded once per generation run
+    grouped = {e: [] for e in range(len(core.EXPERTISE_TYPES))}
+    for trainer_id, expertise in db.query("SELECT trainer_id, expertise FROM trainers"):
+        if expertise in core.GOAL_OPTIONS:
+            grouped[core.EXPERTISE_TYPES.index(expertise)].append(trainer_id)
+    return {e: np.array(ids, dtype=np.int64) for e, ids in grouped.items()}
+
+
+def _check_sizes(count, chunk_size):
+    core.check_count("Count", count, minimum=0)
+    core.check_count("Chunk size", chunk_size)
+
+
+def generate_trainers(db, count, seed=None, chunk_size=CHUNK_SIZE, progress=None):
+    _check_sizes(count, chunk_size)
+    rng = np.random.default_rng(seed)
+    return _write_chunks(db, "trainers", core.INSERT_TRAINER, trainer_rows(rng, count, chunk_size), count, progress)
+
+
+def generate_members(db, count, seed=None, today=None, chunk_size=CHUNK_SIZE, progress=None):
+    _check_sizes(count, chunk_size)
+    rng = np.random.default_rng(seed)
+    trainers = load_trainers_by_expertise(db)
+    return _write_chunks(db, "members", core.INSERT_MEMBER, member_rows(rng, count, trainers, today, chunk_size),
+                         count, progress)
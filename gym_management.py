@@ -1,52 +1,29 @@
+import os
+import queue
+import time
 import tkinter as tk
-from tkinter import ttk, messagebox
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk, messagebox, filedialog
 from tkcalendar import DateEntry
-import sqlite3
-import random
-from datetime import datetime, timedelta
-
-# Database setup function
-def create_database():
-    conn = sqlite3.connect('gym_simulation.db')
-    c = conn.cursor()
-
-    # Drop existing tables (resetting structure)
-    c.execute("DROP TABLE IF EXISTS progress")
-    c.execute("DROP TABLE IF EXISTS members")
-    c.execute("DROP TABLE IF EXISTS trainers")
-
-    # Create tables
-    c.execute('''CREATE TABLE IF NOT EXISTS trainers (
-                    trainer_id INTEGER PRIMARY KEY,
-                    name TEXT,
-                    expertise TEXT,
-                    available_weeks TEXT)''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS members (
-                    member_id INTEGER PRIMARY KEY,
-                    name TEXT,
-                    birthday TEXT,
-                    height INTEGER,
-                    weight REAL,
-                    activity_level INTEGER,
-                    goal TEXT,
-                    protein_needed REAL,
-                    carb_needed REAL,
-                    fiber_needed REAL,
-                    trainer_id INTEGER,
-                    FOREIGN KEY(trainer_id) REFERENCES trainers(trainer_id))''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS progress (
-                    member_id INTEGER,
-                    date TEXT,
-                    weight REAL,
-                    bmi REAL,
-                    FOREIGN KEY(member_id) REFERENCES members(member_id))''')
-
-    conn.commit()
-    conn.close()
+
+import analytics_view
+import browser
+import core
+import diagnostics
+import instrumentation
+import member_details
+import progress_chart
+import sandbox
+import search
+import transfer
+
+DIAGNOSTICS_LOG = os.environ.get("GYM_DIAGNOSTICS_LOG")  # JSON-lines file for slow query/handler events
+TASK_POLL_MS = 100  # how often the Tk thread picks up progress from the background worker
+MAX_WARNING_NAMES = 20  # names listed in a warning summary before "... and N more"
+SEARCH_DELAY_MS = 150  # typing pause before the member search runs
 
 # Main GUI Application Class
+@instrumentation.timed_handlers(exclude={"poll_task"})
 class GymManagementGUI:
     def __init__(self, root):
         self.root = root
@@ -54,19 +31,21 @@ class GymManagementGUI:
         self.root.geometry("900x600")
         self.root.configure(bg='#f5f5f5')
 
-        self.create_goal_options = {
-            "Fitness": ["Weight Loss", "Muscle Gain", "General Health"],
-            "Yoga": ["Flexibility Improvement", "Stress Relief", "Mindfulness"],
-            "HIIT": ["Fat Loss", "Endurance", "Strength"],
-            "Weightlifting": ["Muscle Gain", "Strength Building", "Powerlifting"],
-            "Pilates": ["Core Strength", "Flexibility", "Rehabilitation"]
-        }
+        self.create_goal_options = core.GOAL_OPTIONS
+        self.expertise_types = core.EXPERTISE_TYPES
+        self.available_weeks = core.WEEKDAYS
+
+        self.db = core.open_database()
+        self.member_details = member_details.MemberDetailService(self.db)
+        # While a what-if sandbox is open, self.db and self.member_details point into it
+        self.disk_db, self.disk_member_details = self.db, self.member_details
+        self.sandbox = None
 
-        self.trainer_names = ["John Doe", "Jane Smith", "Jim Brown", "Jake White", "Lisa Green", "Tom Black"]
-        self.expertise_types = list(self.create_goal_options.keys())
-        self.available_weeks = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+        # Long operations run on one worker thread; the Tk thread polls their progress via root.after
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.task = None
+        self.task_events = queue.Queue()
 
-        create_database()
         self.create_dashboard()
 
         # Track whether unassigned members have been assigned
@@ -101,10 +80,27 @@ class GymManagementGUI:
         ttk.Button(dashboard_frame, text="View All Trainers", command=self.view_all_trainers).grid(row=4, column=0, padx=10, pady=10)
         ttk.Button(dashboard_frame, text="View All Members", command=self.view_all_members).grid(row=5, column=0, padx=10, pady=10)
 
+        # Bulk Import / Export Buttons
+        ttk.Button(dashboard_frame, text="Import Data...", command=self.import_data).grid(row=4, column=1, padx=10, pady=10)
+        ttk.Button(dashboard_frame, text="Export Data...", command=self.export_data).grid(row=5, column=1, padx=10, pady=10)
+
         # Auto Add Buttons
         ttk.Button(dashboard_frame, text="Auto Add Trainers", command=self.auto_add_trainers).grid(row=6, column=0, padx=10, pady=10)
         ttk.Button(dashboard_frame, text="Auto Add Members", command=self.auto_add_members).grid(row=7, column=0, padx=10, pady=10)
 
+        ttk.Button(dashboard_frame, text="Diagnostics", command=self.view_diagnostics).grid(row=8, column=0, padx=10, pady=10)
+        ttk.Button(dashboard_frame, text="Analytics", command=self.view_analytics).grid(row=8, column=1, padx=10, pady=10)
+
+        # Background Task Section
+        self.task_frame = ttk.LabelFrame(dashboard_frame, text="Background Task", padding=(10, 10))
+        self.task_frame.grid(row=9, column=0, sticky='ew', padx=10, pady=10)
+        self.add_task_section()
+
+        # What-if Sandbox Section
+        self.sandbox_frame = ttk.LabelFrame(dashboard_frame, text="What-if Sandbox", padding=(10, 10))
+        self.sandbox_frame.grid(row=10, column=0, columnspan=2, sticky='ew', padx=10, pady=10)
+        self.add_sandbox_section()
+
     def clear_main_frame(self):
         for widget in self.root.winfo_children():
             widget.destroy()
@@ -168,14 +164,52 @@ class GymManagementGUI:
         self.weeks_passed_entry = ttk.Entry(self.progress_frame)
         self.weeks_passed_entry.grid(row=0, column=1, padx=5, pady=5)
 
-        ttk.Button(self.progress_frame, text="Simulate Progress", command=self.simulate_progress).grid(row=0, column=2, padx=5, pady=5)
+        self.week_by_week_var = tk.BooleanVar()
+        ttk.Checkbutton(self.progress_frame, text="Week by week", variable=self.week_by_week_var).grid(row=0, column=2, padx=5, pady=5)
 
-    def add_view_progress_section(self):
-        self.view_progress_member_combo = ttk.Combobox(self.view_progress_frame, state='readonly')
-        self.view_progress_member_combo.grid(row=0, column=0, padx=5, pady=5)
-        self.view_progress_member_combo.bind("<<ComboboxSelected>>", self.display_member_progress)
+        ttk.Button(self.progress_frame, text="Simulate Progress", command=self.simulate_progress).grid(row=0, column=3, padx=5, pady=5)
+
+    def add_task_section(self):
+        self.task_status = tk.StringVar(value="Idle")
+        ttk.Label(self.task_frame, textvariable=self.task_status, width=40).grid(row=0, column=0, padx=5, pady=5)
+
+        self.task_progress = ttk.Progressbar(self.task_frame, mode='determinate', length=300)
+        self.task_progress.grid(row=0, column=1, padx=5, pady=5)
 
-        ttk.Button(self.view_progress_frame, text="View Progress", command=self.load_member_progress).grid(row=0, column=1, padx=5, pady=5)
+        self.cancel_button = ttk.Button(self.task_frame, text="Cancel", command=self.cancel_task, state='disabled')
+        self.cancel_button.grid(row=0, column=2, padx=5, pady=5)
+
+    def add_sandbox_section(self):
+        self.sandbox_status = tk.StringVar(value="Working on the database file.")
+        ttk.Label(self.sandbox_frame, textvariable=self.sandbox_status).grid(row=0, column=0, columnspan=4, sticky='w', padx=5, pady=5)
+        self.sandbox_button = ttk.Button(self.sandbox_frame, text="Enter Sandbox", command=self.toggle_sandbox)
+        self.sandbox_button.grid(row=1, column=0, padx=5, pady=5)
+        ttk.Button(self.sandbox_frame, text="Commit to Disk", command=self.commit_sandbox).grid(row=1, column=1, padx=5, pady=5)
+
+        ttk.Label(self.sandbox_frame, text="Snapshot:").grid(row=2, column=0, padx=5, pady=5)
+        self.snapshot_combo = ttk.Combobox(self.sandbox_frame, width=20)
+        self.snapshot_combo.grid(row=2, column=1, padx=5, pady=5)
+        ttk.Button(self.sandbox_frame, text="Take", command=self.take_snapshot).grid(row=2, column=2, padx=5, pady=5)
+        ttk.Button(self.sandbox_frame, text="Restore", command=self.restore_snapshot).grid(row=2, column=3, padx=5, pady=5)
+
+    def add_view_progress_section(self):
+        # Type-ahead search: each pause in typing runs one indexed lookup for the top matches
+        ttk.Label(self.view_progress_frame, text="Search Member:").grid(row=0, column=0, padx=5, pady=5)
+        self.member_search_text = tk.StringVar()
+        self.member_search_text.trace_add('write', lambda *args: self.schedule_member_search())
+        search_entry = ttk.Entry(self.view_progress_frame, textvariable=self.member_search_text, width=30)
+        search_entry.grid(row=0, column=1, padx=5, pady=5)
+        search_entry.bind("<Return>", self.display_member_progress)
+        search_entry.bind("<Down>", self.focus_member_results)
+
+        self.member_results = tk.Listbox(self.view_progress_frame, height=6, width=40, exportselection=False)
+        self.member_results.grid(row=1, column=0, columnspan=2, padx=5, pady=5, sticky='ew')
+        self.member_results.bind("<Double-Button-1>", self.display_member_progress)
+        self.member_results.bind("<Return>", self.display_member_progress)
+        self.member_search_status = tk.StringVar(value="Type a name or #ID.")
+        ttk.Label(self.view_progress_frame, textvariable=self.member_search_status).grid(row=2, column=0, columnspan=2, sticky='w', padx=5)
+        self.member_matches = []
+        self.member_search_job = None
 
     def update_goals(self, event):
         expertise = self.trainer_expertise_combo.get()
@@ -190,19 +224,14 @@ class GymManagementGUI:
     def add_trainer(self):
         name = self.trainer_name_entry.get()
         expertise = self.trainer_expertise_combo.get()
-        available_weeks = ', '.join([day for day, var in self.weeks_var.items() if var.get()])
+        available_weeks = [day for day, var in self.weeks_var.items() if var.get()]
 
-        if not name or not expertise or not available_weeks:
-            messagebox.showerror("Error", "Please fill all fields.")
+        try:
+            core.add_trainer(self.db, name, expertise, available_weeks)
+        except core.GymError as e:
+            messagebox.showerror("Error", str(e))
             return
 
-        conn = sqlite3.connect('gym_simulation.db')
-        c = conn.cursor()
-        c.execute("INSERT INTO trainers (name, expertise, available_weeks) VALUES (?, ?, ?)",
-                  (name, expertise, available_weeks))
-        conn.commit()
-        conn.close()
-
         messagebox.showinfo("Success", "Trainer added successfully!")
         self.trainer_name_entry.delete(0, tk.END)
         self.trainer_expertise_combo.set('')
@@ -210,49 +239,19 @@ class GymManagementGUI:
             var.set(False)
 
     def add_member(self):
-        name = self.member_name_entry.get()
-        birthday = self.member_birthday_entry.get()
-        height = self.member_height_entry.get()
-        weight = self.member_weight_entry.get()
-        activity_level = self.activity_level_entry.get()
-        goal = self.member_goal_combo.get()
-        expertise = self.trainer_expertise_member_combo.get()
-
-        if not name or not birthday or not height or not weight or not activity_level or not goal or not expertise:
-            messagebox.showerror("Error", "Please fill all fields.")
-            return
-
         try:
-            height = int(height)
-            weight = float(weight)
-            activity_level = int(activity_level)
-        except ValueError:
-            messagebox.showerror("Error", "Height must be an integer and weight/activity level must be numeric.")
+            core.add_member(self.db,
+                            self.member_name_entry.get(),
+                            self.member_birthday_entry.get(),
+                            self.member_height_entry.get(),
+                            self.member_weight_entry.get(),
+                            self.activity_level_entry.get(),
+                            self.member_goal_combo.get(),
+                            self.trainer_expertise_member_combo.get())
+        except core.GymError as e:
+            messagebox.showerror("Error", str(e))
             return
 
-        # Calculate dietary needs
-        protein_needed = self.calculate_nutrition(goal, weight, "protein")
-        carb_needed = self.calculate_nutrition(goal, weight, "carb")
-        fiber_needed = self.calculate_nutrition(goal, weight, "fiber")
-
-        # Retrieve the trainer_id based on the selected expertise
-        conn = sqlite3.connect('gym_simulation.db')
-        c = conn.cursor()
-        c.execute("SELECT trainer_id FROM trainers WHERE expertise = ?", (expertise,))
-        trainer = c.fetchone()
-        if trainer:
-            trainer_id = int(trainer[0])  # Convert trainer_id to integer
-        else:
-            messagebox.showerror("Error", "No trainer available with the selected expertise.")
-            conn.close()
-            return
-
-        # Insert member into the database
-        c.execute("INSERT INTO members (name, birthday, height, weight, activity_level, goal, protein_needed, carb_needed, fiber_needed, trainer_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                  (name, birthday, height, weight, activity_level, goal, protein_needed, carb_needed, fiber_needed, trainer_id))
-        conn.commit()
-        conn.close()
-
         messagebox.showinfo("Success", "Member added successfully!")
         self.member_name_entry.delete(0, tk.END)
         self.member_birthday_entry.delete(0, tk.END)
@@ -262,56 +261,168 @@ class GymManagementGUI:
         self.member_goal_combo.set('')
         self.trainer_expertise_member_combo.set('')
 
-    def calculate_nutrition(self, goal, weight, nutrient):
-        if nutrient == "protein":
-            if goal == "Muscle Gain":
-                return 1.5 * weight
-            elif goal == "Weight Loss":
-                return 1.2 * weight
-            else:  # General Health
-                return 1.0 * weight
-        elif nutrient == "carb":
-            if goal == "Muscle Gain":
-                return 3.0 * weight
-            elif goal == "Weight Loss":
-                return 2.5 * weight
-            else:  # General Health
-                return 2.0 * weight
-        elif nutrient == "fiber":
-            if goal == "Muscle Gain":
-                return 0.03 * weight
-            elif goal == "Weight Loss":
-                return 0.025 * weight
-            else:  # General Health
-                return 0.02 * weight
-
     def view_all_trainers(self):
-        conn = sqlite3.connect('gym_simulation.db')
-        c = conn.cursor()
-        c.execute("SELECT * FROM trainers")
-        trainers = c.fetchall()
-        conn.close()
-
-        if not trainers:
-            messagebox.showinfo("No Trainers", "No trainers found in the database.")
+        browser.browse_trainers(self.root, self.db)
+
+    def view_all_members(self):
+        browser.browse_members(self.root, self.db)
+
+    def import_data(self):
+        path = filedialog.askopenfilename(title="Import trainers, members or progress",
+                                          filetypes=[("CSV or JSON lines", "*.csv *.jsonl *.ndjson"), ("All files", "*")])
+        if not path:
+            return
+        try:
+            table = transfer.table_for_path(path)
+        except core.GymError as e:
+            messagebox.showerror("Error", str(e))
             return
+        self.run_task(f"Importing {table}...", lambda control: core.import_file(self.db, table, path, control=control),
+                      self.import_data_done)
 
-        trainer_list = "\n".join([f"{trainer[0]}: {trainer[1]}, Expertise: {trainer[2]}, Available weeks: {trainer[3]}" for trainer in trainers])
-        messagebox.showinfo("Trainers", trainer_list)
+    def import_data_done(self, report):
+        if report.rejected:
+            errors = "\n".join(report.errors[:MAX_WARNING_NAMES])
+            messagebox.showwarning("Import", f"{report}\n\n{errors}")
+            return
+        messagebox.showinfo("Import", str(report))
 
-    def view_all_members(self):
-        conn = sqlite3.connect('gym_simulation.db')
-        c = conn.cursor()
-        c.execute("SELECT * FROM members")
-        members = c.fetchall()
-        conn.close()
-
-        if not members:
-            messagebox.showinfo("No Members", "No members found in the database.")
+    def export_data(self):
+        path = filedialog.asksaveasfilename(title="Export (file name starts with the table)", initialfile="progress.csv",
+                                            filetypes=[("CSV", "*.csv"), ("JSON lines", "*.jsonl")])
+        if not path:
+            return
+        try:
+            table = transfer.table_for_path(path)
+            transfer.file_format(path)
+        except core.GymError as e:
+            messagebox.showerror("Error", str(e))
             return
+        self.run_task(f"Exporting {table}...", lambda control: core.export_file(self.db, table, path, control=control),
+                      lambda report: messagebox.showinfo("Export", str(report)))
 
-        member_list = "\n".join([f"{member[0]}: {member[1]}, Goal: {member[6]}, Trainer ID: {member[10]}" for member in members])
-        messagebox.showinfo("Members", member_list)
+    def view_diagnostics(self):
+        diagnostics.DiagnosticsWindow(self.root, self.db, self.member_details)
+
+    def view_analytics(self):
+        analytics_view.AnalyticsWindow(self.root, self.db)
+
+    def run_task(self, description, work, on_done):
+        # Runs work(control) on the worker thread and calls on_done(result) on the Tk thread
+        if self.task is not None:
+            messagebox.showinfo("Busy", f"Please wait until '{self.task_status.get()}' has finished.")
+            return
+
+        self.task = core.TaskControl(on_progress=lambda done, total: self.task_events.put((done, total)))
+        self.task_started = time.perf_counter()
+        self.task_description = description
+        self.task_status.set(description)
+        self.task_progress['value'] = 0
+        self.cancel_button['state'] = 'normal'
+        future = self.executor.submit(work, self.task)
+        self.root.after(TASK_POLL_MS, self.poll_task, future, on_done)
+
+    def poll_task(self, future, on_done):
+        # Only the latest progress report matters
+        latest = None
+        while not self.task_events.empty():
+            latest = self.task_events.get_nowait()
+        if latest:
+            done, total = latest
+            self.task_progress['maximum'] = max(total, 1)
+            self.task_progress['value'] = done
+
+        if not future.done():
+            self.root.after(TASK_POLL_MS, self.poll_task, future, on_done)
+            return
+
+        instrumentation.HANDLER_TIMINGS.record(f"task: {self.task_description}", time.perf_counter() - self.task_started)
+        self.task = None
+        self.task_status.set("Idle")
+        self.task_progress['value'] = 0
+        self.cancel_button['state'] = 'disabled'
+        try:
+            result = future.result()
+        except core.Cancelled:
+            messagebox.showinfo("Cancelled", "The operation was cancelled.")
+            return
+        except core.GymError as e:
+            messagebox.showinfo("Info", str(e))
+            return
+        except Exception as e:  # anything else would die silently in the worker thread
+            instrumentation.log.exception("task failed: %s", self.task_description)
+            messagebox.showerror("Error", f"{self.task_description.rstrip('.')} failed: {e}")
+            return
+        on_done(result)
+
+    def cancel_task(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task_status.set("Cancelling...")
+
+    def toggle_sandbox(self):
+        if self.sandbox is None:
+            self.run_task("Loading sandbox...", lambda control: sandbox.Sandbox(self.disk_db.path, control.report),
+                          self.enter_sandbox_done)
+            return
+        if self.task is not None:
+            messagebox.showinfo("Busy", f"Please wait until '{self.task_status.get()}' has finished.")
+            return
+        if not messagebox.askyesno("Leave Sandbox", "Discard the sandbox and every change not committed to disk?"):
+            return
+        self.sandbox.close()
+        self.sandbox = None
+        self.db, self.member_details = self.disk_db, self.disk_member_details
+        self.snapshot_combo['values'] = ()
+        self.snapshot_combo.set('')
+        self.sandbox_button['text'] = "Enter Sandbox"
+        self.sandbox_status.set("Working on the database file.")
+        self.search_members()
+
+    def enter_sandbox_done(self, box):
+        self.sandbox = box
+        self.db = box.db
+        self.member_details = member_details.MemberDetailService(box.db)
+        self.sandbox_button['text'] = "Leave Sandbox"
+        self.sandbox_status.set(f"Sandbox: changes stay in memory until committed (loaded in {box.load_seconds:.1f}s).")
+
+    def take_snapshot(self):
+        if self.sandbox is None:
+            messagebox.showinfo("Sandbox", "Enter the sandbox first.")
+            return
+        name = self.snapshot_combo.get().strip() or time.strftime("%H:%M:%S")
+        self.run_task("Taking snapshot...", lambda control: self.sandbox.snapshot(name),
+                      lambda result: self.snapshots_changed(name))
+
+    def snapshots_changed(self, name):
+        self.snapshot_combo['values'] = sorted(self.sandbox.snapshots)
+        self.snapshot_combo.set(name)
+
+    def restore_snapshot(self):
+        name = self.snapshot_combo.get().strip()
+        if self.sandbox is None or name not in self.sandbox.snapshots:
+            messagebox.showinfo("Sandbox", "Choose a snapshot to restore.")
+            return
+        self.run_task(f"Restoring '{name}'...", lambda control: self.sandbox.restore(name),
+                      lambda result: self.search_members())
+
+    def commit_sandbox(self):
+        if self.sandbox is None:
+            messagebox.showinfo("Sandbox", "Enter the sandbox first.")
+            return
+        force = False
+        if self.sandbox.source_changed:
+            force = messagebox.askyesno("Commit to Disk", "The database file has changed since the sandbox was loaded. "
+                                        "Overwrite those changes?")
+            if not force:
+                return
+        self.run_task("Committing sandbox...", lambda control: self.sandbox.commit(force, control.report),
+                      self.commit_sandbox_done)
+
+    def commit_sandbox_done(self, seconds):
+        # The file now holds the sandbox contents; nothing cached from the old ones is valid
+        self.disk_db.members_changed(None)
+        messagebox.showinfo("Success", f"Sandbox committed to {self.sandbox.path} in {seconds:.1f}s.")
 
     def simulate_progress(self):
         try:
@@ -319,238 +430,122 @@ class GymManagementGUI:
         except ValueError:
             messagebox.showerror("Error", "weeks Passed must be a number.")
             return
+        if weeks_passed < 1:
+            messagebox.showerror("Error", "weeks Passed must be at least 1.")
+            return
 
-        conn = sqlite3.connect('gym_simulation.db')
-        c = conn.cursor()
-        c.execute("SELECT member_id, name, weight, height, goal, activity_level, trainer_id FROM members")
-        members = c.fetchall()
-        conn.close()
-
-        for member in members:
-            member_id, name, initial_weight, height, goal, activity_level, trainer_id = member
-
-            # Check if the member has an assigned trainer
-            if trainer_id is None:
-                messagebox.showinfo(f"No Assigned Trainer for {name}", f"{name} does not have an assigned trainer and cannot have their progress simulated.")
-                continue
-
-            weight_change = 0
-
-            # Adjust weight change based on the member's goal and activity level
-            if goal == "Weight Loss":
-                weight_change = -initial_weight * (0.01 * weeks_passed * (1 + (activity_level - 5) * 0.1))  # Example: 1% weight loss per week, adjusted by activity level
-            elif goal == "Muscle Gain":
-                weight_change = initial_weight * (0.005 * weeks_passed * (1 + (activity_level - 5) * 0.1))  # Example: 0.5% weight gain per week, adjusted by activity level
-            elif goal == "Fat Loss":
-                weight_change = -initial_weight * (0.007 * weeks_passed * (1 + (activity_level - 5) * 0.1))  # Example: 0.7% fat loss per week, adjusted by activity level
-            elif goal == "Endurance":
-                weight_change = initial_weight * (0.002 * weeks_passed * (1 + (activity_level - 5) * 0.1))  # Example: 0.2% weight gain per week, adjusted by activity level
-            elif goal == "Strength":
-                weight_change = initial_weight * (0.004 * weeks_passed * (1 + (activity_level - 5) * 0.1))  # Example: 0.4% weight gain per week, adjusted by activity level
-            elif goal == "Powerlifting":
-                weight_change = initial_weight * (0.003 * weeks_passed * (1 + (activity_level - 5) * 0.1))  # Example: 0.3% weight gain per week, adjusted by activity level
-            elif goal == "Core Strength":
-                weight_change = initial_weight * (0.002 * weeks_passed * (1 + (activity_level - 5) * 0.1))  # Example: 0.2% weight gain per week, adjusted by activity level
-            elif goal == "Flexibility":
-                weight_change = initial_weight * (0.001 * weeks_passed * (1 + (activity_level - 5) * 0.1))  # Example: 0.1% weight gain per week, adjusted by activity level
-            elif goal == "Rehabilitation":
-                weight_change = initial_weight * (0.001 * weeks_passed * (1 + (activity_level - 5) * 0.1))  # Example: 0.1% weight gain per week, adjusted by activity level
-            else:  # General Health
-                weight_change = initial_weight * (0.002 * weeks_passed * (1 + (activity_level - 5) * 0.1))  # Example: 0.2% weight gain per week, adjusted by activity level
-
-            new_weight = initial_weight + weight_change
-
-            # Get the last recorded progress date for this member
-            conn = sqlite3.connect('gym_simulation.db')
-            c = conn.cursor()
-            c.execute("SELECT date FROM progress WHERE member_id = ? ORDER BY date DESC LIMIT 1", (member_id,))
-            last_date = c.fetchone()
-            if last_date:
-                last_date = datetime.strptime(last_date[0], '%Y-%m-%d')
-                current_date = last_date + timedelta(weeks=weeks_passed)
-            else:
-                current_date = datetime.now()
-            conn.close()
-
-            # Calculate BMI
-            bmi = new_weight / ((height / 100) ** 2)
-
-            # Insert progress into the database
-            conn = sqlite3.connect('gym_simulation.db')
-            c = conn.cursor()
-            c.execute("INSERT INTO progress (member_id, date, weight, bmi) VALUES (?, ?, ?, ?)",
-                    (member_id, current_date.strftime('%Y-%m-%d'), new_weight, bmi))
-            conn.commit()
-            conn.close()
-
-        messagebox.showinfo("Success", "Progress simulated successfully!")
-
+        simulate = core.simulate_horizon if self.week_by_week_var.get() else core.simulate_progress
+        self.run_task("Simulating progress...", lambda control: simulate(self.db, weeks_passed, control),
+                      self.simulate_progress_done)
 
-    def display_member_progress(self, event):
-        member_name = self.view_progress_member_combo.get()
+    def simulate_progress_done(self, result):
+        _, skipped = result
+        if skipped:
+            messagebox.showwarning("No Assigned Trainer", summarize_names(skipped, "member(s) do not have an assigned trainer and could not have their progress simulated"))
 
-        conn = sqlite3.connect('gym_simulation.db')
-        c = conn.cursor()
-        c.execute("SELECT m.member_id, m.name, m.birthday, m.height, m.weight, m.activity_level, m.goal, m.protein_needed, m.carb_needed, m.fiber_needed, t.name AS trainer_name, t.expertise, p.date, p.weight, p.bmi "
-                "FROM members m "
-                "LEFT JOIN trainers t ON m.trainer_id = t.trainer_id "
-                "LEFT JOIN progress p ON m.member_id = p.member_id "
-                "WHERE m.name = ? "
-                "ORDER BY p.date ASC", (member_name,))
-        member_progress = c.fetchall()
+        messagebox.showinfo("Success", "Progress simulated successfully!")
 
-        # Check if the member has an assigned trainer
-        c.execute("SELECT trainer_id FROM members WHERE name = ?", (member_name,))
-        trainer_id = c.fetchone()
-        conn.close()
+    def schedule_member_search(self):
+        if self.member_search_job is not None:
+            self.root.after_cancel(self.member_search_job)
+        self.member_search_job = self.root.after(SEARCH_DELAY_MS, self.search_members)
+
+    def search_members(self):
+        self.member_search_job = None
+        self.member_matches = core.search_members(self.db, self.member_search_text.get())
+        self.member_results.delete(0, tk.END)
+        # Entries carry the ID so members with the same name stay distinct
+        for member_id, name in self.member_matches:
+            self.member_results.insert(tk.END, f"{name} (#{member_id})")
+        if not self.member_search_text.get().strip():
+            self.member_search_status.set("Type a name or #ID.")
+        elif not self.member_matches:
+            self.member_search_status.set("No matching members.")
+        elif len(self.member_matches) >= search.LIMIT:
+            self.member_search_status.set(f"First {len(self.member_matches)} matches; keep typing to narrow down.")
+        else:
+            self.member_search_status.set(f"{len(self.member_matches)} match(es).")
+
+    def focus_member_results(self, event):
+        if self.member_matches:
+            self.member_results.focus_set()
+            self.member_results.selection_clear(0, tk.END)
+            self.member_results.selection_set(0)
+            self.member_results.activate(0)
+
+    def display_member_progress(self, event=None):
+        # The selected match, or the first one when Enter is pressed in the search box
+        if self.member_search_job is not None:
+            self.root.after_cancel(self.member_search_job)
+            self.search_members()
+        if not self.member_matches:
+            return
+        selection = self.member_results.curselection()
+        member_id, member_name = self.member_matches[selection[0] if selection else 0]
+        profile = self.member_details.get(member_id)
 
-        if not member_progress:
+        if profile is None:
             messagebox.showinfo("No Progress", f"No progress recorded for {member_name}.")
             return
 
-        if not trainer_id or trainer_id[0] is None:
+        if profile.member.trainer_id is None:
             messagebox.showinfo("No Assigned Trainer", f"{member_name} does not have an assigned trainer and cannot view their progress.")
             return
 
-        progress_list = []
-        current_member = None
-        for row in member_progress:
-            if current_member is None or current_member["name"] != row[1]:
-                if current_member:
-                    progress_list.append(f"Member: {current_member['name']}")
-                    progress_list.append(f"Birthday: {current_member['birthday']}")
-                    progress_list.append(f"Height: {current_member['height']} cm")
-                    progress_list.append(f"Weight: {current_member['weight']:.2f} kg")
-                    progress_list.append(f"Activity Level: {current_member['activity_level']}")
-                    progress_list.append(f"Goal: {current_member['goal']}")
-                    progress_list.append(f"Protein: {current_member['protein_needed']:.2f} g")
-                    progress_list.append(f"Carb: {current_member['carb_needed']:.2f} g")
-                    progress_list.append(f"Fiber: {current_member['fiber_needed']:.2f} g")
-                    progress_list.append(f"Trainer: {current_member['trainer_name']}")
-                    progress_list.append(f"Expertise: {current_member['expertise']}")
-                    progress_list.append("")
-
-                current_member = {
-                    "name": row[1],
-                    "birthday": row[2],
-                    "height": row[3],
-                    "weight": row[4],
-                    "activity_level": row[5],
-                    "goal": row[6],
-                    "protein_needed": row[7],
-                    "carb_needed": row[8],
-                    "fiber_needed": row[9],
-                    "trainer_name": row[10],
-                    "expertise": row[11]
-                }
-
-            progress_list.append(f"Date: {row[12]}, Weight: {row[13]:.2f} kg, BMI: {row[14]:.2f}")
-
-        if current_member:
-            progress_list.append(f"Member: {current_member['name']}")
-            progress_list.append(f"Birthday: {current_member['birthday']}")
-            progress_list.append(f"Height: {current_member['height']} cm")
-            progress_list.append(f"Weight: {current_member['weight']:.2f} kg")
-            progress_list.append(f"Activity Level: {current_member['activity_level']}")
-            progress_list.append(f"Goal: {current_member['goal']}")
-            progress_list.append(f"Protein: {current_member['protein_needed']:.2f} g")
-            progress_list.append(f"Carb: {current_member['carb_needed']:.2f} g")
-            progress_list.append(f"Fiber: {current_member['fiber_needed']:.2f} g")
-            progress_list.append(f"Trainer: {current_member['trainer_name']}")
-            progress_list.append(f"Expertise: {current_member['expertise']}")
-
-        progress_info = "\n".join(progress_list)
-        messagebox.showinfo(f"{member_name}'s Progress", progress_info)
-
-
-    def load_member_progress(self):
-        conn = sqlite3.connect('gym_simulation.db')
-        c = conn.cursor()
-        c.execute("SELECT member_id, name FROM members")
-        members = c.fetchall()
-        conn.close()
-
-        if not members:
-            messagebox.showinfo("No Members", "No members found in the database.")
-            return
-
-        self.view_progress_member_combo['values'] = [member[1] for member in members]
-        self.view_progress_member_combo.set('')
+        progress_chart.ProgressChartWindow(self.root, self.db, profile.member.member_id, f"{member_name}'s Progress",
+                                           format_member_progress(profile))
 
     def auto_add_trainers(self):
-        conn = sqlite3.connect('gym_simulation.db')
-        c = conn.cursor()
-        for name in self.trainer_names:
-            expertise = random.choice(self.expertise_types)
-            available_weeks = ', '.join(random.sample(self.available_weeks, 5))  # Randomly select 5 weeks
-            c.execute("INSERT INTO trainers (name, expertise, available_weeks) VALUES (?, ?, ?)",
-                      (name, expertise, available_weeks))
-        conn.commit()
-        conn.close()
-        messagebox.showinfo("Success", "Auto-added trainers successfully!")
+        self.run_task("Adding trainers...", lambda control: core.auto_add_trainers(self.db, control=control),
+                      lambda report: messagebox.showinfo("Success", f"Auto-added trainers successfully!\n{report}"))
 
     def auto_add_members(self):
-        conn = sqlite3.connect('gym_simulation.db')
-        c = conn.cursor()
-        for i in range(10):  # Add 10 members
-            name = f"Member {i + 1}"
-            birthday = "2000-01-01"  # Placeholder date
-            height = random.randint(150, 200)
-            weight = random.uniform(50.0, 100.0)
-            activity_level = random.randint(1, 10)
-            goal = random.choice(["Weight Loss", "Muscle Gain", "General Health", "Flexibility Improvement", "Stress Relief", "Mindfulness", "Fat Loss", "Endurance", "Strength", "Strength Building", "Powerlifting", "Core Strength", "Flexibility", "Rehabilitation"])
-            expertise = random.choice(self.expertise_types)
-
-            # Calculate protein, carb, and fiber needs
-            protein_needed = self.calculate_nutrition(goal, weight, "protein")
-            carb_needed = self.calculate_nutrition(goal, weight, "carb")
-            fiber_needed = self.calculate_nutrition(goal, weight, "fiber")
-
-            # Retrieve the trainer_id based on the selected expertise
-            c.execute("SELECT trainer_id FROM trainers WHERE expertise = ?", (expertise,))
-            trainer = c.fetchone()
-            if trainer:
-                trainer_id = int(trainer[0])  # Convert trainer_id to integer
-            else:
-                trainer_id = None
-
-            # Insert member into the database
-            c.execute("INSERT INTO members (name, birthday, height, weight, activity_level, goal, protein_needed, carb_needed, fiber_needed, trainer_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                      (name, birthday, height, weight, activity_level, goal, protein_needed, carb_needed, fiber_needed, trainer_id))
-        conn.commit()
-        conn.close()
-        messagebox.showinfo("Success", "Auto-added members successfully!")
+        self.run_task("Adding members...", lambda control: core.auto_add_members(self.db, control=control),
+                      lambda report: messagebox.showinfo("Success", f"Auto-added members successfully!\n{report}"))
 
     def assign_unassigned_members(self):
-        conn = sqlite3.connect('gym_simulation.db')
-        c = conn.cursor()
-        c.execute("SELECT member_id, goal FROM members WHERE trainer_id IS NULL")
-        unassigned_members = c.fetchall()
-
-        if not unassigned_members:
-            messagebox.showinfo("Info", "No unassigned members to assign.")
-            return
+        self.run_task("Assigning members...", lambda control: core.assign_unassigned_members(self.db, control),
+                      self.assign_unassigned_members_done)
 
-        c.execute("SELECT trainer_id, expertise FROM trainers")
-        trainers = c.fetchall()
-
-        if not trainers:
-            messagebox.showinfo("Info", "No trainers available for assignment.")
-            return
+    def assign_unassigned_members_done(self, report):
+        messagebox.showinfo("Success", f"Unassigned members have been successfully assigned!\n{report}")
+        self.unassigned_assigned = True
 
-        for member_id, member_goal in unassigned_members:
-            for trainer_id, expertise in trainers:
-                if member_goal in self.create_goal_options[expertise]:
-                    c.execute("UPDATE members SET trainer_id = ? WHERE member_id = ?", (trainer_id, member_id))
-                    break
 
-        conn.commit()
-        conn.close()
-        messagebox.showinfo("Success", "Unassigned members have been successfully assigned!")
-        self.unassigned_assigned = True
+def summarize_names(names, message):
+    # One warning for many members instead of a message box each
+    listed = ", ".join(names[:MAX_WARNING_NAMES])
+    if len(names) > MAX_WARNING_NAMES:
+        listed += f" ... and {len(names) - MAX_WARNING_NAMES} more"
+    return f"{len(names)} {message}:\n{listed}"
+
+
+def format_member_progress(profile):
+    # Summary shown above the progress chart
+    member, trainer = profile.member, profile.trainer
+    lines = [f"Member: {member.name}"]
+    lines.append(f"Birthday: {member.birthday}")
+    lines.append(f"Height: {member.height} cm")
+    lines.append(f"Weight: {member.weight:.2f} kg")
+    if profile.latest:
+        lines.append(f"Current: {profile.latest.weight:.2f} kg, BMI {profile.latest.bmi:.2f} ({profile.latest.date})")
+    lines.append(f"Activity Level: {member.activity_level}")
+    lines.append(f"Goal: {member.goal}")
+    lines.append(f"Protein: {member.protein_needed:.2f} g")
+    lines.append(f"Carb: {member.carb_needed:.2f} g")
+    lines.append(f"Fiber: {member.fiber_needed:.2f} g")
+    lines.append(f"Trainer: {trainer.name if trainer else None}")
+    lines.append(f"Expertise: {trainer.expertise if trainer else None}")
+    return lines
 
 # Running the application
 if __name__ == "__main__":
+    if DIAGNOSTICS_LOG:
+        instrumentation.enable_json_log(DIAGNOSTICS_LOG)
     root = tk.Tk()
     app = GymManagementGUI(root)
     root.mainloop()
+    if app.task is not None:
+        app.task.cancel()
+    app.executor.shutdown(wait=True)
+    app.db.close()
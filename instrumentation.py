@@ -0,0 +1,121 @@
+import functools
+import json
+import logging
+import sys
+import threading
+import time
+
+# Always-on timing for SQL statements and GUI handlers. Recording is a perf_counter pair and a
+# dict update under a lock; anything costlier (EXPLAIN QUERY PLAN, log output) only happens for
+# calls slower than the thresholds below. Events go to the "gym.diagnostics" logger, one JSON
+# object per line once enable_json_log() has attached a handler.
+
+SLOW_QUERY_SECONDS = 0.1
+SLOW_HANDLER_SECONDS = 0.25
+MAX_SLOW_QUERIES = 50  # most recent slow statements kept for the diagnostics window
+
+log = logging.getLogger("gym.diagnostics")
+log.addHandler(logging.NullHandler())  # silent until enable_json_log()
+
+
+class Timings:
+    # name -> call count, total / max seconds and rows; safe to record from any thread
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def record(self, name, seconds, rows=0):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                self._entries[name] = [1, seconds, seconds, rows]
+                return
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds > entry[2]:
+                entry[2] = seconds
+            entry[3] += rows
+
+    def add(self, name, seconds, rows):
+        # More time and rows for a call already recorded, e.g. fetching a statement's results
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                entry[1] += seconds
+                entry[3] += rows
+
+    def totals(self):
+        # (calls, rows) over every name
+        with self._lock:
+            return (sum(entry[0] for entry in self._entries.values()),
+                    sum(entry[3] for entry in self._entries.values()))
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self):
+        # Entries as dicts, most total time first
+        with self._lock:
+            entries = [(name, *entry) for name, entry in self._entries.items()]
+        entries.sort(key=lambda entry: entry[2], reverse=True)
+        return [{"name": name, "count": count, "total_ms": round(total * 1000, 3),
+                 "mean_ms": round(total * 1000 / count, 3), "max_ms": round(longest * 1000, 3), "rows": rows}
+                for name, count, total, longest, rows in entries]
+
+
+HANDLER_TIMINGS = Timings()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        event = {"time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"), "level": record.levelname,
+                 "event": record.getMessage()}
+        event.update(getattr(record, "fields", {}))
+        return json.dumps(event, default=str)
+
+
+def log_event(event, level=logging.INFO, **fields):
+    if log.isEnabledFor(level):
+        log.log(level, event, extra={"fields": fields})
+
+
+def enable_json_log(path=None, level=logging.INFO):
+    # Appends JSON lines to path, or writes them to stderr
+    handler = logging.FileHandler(path) if path else logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter())
+    log.addHandler(handler)
+    log.setLevel(level)
+    return handler
+
+
+def dump_json(path, snapshot):
+    with open(path, 'w') as f:
+        json.dump(snapshot, f, indent=2, default=str)
+
+
+def timed(name, timings=HANDLER_TIMINGS):
+    # Decorator recording every call of a handler; the time includes any modal dialog it opens
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                timings.record(name, seconds)
+                if seconds >= SLOW_HANDLER_SECONDS:
+                    log_event("slow_handler", logging.WARNING, handler=name, ms=round(seconds * 1000, 3))
+        return wrapper
+    return decorate
+
+
+def timed_handlers(exclude=()):
+    # Class decorator applying timed() to every public method not listed in exclude
+    def decorate(cls):
+        for name, member in list(vars(cls).items()):
+            if callable(member) and not name.startswith("_") and name not in exclude:
+                setattr(cls, name, timed(f"{cls.__name__}.{name}")(member))
+        return cls
+    return decorate
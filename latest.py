@@ -0,0 +1,26 @@
+import migrations
+
+# Maintenance for the member_latest summary table (latest progress date, weight, BMI and row
+# count per member). Triggers keep it current on every progress write; these functions rebuild
+# it from scratch or check it against the full progress history.
+
+VERIFY_QUERY = ("WITH p AS (SELECT member_id, MAX(date) AS date, COUNT(*) AS row_count FROM progress GROUP BY member_id) "
+                "SELECT l.member_id FROM member_latest l LEFT JOIN p ON l.member_id = p.member_id "
+                "WHERE p.member_id IS NULL OR l.date IS NOT p.date OR l.row_count != p.row_count "
+                "UNION "
+                "SELECT p.member_id FROM p LEFT JOIN member_latest l ON l.member_id = p.member_id "
+                "WHERE l.member_id IS NULL")
+
+
+def rebuild(conn):
+    # Returns the number of members in the rebuilt table
+    with conn:
+        conn.execute("DELETE FROM member_latest")
+        conn.execute(migrations.LATEST_FROM_PROGRESS)
+    return conn.execute("SELECT COUNT(*) FROM member_latest").fetchone()[0]
+
+
+def verify(conn):
+    # Member ids whose summary row is missing, stale or has no progress behind it.
+    # Weights are not compared because several rows can share the latest date.
+    return [row[0] for row in conn.execute(VERIFY_QUERY)]
@@ -0,0 +1,149 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+import numpy as np
+
+import core
+
+# Load test for server.py: many concurrent keep-alive clients issuing a mix of list, detail,
+# search and write requests for a fixed time, then latency percentiles per route. Any 5xx
+# response or connection failure (a "database is locked" would surface as one) fails the run.
+#   python server.py --db /tmp/load.db &
+#   python loadtest.py --clients 300 --duration 20
+
+HOST = "127.0.0.1"
+PORT = 8080
+CLIENTS = 200
+DURATION = 10.0
+WRITE_SHARE = 0.02  # fraction of requests that add a member
+
+
+class Client:
+    # One persistent HTTP/1.1 connection; reconnects if the server closed it
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode() if body is not None else b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(payload)}\r\n\r\n"
+        self.writer.write(head.encode("latin-1") + payload)
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        data = json.loads(await self.reader.readexactly(int(headers["content-length"])))
+        if headers.get("connection") == "close":
+            await self.close()
+        return status, data
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+def pick_request(rng, max_member_id, write_share):
+    # -> (route label, method, path, body)
+    roll = rng.random()
+    if roll < write_share:
+        goal = rng.choice(core.GOAL_OPTIONS["Fitness"])
+        return ("POST /members", "POST", "/members",
+                {"name": f"Load Test {rng.randrange(10 ** 6)}", "birthday": "1990-01-01", "height": 175,
+                 "weight": round(rng.uniform(50, 110), 1), "activity_level": rng.randint(1, 10),
+                 "goal": goal, "expertise": "Fitness"})
+    roll = rng.random()
+    if roll < 0.35:
+        return "GET /members/<id>", "GET", f"/members/{rng.randint(1, max_member_id)}", None
+    if roll < 0.55:
+        return "GET /members/<id>/progress", "GET", f"/members/{rng.randint(1, max_member_id)}/progress?limit=20", None
+    if roll < 0.75:
+        goal = rng.choice(list(core.NUTRITION_COEFFICIENTS)).replace(" ", "+")
+        return "GET /members", "GET", f"/members?goal={goal}&limit=50", None
+    if roll < 0.9:
+        days = ",".join(rng.sample(core.WEEKDAYS, 2))
+        return ("GET /trainers/available", "GET",
+                f"/trainers/available?expertise={rng.choice(core.EXPERTISE_TYPES)}&days={days}&match=any", None)
+    return "GET /analytics/goals", "GET", "/analytics/goals", None
+
+
+async def run_client(host, port, deadline, max_member_id, write_share, seed, samples, failures):
+    rng = random.Random(seed)
+    client = Client(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            route, method, path, body = pick_request(rng, max_member_id, write_share)
+            start = time.perf_counter()
+            try:
+                status, data = await client.request(method, path, body)
+            except (OSError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+                failures.append(f"{route}: {type(e).__name__}: {e}")
+                await client.close()
+                continue
+            samples.setdefault(route, []).append(time.perf_counter() - start)
+            if status >= 500:
+                failures.append(f"{route}: {status} {data.get('error')}")
+    finally:
+        await client.close()
+
+
+async def run(host=HOST, port=PORT, clients=CLIENTS, duration=DURATION, write_share=WRITE_SHARE, seed=1):
+    # -> ({route: [seconds]}, [failure messages], elapsed seconds)
+    probe = Client(host, port)
+    status, page = await probe.request("GET", "/members?sort=id&desc=1&limit=1")
+    await probe.close()
+    if status != 200 or not page["items"]:
+        raise SystemExit("The server has no members to query; generate some first.")
+    max_member_id = page["items"][0]["member_id"]
+
+    samples, failures = {}, []
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(run_client(host, port, deadline, max_member_id, write_share, seed + i, samples, failures)
+                           for i in range(clients)))
+    return samples, failures, time.perf_counter() - start
+
+
+def report(samples, failures, elapsed):
+    total = sum(len(times) for times in samples.values())
+    print(f"{total} requests in {elapsed:.1f}s ({total / elapsed:,.0f} req/s), {len(failures)} failure(s)")
+    print(f"{'route':<30}{'requests':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, times in sorted(samples.items()):
+        ms = np.array(times) * 1000
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        print(f"{route:<30}{len(times):>10}{p50:>10.2f}{p95:>10.2f}{p99:>10.2f}")
+    for failure in failures[:10]:
+        print(f"Failure: {failure}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test a running gym API server")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--clients", type=int, default=CLIENTS, help="concurrent keep-alive connections")
+    parser.add_argument("--duration", type=float, default=DURATION, help="seconds")
+    parser.add_argument("--write-share", type=float, default=WRITE_SHARE, help="fraction of requests that write")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    samples, failures, elapsed = asyncio.run(run(args.host, args.port, args.clients, args.duration,
+                                                 args.write_share, args.seed))
+    report(samples, failures, elapsed)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
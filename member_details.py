@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict
+
+import core
+
+# LRU cache of assembled member profiles (member, trainer, latest progress) keyed by member_id;
+# the history itself is read a date range at a time by the progress chart.
+# It listens to Database.members_changed, so an entry is dropped only when that member's rows
+# change; repeat views of an unchanged member never touch the database.
+
+CACHE_SIZE = 256
+
+
+class MemberDetailService:
+    def __init__(self, db, capacity=CACHE_SIZE):
+        self.db = db
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0  # bumped by every invalidate()
+        db.add_change_listener(self.invalidate)
+
+    def get(self, member_id):
+        with self._lock:
+            if member_id in self._cache:
+                self._cache.move_to_end(member_id)
+                self.hits += 1
+                return self._cache[member_id]
+            self.misses += 1
+            generation = self._generation
+
+        detail = core.member_detail(self.db, member_id, history=False)
+        if detail is not None:
+            with self._lock:
+                # A change committed while this profile loaded may have made it stale already
+                if generation != self._generation:
+                    return detail
+                self._cache[member_id] = detail
+                self._cache.move_to_end(member_id)
+                if len(self._cache) > self.capacity:
+                    self._cache.popitem(last=False)
+        return detail
+
+    def invalidate(self, member_ids=None):
+        # None drops everything, e.g. after a bulk import
+        with self._lock:
+            self._generation += 1
+            if member_ids is None:
+                self._cache.clear()
+                return
+            # Walk whichever side is smaller: the cache or the batch of changed members
+            if len(member_ids) > len(self._cache):
+                changed = set(member_ids)
+                for member_id in [key for key in self._cache if key in changed]:
+                    del self._cache[member_id]
+            else:
+                for member_id in member_ids:
+                    self._cache.pop(member_id, None)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._cache), "capacity": self.capacity}
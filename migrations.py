@@ -0,0 +1,306 @@
+import sqlite3
+import sys
+
+# Each migration upgrades the schema by one version; PRAGMA user_version records the last one applied.
+# Version 0 databases created by the old create_database() already hold the version 1 tables,
+# which is why the first migration only creates what is missing.
+
+
+def _create_tables(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS trainers (
+                    trainer_id INTEGER PRIMARY KEY,
+                    name TEXT,
+                    expertise TEXT,
+                    available_weeks TEXT)''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS members (
+                    member_id INTEGER PRIMARY KEY,
+                    name TEXT,
+                    birthday TEXT,
+                    height INTEGER,
+                    weight REAL,
+                    activity_level INTEGER,
+                    goal TEXT,
+                    protein_needed REAL,
+                    carb_needed REAL,
+                    fiber_needed REAL,
+                    trainer_id INTEGER,
+                    FOREIGN KEY(trainer_id) REFERENCES trainers(trainer_id))''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS progress (
+                    member_id INTEGER,
+                    date TEXT,
+                    weight REAL,
+                    bmi REAL,
+                    FOREIGN KEY(member_id) REFERENCES members(member_id))''')
+
+
+def _create_indexes(c):
+    c.execute("CREATE INDEX IF NOT EXISTS idx_progress_member_date ON progress(member_id, date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_members_name ON members(name)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_members_trainer ON members(trainer_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_trainers_expertise ON trainers(expertise)")
+
+
+def _create_goal_index(c):
+    # Goal filter and sort in the member browser
+    c.execute("CREATE INDEX IF NOT EXISTS idx_members_goal ON members(goal)")
+
+
+def _create_member_latest(c):
+    # Latest progress row and row count per member, kept current by triggers on progress
+    c.execute('''CREATE TABLE IF NOT EXISTS member_latest (
+                    member_id INTEGER PRIMARY KEY,
+                    date TEXT,
+                    weight REAL,
+                    bmi REAL,
+                    row_count INTEGER NOT NULL)''')
+
+    c.execute('''CREATE TRIGGER IF NOT EXISTS trg_progress_insert_latest AFTER INSERT ON progress
+                 BEGIN
+                    INSERT INTO member_latest (member_id, date, weight, bmi, row_count)
+                    VALUES (NEW.member_id, NEW.date, NEW.weight, NEW.bmi, 1)
+                    ON CONFLICT(member_id) DO UPDATE SET
+                        row_count = row_count + 1,
+                        weight = CASE WHEN excluded.date >= date THEN excluded.weight ELSE weight END,
+                        bmi = CASE WHEN excluded.date >= date THEN excluded.bmi ELSE bmi END,
+                        date = CASE WHEN excluded.date >= date THEN excluded.date ELSE date END;
+                 END''')
+
+    c.execute('''CREATE TRIGGER IF NOT EXISTS trg_progress_delete_latest AFTER DELETE ON progress
+                 BEGIN
+                    DELETE FROM member_latest WHERE member_id = OLD.member_id;
+                    INSERT INTO member_latest (member_id, date, weight, bmi, row_count)
+                    SELECT member_id, MAX(date), weight, bmi, COUNT(*) FROM progress
+                    WHERE member_id = OLD.member_id GROUP BY member_id;
+                 END''')
+
+    c.execute("DELETE FROM member_latest")
+    c.execute(LATEST_FROM_PROGRESS)
+
+
+# SQLite takes the bare weight/bmi columns from the row holding MAX(date)
+LATEST_FROM_PROGRESS = ("INSERT INTO member_latest (member_id, date, weight, bmi, row_count) "
+                        "SELECT member_id, MAX(date), weight, bmi, COUNT(*) FROM progress GROUP BY member_id")
+
+
+def _available_days_bitmask(c):
+    # available_weeks ("Monday, Thursday") becomes available_days, bit 0 = Monday ... bit 6 = Sunday
+    c.execute("ALTER TABLE trainers ADD COLUMN available_days INTEGER NOT NULL DEFAULT 0")
+    c.execute("UPDATE trainers SET available_days = " + " | ".join(
+        f"(CASE WHEN instr(available_weeks, '{day}') THEN {1 << bit} ELSE 0 END)"
+        for bit, day in enumerate(["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"])))
+    c.execute("ALTER TABLE trainers DROP COLUMN available_weeks")
+    c.execute("DROP INDEX IF EXISTS idx_trainers_expertise")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_trainers_expertise_days ON trainers(expertise, available_days)")
+
+
+def _create_rollups(c):
+    # Weekly rollups of progress for the analytics dashboard; analytics.refresh() fills them
+    # incrementally from rollup_state.last_rowid, so the first refresh backfills existing rows
+    c.execute('''CREATE TABLE IF NOT EXISTS rollup_trainer_week (
+                    week TEXT NOT NULL,
+                    trainer_id INTEGER NOT NULL,
+                    n INTEGER NOT NULL,
+                    weight_sum REAL NOT NULL,
+                    bmi_sum REAL NOT NULL,
+                    PRIMARY KEY (week, trainer_id)) WITHOUT ROWID''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_rollup_trainer_week_trainer ON rollup_trainer_week(trainer_id, week)")
+
+    c.execute('''CREATE TABLE IF NOT EXISTS rollup_goal_week (
+                    week TEXT NOT NULL,
+                    goal TEXT NOT NULL,
+                    n INTEGER NOT NULL,
+                    weight_sum REAL NOT NULL,
+                    bmi_sum REAL NOT NULL,
+                    PRIMARY KEY (week, goal)) WITHOUT ROWID''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS rollup_histogram (
+                    week TEXT NOT NULL,
+                    goal TEXT NOT NULL,
+                    measure TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    n INTEGER NOT NULL,
+                    PRIMARY KEY (week, goal, measure, bucket)) WITHOUT ROWID''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS rollup_state (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    last_rowid INTEGER NOT NULL,
+                    stale INTEGER NOT NULL)''')
+    c.execute("INSERT OR IGNORE INTO rollup_state (id, last_rowid, stale) VALUES (1, 0, 0)")
+
+    # Deleting rows already rolled up, or SQLite handing their rowids out again, forces a rebuild
+    c.execute('''CREATE TRIGGER IF NOT EXISTS trg_progress_delete_rollup AFTER DELETE ON progress
+                 WHEN OLD.rowid <= (SELECT last_rowid FROM rollup_state)
+                 BEGIN
+                    UPDATE rollup_state SET stale = 1;
+                 END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS trg_progress_insert_rollup AFTER INSERT ON progress
+                 WHEN NEW.rowid <= (SELECT last_rowid FROM rollup_state)
+                 BEGIN
+                    UPDATE rollup_state SET stale = 1;
+                 END''')
+
+
+def _create_member_search(c):
+    # Full-text index over member names for type-ahead search. External content: the names stay
+    # in members only and triggers keep the index in step. prefix= adds 1-3 character prefix
+    # indexes, so the first keystrokes of a name are single lookups instead of term scans.
+    c.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS member_search USING fts5(
+                    name, content='members', content_rowid='member_id', prefix='1 2 3')''')
+    c.execute("INSERT INTO member_search (member_search) VALUES ('rebuild')")
+
+    # Bulk loaders set deferred and index their rows in one statement (search.deferred_indexing)
+    c.execute('''CREATE TABLE IF NOT EXISTS member_search_state (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    deferred INTEGER NOT NULL)''')
+    c.execute("INSERT OR IGNORE INTO member_search_state (id, deferred) VALUES (1, 0)")
+
+    c.execute('''CREATE TRIGGER IF NOT EXISTS trg_members_insert_search AFTER INSERT ON members
+                 WHEN (SELECT deferred FROM member_search_state) = 0
+                 BEGIN
+                    INSERT INTO member_search (rowid, name) VALUES (NEW.member_id, NEW.name);
+                 END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS trg_members_delete_search AFTER DELETE ON members
+                 BEGIN
+                    INSERT INTO member_search (member_search, rowid, name) VALUES ('delete', OLD.member_id, OLD.name);
+                 END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS trg_members_rename_search AFTER UPDATE OF name ON members
+                 BEGIN
+                    INSERT INTO member_search (member_search, rowid, name) VALUES ('delete', OLD.member_id, OLD.name);
+                    INSERT INTO member_search (rowid, name) VALUES (NEW.member_id, NEW.name);
+                 END''')
+
+
+def _create_listing_indexes(c):
+    # Filtered, sorted pages of the member and trainer browsers (paging.py) read these in sort
+    # order and stop after one page; the rowid every index ends with is the keyset tie-breaker
+    c.execute("CREATE INDEX IF NOT EXISTS idx_members_goal_name ON members(goal, name)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_members_trainer_name ON members(trainer_id, name)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_members_trainer_goal ON members(trainer_id, goal)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_trainers_name ON trainers(name)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_trainers_expertise_name ON trainers(expertise, name)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_trainers_expertise ON trainers(expertise)")
+
+
+MIGRATIONS = [
+    _create_tables,
+    _create_indexes,
+    _create_goal_index,
+    _create_member_latest,
+    _available_days_bitmask,
+    _create_rollups,
+    _create_member_search,
+    _create_listing_indexes,
+]
+LATEST_VERSION = len(MIGRATIONS)
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, target=LATEST_VERSION):
+    # Applies every pending migration in its own transaction and returns the resulting version
+    version = schema_version(conn)
+    if version > LATEST_VERSION:
+        raise RuntimeError(f"Database schema version {version} is newer than this application ({LATEST_VERSION}).")
+
+    if conn.in_transaction:
+        conn.commit()
+    for number in range(version + 1, target + 1):
+        c = conn.cursor()
+        c.execute("BEGIN")
+        try:
+            MIGRATIONS[number - 1](c)
+            c.execute(f"PRAGMA user_version = {number}")
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        version = number
+    return version
+
+
+# Lookups the application runs per member or per click; none of them may fall back to a table
+# scan or sort their rows in a temporary b-tree
+MEMBER_PAGE = ("SELECT m.member_id, m.name, t.name FROM members m LEFT JOIN trainers t ON m.trainer_id = t.trainer_id "
+               "WHERE {} = ? ORDER BY {}, m.member_id LIMIT 200")
+TRAINER_PAGE = "SELECT trainer_id, name, available_days FROM trainers WHERE expertise = ? ORDER BY {}, trainer_id LIMIT 200"
+
+HOT_QUERIES = {
+    "trainer by expertise": ("SELECT trainer_id FROM trainers WHERE expertise = ?", ("Yoga",)),
+    "trainers by expertise and days": ("SELECT trainer_id FROM trainers WHERE expertise = ? AND available_days & ? = ?",
+                                       ("Yoga", 8, 8)),
+    "member by name": ("SELECT trainer_id FROM members WHERE name = ?", ("Member 1",)),
+    "members of trainer": ("SELECT member_id FROM members WHERE trainer_id = ?", (1,)),
+    "members by goal": ("SELECT member_id FROM members WHERE goal = ? ORDER BY member_id LIMIT 200", ("Mindfulness",)),
+    "unassigned members": ("SELECT member_id, goal FROM members WHERE trainer_id IS NULL", ()),
+    "last progress date": ("SELECT date FROM progress WHERE member_id = ? ORDER BY date DESC LIMIT 1", (1,)),
+    "member profile": ("SELECT m.name, t.name, l.date, l.weight "
+                       "FROM members m "
+                       "LEFT JOIN trainers t ON m.trainer_id = t.trainer_id "
+                       "LEFT JOIN member_latest l ON m.member_id = l.member_id "
+                       "WHERE m.member_id = ?", (1,)),
+    "progress page": ("SELECT date, weight, bmi FROM progress WHERE member_id = ? AND (date, rowid) > (?, ?) "
+                      "ORDER BY date, rowid LIMIT 200", (1, "", 0)),
+    "trainer weekly trend": ("SELECT week, n FROM rollup_trainer_week WHERE trainer_id = ? ORDER BY week", (1,)),
+    "member page by goal": (MEMBER_PAGE.format("m.goal", "m.member_id"), ("Mindfulness",)),
+    "member page by goal, by name": (MEMBER_PAGE.format("m.goal", "m.name"), ("Mindfulness",)),
+    "member page by trainer": (MEMBER_PAGE.format("m.trainer_id", "m.member_id"), (1,)),
+    "member page by trainer, by name": (MEMBER_PAGE.format("m.trainer_id", "m.name"), (1,)),
+    "member page by trainer, by goal": (MEMBER_PAGE.format("m.trainer_id", "m.goal"), (1,)),
+    "trainer page by expertise": (TRAINER_PAGE.format("trainer_id"), ("Yoga",)),
+    "trainer page by expertise, by name": (TRAINER_PAGE.format("name"), ("Yoga",)),
+}
+
+
+def query_plan(conn, sql, parameters=()):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, parameters)]
+
+
+def full_scans(conn, queries=HOT_QUERIES):
+    # Maps query name -> plan steps that scan a whole table or index, or sort into a temp b-tree
+    scans = {}
+    for name, (sql, parameters) in queries.items():
+        steps = [step for step in query_plan(conn, sql, parameters)
+                 if step.startswith("SCAN ") or step.startswith("USE TEMP B-TREE")]
+        if steps:
+            scans[name] = steps
+    return scans
+
+
+def _print_plans(title, conn):
+    print(title)
+    for name, (sql, parameters) in HOT_QUERIES.items():
+        print(f"  {name}:")
+        try:
+            steps = query_plan(conn, sql, parameters)
+        except sqlite3.OperationalError as e:  # column added by a later migration
+            steps = [f"n/a ({e})"]
+        for step in steps:
+            print(f"    {step}")
+
+
+def check_query_plans():
+    # Prints the hot query plans on the unindexed and the latest schema; returns the scans left over
+    before = sqlite3.connect(':memory:')
+    migrate(before, target=1)
+    after = sqlite3.connect(':memory:')
+    migrate(after)
+
+    _print_plans("Before (schema version 1):", before)
+    _print_plans(f"After (schema version {LATEST_VERSION}):", after)
+    scans = full_scans(after)
+    before.close()
+    after.close()
+    return scans
+
+
+if __name__ == "__main__":
+    scans = check_query_plans()
+    if scans:
+        for name, steps in scans.items():
+            print(f"Full scan in '{name}': {'; '.join(steps)}")
+        sys.exit(1)
+    print("No full table scans in hot queries.")
@@ -0,0 +1,139 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import simulation
+
+# Monte Carlo scenario runner. Every replica perturbs the weekly goal rates and draws a weekly
+# adherence per member, then compounds weight week by week like simulation.simulate_horizon.
+# The roster lives in one shared-memory block that workers attach to once, so tasks only carry
+# a seed and a replica count. Results are the per-replica mean final weight/BMI of every goal and
+# trainer, summarised as percentiles across replicas.
+
+RATE_NOISE = 0.25  # relative standard deviation of each goal's weekly rate, per replica
+ADHERENCE = (8.0, 2.0)  # Beta(a, b) share of the planned weekly change a member achieves (mean 0.8)
+PERCENTILES = (5, 50, 95)
+REPLICAS_PER_TASK = 16
+
+# Roster columns in the shared matrix
+WEIGHT, HEIGHT, RATE_CODE, ACTIVITY, GOAL, TRAINER = range(6)
+
+ROSTER_QUERY = ("SELECT COALESCE(l.weight, m.weight), m.height, m.goal, m.activity_level, m.trainer_id "
+                "FROM members m "
+                "LEFT JOIN member_latest l ON m.member_id = l.member_id "
+                "WHERE m.trainer_id IS NOT NULL")
+
+
+class ScenarioResult:
+    def __init__(self, replicas, weeks, seconds, goals, trainers):
+        self.replicas = replicas
+        self.weeks = weeks
+        self.seconds = seconds
+        # {goal or trainer_id: {"members": n, "weight": (p5, p50, p95), "bmi": (p5, p50, p95)}}
+        self.goals = goals
+        self.trainers = trainers
+
+    @property
+    def replicas_per_second(self):
+        return self.replicas / self.seconds if self.seconds else float('inf')
+
+
+def load_roster(conn):
+    # Returns (roster matrix, goal labels, trainer ids); goal/trainer columns index into the labels
+    rows = conn.execute(ROSTER_QUERY).fetchall()
+    roster = np.empty((len(rows), 6), dtype=np.float64)
+    if not rows:
+        return roster, [], []
+    weights, heights, goals, activity_levels, trainer_ids = zip(*rows)
+    goal_labels, goal_index = np.unique(np.array(goals, dtype=object).astype(str), return_inverse=True)
+    trainer_labels, trainer_index = np.unique(np.array(trainer_ids, dtype=np.int64), return_inverse=True)
+    roster[:, WEIGHT] = weights
+    roster[:, HEIGHT] = heights
+    roster[:, RATE_CODE] = [simulation.GOAL_CODES.get(goal, 0) for goal in goals]
+    roster[:, ACTIVITY] = activity_levels
+    roster[:, GOAL] = goal_index
+    roster[:, TRAINER] = trainer_index
+    return roster, goal_labels.tolist(), trainer_labels.tolist()
+
+
+# Worker state, set once per process by _attach()
+_shm = None
+_roster = None
+
+
+def _attach(name, shape):
+    global _shm, _roster
+    _shm = shared_memory.SharedMemory(name=name)
+    _roster = np.ndarray(shape, dtype=np.float64, buffer=_shm.buf)
+
+
+def run_replicas(roster, seed, replicas, weeks, n_goals, n_trainers):
+    # Returns per-replica group means: weight/BMI by goal (replicas x n_goals) and by trainer
+    rng = np.random.default_rng(seed)
+    height = roster[:, HEIGHT]
+    codes = roster[:, RATE_CODE].astype(np.intp)
+    activity = 1 + (roster[:, ACTIVITY] - 5) * 0.1
+    goal = roster[:, GOAL].astype(np.intp)
+    trainer = roster[:, TRAINER].astype(np.intp)
+    goal_counts = np.bincount(goal, minlength=n_goals)
+    trainer_counts = np.bincount(trainer, minlength=n_trainers)
+
+    out = {key: np.empty((replicas, n)) for key, n in (("goal_weight", n_goals), ("goal_bmi", n_goals),
+                                                        ("trainer_weight", n_trainers), ("trainer_bmi", n_trainers))}
+    for r in range(replicas):
+        rates = simulation.RATE_TABLE * (1 + rng.normal(0.0, RATE_NOISE, len(simulation.RATE_TABLE)))
+        step = rates[codes] * activity
+        weight = roster[:, WEIGHT].copy()
+        for _ in range(weeks):
+            weight += weight * step * rng.beta(*ADHERENCE, len(weight))
+        bmi = weight / ((height / 100) ** 2)
+        out["goal_weight"][r] = np.bincount(goal, weight, n_goals) / goal_counts
+        out["goal_bmi"][r] = np.bincount(goal, bmi, n_goals) / goal_counts
+        out["trainer_weight"][r] = np.bincount(trainer, weight, n_trainers) / trainer_counts
+        out["trainer_bmi"][r] = np.bincount(trainer, bmi, n_trainers) / trainer_counts
+    return out
+
+
+def _run_task(seed, replicas, weeks, n_goals, n_trainers):
+    return run_replicas(_roster, seed, replicas, weeks, n_goals, n_trainers)
+
+
+def _summarise(labels, counts, weight, bmi):
+    weight_p = np.percentile(weight, PERCENTILES, axis=0)
+    bmi_p = np.percentile(bmi, PERCENTILES, axis=0)
+    return {label: {"members": int(counts[i]),
+                    "weight": tuple(weight_p[:, i].tolist()),
+                    "bmi": tuple(bmi_p[:, i].tolist())}
+            for i, label in enumerate(labels)}
+
+
+def run_scenarios(conn, weeks, replicas=1000, seed=None, processes=None):
+    start = time.perf_counter()
+    roster, goals, trainers = load_roster(conn)
+    if not len(roster):
+        return ScenarioResult(0, weeks, 0.0, {}, {})
+
+    # Fixed-size tasks with spawned seeds give the same answer for any number of processes
+    tasks = [min(REPLICAS_PER_TASK, replicas - i) for i in range(0, replicas, REPLICAS_PER_TASK)]
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks))
+
+    shm = shared_memory.SharedMemory(create=True, size=roster.nbytes)
+    try:
+        np.ndarray(roster.shape, dtype=np.float64, buffer=shm.buf)[:] = roster
+        with ProcessPoolExecutor(max_workers=processes or os.cpu_count(),
+                                 initializer=_attach, initargs=(shm.name, roster.shape)) as pool:
+            futures = [pool.submit(_run_task, s, n, weeks, len(goals), len(trainers)) for s, n in zip(seeds, tasks)]
+            parts = [future.result() for future in futures]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    merged = {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+    goal_counts = np.bincount(roster[:, GOAL].astype(np.intp), minlength=len(goals))
+    trainer_counts = np.bincount(roster[:, TRAINER].astype(np.intp), minlength=len(trainers))
+    return ScenarioResult(replicas, weeks, time.perf_counter() - start,
+                          _summarise(goals, goal_counts, merged["goal_weight"], merged["goal_bmi"]),
+                          _summarise(trainers, trainer_counts, merged["trainer_weight"], merged["trainer_bmi"]))
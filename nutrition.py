@@ -0,0 +1,59 @@
+import time
+
+import numpy as np
+
+import core
+
+# Batch form of core.nutrition_needs: one (goals x nutrients) coefficient matrix, so the
+# daily needs of a whole roster are a single gather and multiply. Goals outside the table get the
+# General Health row, like the single-member calculator.
+
+GOALS = list(core.NUTRITION_COEFFICIENTS)
+GOAL_CODES = {goal: code for code, goal in enumerate(GOALS)}
+DEFAULT_CODE = GOAL_CODES["General Health"]
+COEFFICIENTS = np.array([core.NUTRITION_COEFFICIENTS[goal] for goal in GOALS], dtype=np.float64)
+
+# One UPDATE over members: coefficients by goal from a temp table, weight from member_latest
+# where the member has simulated progress and from members otherwise
+RECOMPUTE_UPDATE = ("UPDATE members SET protein_needed = n.protein, carb_needed = n.carb, fiber_needed = n.fiber "
+                    "FROM (SELECT m.member_id, "
+                    "             COALESCE(c.protein, d.protein) * COALESCE(l.weight, m.weight) AS protein, "
+                    "             COALESCE(c.carb, d.carb) * COALESCE(l.weight, m.weight) AS carb, "
+                    "             COALESCE(c.fiber, d.fiber) * COALESCE(l.weight, m.weight) AS fiber "
+                    "      FROM members m "
+                    "      JOIN temp.nutrition_coefficients d ON d.goal = 'General Health' "
+                    "      LEFT JOIN temp.nutrition_coefficients c ON c.goal = m.goal "
+                    "      LEFT JOIN member_latest l ON l.member_id = m.member_id) AS n "
+                    "WHERE members.member_id = n.member_id")
+
+
+class RecomputeReport:
+    def __init__(self, members, seconds):
+        self.members = members
+        self.seconds = seconds
+
+    def __str__(self):
+        return f"Recomputed nutrition for {self.members} member(s) in {self.seconds:.2f}s"
+
+
+def goal_codes(goals):
+    return np.fromiter((GOAL_CODES.get(goal, DEFAULT_CODE) for goal in goals), dtype=np.intp, count=len(goals))
+
+
+def nutrition_table(goals, weights):
+    # (n, 3) array of protein, carb and fiber for n members, columns in core.NUTRIENTS order
+    return COEFFICIENTS[goal_codes(goals)] * np.asarray(weights, dtype=np.float64)[:, None]
+
+
+def recompute(conn, on_written=None):
+    start = time.perf_counter()
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS nutrition_coefficients "
+                 "(goal TEXT PRIMARY KEY, protein REAL, carb REAL, fiber REAL)")
+    with conn:
+        conn.execute("DELETE FROM temp.nutrition_coefficients")
+        conn.executemany("INSERT INTO temp.nutrition_coefficients VALUES (?, ?, ?, ?)",
+                         [(goal, *coefficients) for goal, coefficients in core.NUTRITION_COEFFICIENTS.items()])
+        members = conn.execute(RECOMPUTE_UPDATE).rowcount
+    if on_written:
+        on_written(None)
+    return RecomputeReport(members, time.perf_counter() - start)
@@ -0,0 +1,84 @@
+import core
+
+# Keyset pagination over the members and trainers tables. A page is addressed by the
+# (sort value, id) of the row just before or after it, so fetching page N costs the same as
+# page 1 and nothing but the current window of rows is ever held in memory.
+
+PAGE_SIZE = 200
+
+
+class Listing:
+    def __init__(self, source, key, columns, sort_keys, filters):
+        self.source = source  # FROM clause
+        self.key = key  # unique id expression, the keyset tie-breaker
+        self.columns = columns  # [(heading, expression)]
+        self.sort_keys = sort_keys  # heading -> expression; only indexed, non-null columns
+        self.filters = filters  # filter name -> expression compared with '=', or a condition with its own '?'
+
+    @property
+    def headings(self):
+        return [heading for heading, _ in self.columns]
+
+
+MEMBERS = Listing(
+    "members m LEFT JOIN trainers t ON m.trainer_id = t.trainer_id",
+    "m.member_id",
+    [("ID", "m.member_id"), ("Name", "m.name"), ("Goal", "m.goal"), ("Weight", "m.weight"),
+     ("Height", "m.height"), ("Trainer ID", "m.trainer_id"), ("Trainer", "t.name"), ("Expertise", "t.expertise")],
+    {"ID": "m.member_id", "Name": "m.name", "Goal": "m.goal"},
+    {"goal": "m.goal", "trainer": "m.trainer_id", "expertise": "t.expertise"},
+)
+
+# Day names from the available_days bitmask, e.g. "Monday, Thursday"
+AVAILABLE_DAYS = "rtrim({}, ', ')".format(" || ".join(
+    f"(CASE WHEN t.available_days & {bit} THEN '{day}, ' ELSE '' END)" for day, bit in core.DAY_BITS.items()))
+
+TRAINERS = Listing(
+    "trainers t",
+    "t.trainer_id",
+    [("ID", "t.trainer_id"), ("Name", "t.name"), ("Expertise", "t.expertise"), ("Available days", AVAILABLE_DAYS)],
+    {"ID": "t.trainer_id", "Name": "t.name", "Expertise": "t.expertise"},
+    {"expertise": "t.expertise", "day": "t.available_days & ? != 0"},
+)
+
+
+def page_query(listing, sort, descending=False, filters=None, after=None, before=None, limit=PAGE_SIZE):
+    # Returns (sql, parameters). Rows carry the sort value as an extra last column;
+    # pass (sort value, id) of a boundary row as after= or before= to move through the table.
+    sort_expr = listing.sort_keys[sort]
+    columns = ", ".join(expression for _, expression in listing.columns)
+    where, parameters = [], []
+    for name, value in (filters or {}).items():
+        if value not in (None, ""):
+            expression = listing.filters[name]
+            where.append(expression if "?" in expression else f"{expression} = ?")
+            parameters.append(value)
+
+    # Walking backwards means reading the opposite order and reversing the page afterwards
+    forward = before is None
+    ascending = forward != descending
+    if after is not None or before is not None:
+        where.append(f"({sort_expr}, {listing.key}) {'>' if ascending else '<'} (?, ?)")
+        parameters.extend(after if forward else before)
+
+    direction = "ASC" if ascending else "DESC"
+    sql = f"SELECT {columns}, {sort_expr} FROM {listing.source}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {sort_expr} {direction}, {listing.key} {direction} LIMIT ?"
+    parameters.append(limit)
+    return sql, parameters
+
+
+def fetch_page(db, listing, sort, descending=False, filters=None, after=None, before=None, limit=PAGE_SIZE):
+    sql, parameters = page_query(listing, sort, descending, filters, after, before, limit)
+    rows = db.query(sql, parameters)
+    if before is not None:
+        rows.reverse()
+    return rows
+
+
+def page_bounds(listing, rows):
+    # (sort value, id) of the first and last row, for the neighbouring page requests
+    key_index = listing.headings.index("ID")
+    return (rows[0][-1], rows[0][key_index]), (rows[-1][-1], rows[-1][key_index])
@@ -0,0 +1,181 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+import series
+
+# Member progress chart: weight and BMI over time on one canvas, two panels sharing the date
+# axis. Every redraw reads only the rows inside the visible date range and downsamples each
+# series to the panel's pixel width, so drawing cost stays flat however long the history is.
+# Mouse wheel zooms around the pointer, dragging pans, and the From / To fields set the range.
+
+REDRAW_DELAY_MS = 30  # redraw requests closer together than this (resize, wheel, drag) are coalesced
+ZOOM_STEP = 1.25
+MIN_SPAN_DAYS = 14
+MARGIN_LEFT, MARGIN_RIGHT, MARGIN_TOP, MARGIN_BOTTOM = 60, 20, 20, 30
+PANEL_GAP = 30
+Y_TICKS = 4
+X_TICKS = 6
+PANELS = (("Weight (kg)", "#1f77b4"), ("BMI", "#d62728"))
+
+
+class ProgressChartWindow:
+    def __init__(self, root, db, member_id, title, summary=()):
+        self.db = db
+        self.member_id = member_id
+        with db.reader() as conn:
+            self.bounds = series.date_bounds(conn, member_id)
+
+        self.window = tk.Toplevel(root)
+        self.window.title(title)
+        self.window.geometry("900x600")
+        self.window.columnconfigure(0, weight=1)
+        self.window.rowconfigure(2, weight=1)
+
+        if summary:
+            ttk.Label(self.window, text="   ".join(summary), padding=5, wraplength=880).grid(row=0, column=0, sticky='w')
+
+        controls = ttk.Frame(self.window, padding=5)
+        controls.grid(row=1, column=0, sticky='ew')
+        ttk.Label(controls, text="From:").pack(side=tk.LEFT)
+        self.start_text = tk.StringVar()
+        ttk.Entry(controls, textvariable=self.start_text, width=12).pack(side=tk.LEFT, padx=5)
+        ttk.Label(controls, text="To:").pack(side=tk.LEFT)
+        self.end_text = tk.StringVar()
+        ttk.Entry(controls, textvariable=self.end_text, width=12).pack(side=tk.LEFT, padx=5)
+        ttk.Button(controls, text="Apply", command=self.apply_range).pack(side=tk.LEFT, padx=5)
+        ttk.Button(controls, text="All", command=self.show_all).pack(side=tk.LEFT)
+        self.status = tk.StringVar()
+        ttk.Label(controls, textvariable=self.status).pack(side=tk.RIGHT)
+
+        self.canvas = tk.Canvas(self.window, background="white", highlightthickness=0)
+        self.canvas.grid(row=2, column=0, sticky='nsew')
+        self.canvas.bind("<Configure>", lambda event: self.schedule_redraw())
+        self.canvas.bind("<MouseWheel>", lambda event: self.zoom(event.x, event.delta < 0))
+        self.canvas.bind("<Button-4>", lambda event: self.zoom(event.x, False))
+        self.canvas.bind("<Button-5>", lambda event: self.zoom(event.x, True))
+        self.canvas.bind("<ButtonPress-1>", self.start_drag)
+        self.canvas.bind("<B1-Motion>", self.drag)
+
+        self._pending = None
+        self._drag = None
+        self.start = self.end = None
+        self.show_all()
+
+    # Visible range, in days since 1970-01-01
+
+    def set_range(self, start, end):
+        if self.bounds is None:
+            return
+        first, last, _ = self.bounds
+        span = max(end - start, MIN_SPAN_DAYS)
+        # Keep the window inside the history, shifting rather than shrinking it at the edges
+        full = max(last - first, MIN_SPAN_DAYS)
+        span = min(span, full)
+        start = min(max(start, first), first + full - span)
+        self.start, self.end = start, start + span
+        self.start_text.set(series.to_date(int(self.start)))
+        self.end_text.set(series.to_date(int(self.end)))
+        self.schedule_redraw()
+
+    def show_all(self):
+        if self.bounds is None:
+            self.status.set("No progress recorded.")
+            return
+        first, last, _ = self.bounds
+        self.set_range(first, last)
+
+    def apply_range(self):
+        try:
+            start, end = series.to_day(self.start_text.get().strip()), series.to_day(self.end_text.get().strip())
+        except ValueError:
+            messagebox.showerror("Input Error", "Dates must be YYYY-MM-DD.", parent=self.window)
+            return
+        if end <= start:
+            messagebox.showerror("Input Error", "The end date must be after the start date.", parent=self.window)
+            return
+        self.set_range(start, end)
+
+    def _plot_width(self):
+        return max(self.canvas.winfo_width() - MARGIN_LEFT - MARGIN_RIGHT, 1)
+
+    def _day_at(self, x):
+        return self.start + (x - MARGIN_LEFT) / self._plot_width() * (self.end - self.start)
+
+    def zoom(self, x, out):
+        if self.start is None:
+            return
+        anchor = self._day_at(min(max(x, MARGIN_LEFT), MARGIN_LEFT + self._plot_width()))
+        factor = ZOOM_STEP if out else 1 / ZOOM_STEP
+        self.set_range(anchor - (anchor - self.start) * factor, anchor + (self.end - anchor) * factor)
+
+    def start_drag(self, event):
+        self._drag = (event.x, self.start, self.end)
+
+    def drag(self, event):
+        if self._drag is None or self.start is None:
+            return
+        x, start, end = self._drag
+        shift = (x - event.x) / self._plot_width() * (end - start)
+        self.set_range(start + shift, end + shift)
+
+    # Drawing
+
+    def schedule_redraw(self):
+        if self._pending is not None:
+            self.window.after_cancel(self._pending)
+        self._pending = self.window.after(REDRAW_DELAY_MS, self.redraw)
+
+    def redraw(self):
+        self._pending = None
+        self.canvas.delete("all")
+        if self.start is None:
+            return
+        width, height = self._plot_width(), self.canvas.winfo_height()
+        panel_height = (height - MARGIN_TOP - MARGIN_BOTTOM - PANEL_GAP) / len(PANELS)
+        if panel_height < 20:
+            return
+
+        with self.db.reader() as conn:
+            days, weight, bmi = series.progress_window(conn, self.member_id, int(self.start), int(self.end), padded=True)
+        shown = 0
+        for i, ((label, colour), values) in enumerate(zip(PANELS, (weight, bmi))):
+            top = MARGIN_TOP + i * (panel_height + PANEL_GAP)
+            x, y = series.clip(*series.downsample(days, values, width), self.start, self.end)
+            shown = max(shown, len(x))
+            self._draw_panel(top, panel_height, width, label, colour, x, y)
+        self._draw_date_axis(MARGIN_TOP + len(PANELS) * panel_height + PANEL_GAP * (len(PANELS) - 1), width)
+        self.status.set(f"Drawing {shown} of {len(days)} point(s) around the range, {self.bounds[2]} in total")
+
+    def _draw_panel(self, top, panel_height, width, label, colour, x, y):
+        bottom = top + panel_height
+        self.canvas.create_rectangle(MARGIN_LEFT, top, MARGIN_LEFT + width, bottom, outline="#999999")
+        self.canvas.create_text(MARGIN_LEFT + 5, top + 3, text=label, anchor='nw', fill=colour)
+        if not len(x):
+            return
+        low, high = float(y.min()), float(y.max())
+        if high - low < 1e-9:
+            low, high = low - 1, high + 1
+        for tick in range(Y_TICKS + 1):
+            value = low + (high - low) * tick / Y_TICKS
+            ty = bottom - (value - low) / (high - low) * panel_height
+            self.canvas.create_line(MARGIN_LEFT - 4, ty, MARGIN_LEFT, ty, fill="#999999")
+            self.canvas.create_text(MARGIN_LEFT - 6, ty, text=f"{value:.1f}", anchor='e', font=("TkDefaultFont", 8))
+
+        scale_x = width / (self.end - self.start)
+        scale_y = panel_height / (high - low)
+        coords = []
+        for day, value in zip(x.tolist(), y.tolist()):
+            coords.append(MARGIN_LEFT + (day - self.start) * scale_x)
+            coords.append(bottom - (value - low) * scale_y)
+        if len(coords) >= 4:
+            self.canvas.create_line(*coords, fill=colour, width=1.5)
+        else:
+            cx, cy = coords
+            self.canvas.create_oval(cx - 2, cy - 2, cx + 2, cy + 2, fill=colour, outline=colour)
+
+    def _draw_date_axis(self, y, width):
+        for tick in range(X_TICKS + 1):
+            day = self.start + (self.end - self.start) * tick / X_TICKS
+            x = MARGIN_LEFT + width * tick / X_TICKS
+            self.canvas.create_line(x, y, x, y + 4, fill="#999999")
+            self.canvas.create_text(x, y + 6, text=series.to_date(int(round(day))), anchor='n', font=("TkDefaultFont", 8))
@@ -0,0 +1,104 @@
+import itertools
+import sqlite3
+import time
+
+import core
+import database
+import migrations
+
+# What-if sandbox: the whole database copied into an in-memory connection with the sqlite backup
+# API. Simulations and assignments then run against sandbox.db at memory speed and never touch
+# the file. Named snapshots are further in-memory copies to roll back to. commit() copies the
+# sandbox back over the file a batch of pages per backup step; the file is in WAL mode, so its
+# readers keep seeing the old contents until the copy completes and are never blocked by it.
+# The sandbox is a named shared-cache database, so it has a reader pool of its own and reads
+# never wait for a sandbox write; they see its uncommitted rows instead.
+
+LOAD_PAGES = 4096  # pages per backup step while loading, between progress reports
+COMMIT_PAGES = 1024  # pages per backup step while committing
+COMMIT_SLEEP = 0.0  # seconds to pause between commit steps
+
+_names = itertools.count(1)
+
+
+def _copy(source, target, pages, progress=None, sleep=0.0):
+    # Backup-API copy of a whole database, reporting (pages copied, total pages) between steps.
+    # The step that copies the last page also commits the target, so nothing is reported after it
+    # and a cancel can only come while the target still holds its old contents.
+    report = None
+    if progress:
+        def report(status, remaining, total):
+            if remaining:
+                progress(total - remaining, total)
+    source.backup(target, pages=pages, progress=report, sleep=sleep)
+
+
+class Sandbox:
+    def __init__(self, path=database.DB_PATH, progress=None):
+        self.path = path
+        self.db = database.Database(database.SHARED_MEMORY_URI.format(name=f"sandbox-{next(_names)}"))
+        self.snapshots = {}  # name -> (time taken, in-memory connection)
+        # Kept open to notice commits to the file made after loading (PRAGMA data_version)
+        self._source = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        start = time.perf_counter()
+        with self.db.transaction() as conn:
+            self._loaded_version = self._source_version()
+            _copy(self._source, conn, LOAD_PAGES, progress)
+            migrations.migrate(conn)
+        self.load_seconds = time.perf_counter() - start
+
+    def _source_version(self):
+        self._source.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        return self._source.execute("PRAGMA data_version").fetchone()[0]
+
+    @property
+    def source_changed(self):
+        # True once another connection has committed to the file since it was loaded or last committed to
+        return self._source_version() != self._loaded_version
+
+    def snapshot(self, name):
+        copy = sqlite3.connect(":memory:", check_same_thread=False)
+        with self.db.transaction() as conn:
+            _copy(conn, copy, -1)
+        previous = self.snapshots.pop(name, None)
+        if previous is not None:
+            previous[1].close()
+        self.snapshots[name] = (time.strftime("%H:%M:%S"), copy)
+
+    def restore(self, name):
+        if name not in self.snapshots:
+            raise core.GymError(f"No snapshot named {name!r}.")
+        # Readers wait here: the copy rewrites the schema too, which even uncommitted reads lock on
+        with self.db.readers_paused(), self.db.transaction() as conn:
+            _copy(self.snapshots[name][1], conn, -1)
+        self.db.members_changed(None)
+
+    def drop(self, name):
+        _, copy = self.snapshots.pop(name)
+        copy.close()
+
+    def commit(self, force=False, progress=None):
+        # Copies the sandbox over the database file; refuses when the file changed since loading
+        # unless force, as those changes would be lost. Returns the seconds taken.
+        if self.source_changed and not force:
+            raise core.GymError(f"{self.path} has changed since the sandbox was loaded; "
+                                "committing would overwrite those changes.")
+        start = time.perf_counter()
+        target = sqlite3.connect(self.path, check_same_thread=False)
+        try:
+            for pragma in database.PRAGMAS:
+                target.execute(pragma)
+            with self.db.transaction() as conn:
+                _copy(conn, target, COMMIT_PAGES, progress, COMMIT_SLEEP)
+            target.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        finally:
+            target.close()
+        self._loaded_version = self._source_version()
+        return time.perf_counter() - start
+
+    def close(self):
+        for _, copy in self.snapshots.values():
+            copy.close()
+        self.snapshots.clear()
+        self._source.close()
+        self.db.close()
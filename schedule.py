@@ -0,0 +1,47 @@
+import core
+
+# Trainer availability queries over the available_days bitmask. Both run off
+# idx_trainers_expertise_days (expertise, available_days): the expertise lookup is an index
+# search and the day test is checked on the index entry, so only matching trainer rows are read.
+
+MEMBERS_PER_DAY = 25  # members a trainer can take for each day they work
+
+TRAINERS_WITH_ALL_DAYS = (f"SELECT {core.TRAINER_COLUMNS} FROM trainers "
+                          "WHERE expertise = ? AND available_days & ? = ? ORDER BY trainer_id")
+TRAINERS_WITH_ANY_DAY = (f"SELECT {core.TRAINER_COLUMNS} FROM trainers "
+                         "WHERE expertise = ? AND available_days & ? != 0 ORDER BY trainer_id")
+
+TRAINER_LOAD = ("SELECT t.trainer_id, t.available_days, COUNT(m.member_id) "
+                "FROM trainers t LEFT JOIN members m ON m.trainer_id = t.trainer_id "
+                "{where} GROUP BY t.trainer_id")
+
+
+def day_count(mask):
+    return bin(mask).count("1")
+
+
+def trainers_available(conn, expertise, mask, match_all=True):
+    # Rows in core.TRAINER_COLUMNS order
+    if match_all:
+        return conn.execute(TRAINERS_WITH_ALL_DAYS, (expertise, mask, mask)).fetchall()
+    return conn.execute(TRAINERS_WITH_ANY_DAY, (expertise, mask)).fetchall()
+
+
+def trainer_loads(conn, expertise=None):
+    # (trainer_id, available_days, members assigned) for every trainer, optionally of one expertise
+    if expertise is None:
+        return conn.execute(TRAINER_LOAD.format(where="")).fetchall()
+    return conn.execute(TRAINER_LOAD.format(where="WHERE t.expertise = ?"), (expertise,)).fetchall()
+
+
+def free_capacity_by_day(conn, expertise=None, members_per_day=MEMBERS_PER_DAY):
+    # A trainer's members are taken to be spread evenly over their working days
+    free = dict.fromkeys(core.WEEKDAYS, 0.0)
+    for _, mask, load in trainer_loads(conn, expertise):
+        days = day_count(mask)
+        if not days:
+            continue
+        per_day = max(members_per_day - load / days, 0.0)
+        for day in core.mask_days(mask):
+            free[day] += per_day
+    return {day: int(slots) for day, slots in free.items()}
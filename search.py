@@ -0,0 +1,59 @@
+import json
+from contextlib import contextmanager
+
+# Type-ahead member search over the member_search full-text index (migration 7). A trigger
+# indexes members added one at a time; bulk loaders wrap their inserts in deferred_indexing(),
+# which turns the trigger off and indexes the new rows with one INSERT ... SELECT instead,
+# several times faster than a trigger call per row.
+
+LIMIT = 20  # matches returned per lookup
+
+# Matches come back in member_id order, so LIMIT stops the index walk early; ranking them
+# would mean scoring every match first
+SEARCH = ("SELECT m.member_id, m.name FROM member_search s JOIN members m ON m.member_id = s.rowid "
+          "WHERE member_search MATCH ? LIMIT ?")
+BY_ID = "SELECT member_id, name FROM members WHERE member_id = ?"
+INDEX_AFTER = "INSERT INTO member_search (rowid, name) SELECT member_id, name FROM members WHERE member_id > ?"
+INDEX_IDS = ("INSERT INTO member_search (rowid, name) SELECT member_id, name FROM members "
+             "WHERE member_id IN (SELECT value FROM json_each(?))")
+
+
+def match_query(text):
+    # "jo smi" -> '"jo"* "smi"*': every word must start some word of the name, in any order.
+    # Punctuation separates words, as it does for the index tokenizer ("O'Brien" is "o brien").
+    words = "".join(ch if ch.isalnum() else " " for ch in text).split()
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search(conn, text, limit=LIMIT):
+    # Up to `limit` (member_id, name) pairs sorted by name; "#42" or "42" also finds member 42
+    query = match_query(text)
+    if not query:
+        return []
+    matches = conn.execute(SEARCH, (query, limit)).fetchall()
+    number = text.strip().lstrip("#")
+    if number.isdigit():
+        exact = conn.execute(BY_ID, (int(number),)).fetchall()
+        matches = exact + [match for match in matches if match not in exact][:limit - len(exact)]
+    return sorted(matches, key=lambda match: (match[1], match[0]))
+
+
+@contextmanager
+def deferred_indexing(conn):
+    # For a bulk insert into members inside an open transaction. Members above the highest id at
+    # the start, which is yielded, are indexed at the end; any inserted below it need index_members().
+    last_id = conn.execute("SELECT COALESCE(MAX(member_id), 0) FROM members").fetchone()[0]
+    conn.execute("UPDATE member_search_state SET deferred = 1")
+    yield last_id
+    conn.execute(INDEX_AFTER, (last_id,))
+    conn.execute("UPDATE member_search_state SET deferred = 0")
+
+
+def index_members(conn, member_ids):
+    if member_ids:
+        conn.execute(INDEX_IDS, (json.dumps(member_ids),))
+
+
+def rebuild(conn):
+    with conn:
+        conn.execute("INSERT INTO member_search (member_search) VALUES ('rebuild')")
@@ -0,0 +1,88 @@
+import numpy as np
+
+# Date-bounded progress windows and their downsampling for charts. A chart asks for the rows of
+# one member between two dates (an index range scan on idx_progress_member_date) and reduces
+# them to about one point per pixel with largest-triangle-three-buckets, which keeps the peaks
+# and troughs a plain stride would drop. Dates are carried as days since 1970-01-01.
+
+MIN_POINTS = 3  # LTTB needs the two end points and at least one bucket
+
+DATE_BOUNDS = "SELECT MIN(date), MAX(date), COUNT(*) FROM progress WHERE member_id = ?"
+PROGRESS_WINDOW = ("SELECT date, weight, bmi FROM progress WHERE member_id = ? AND date BETWEEN ? AND ? "
+                   "ORDER BY date ASC")
+# The same plus the nearest row on either side, so a chart's lines run on to the edges of its range
+PADDED_WINDOW = ("SELECT * FROM (SELECT date, weight, bmi FROM progress WHERE member_id = ?1 AND date < ?2 "
+                 "ORDER BY date DESC LIMIT 1) "
+                 "UNION ALL SELECT date, weight, bmi FROM progress WHERE member_id = ?1 AND date BETWEEN ?2 AND ?3 "
+                 "UNION ALL SELECT * FROM (SELECT date, weight, bmi FROM progress WHERE member_id = ?1 AND date > ?3 "
+                 "ORDER BY date ASC LIMIT 1)")
+
+
+def to_day(text):
+    return int(np.datetime64(text, 'D').astype(np.int64))
+
+
+def to_date(day):
+    return str(np.datetime64(int(day), 'D'))
+
+
+def date_bounds(conn, member_id):
+    # (first day, last day, rows) of a member's history, or None without any progress
+    first, last, rows = conn.execute(DATE_BOUNDS, (member_id,)).fetchone()
+    if not rows:
+        return None
+    return to_day(first), to_day(last), rows
+
+
+def progress_window(conn, member_id, start_day, end_day, padded=False):
+    # (days, weight, bmi) arrays in date order for the rows dated start_day..end_day inclusive
+    rows = conn.execute(PADDED_WINDOW if padded else PROGRESS_WINDOW,
+                        (member_id, to_date(start_day), to_date(end_day))).fetchall()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+    dates, weight, bmi = zip(*rows)
+    days = np.array(dates, dtype='datetime64[D]').astype(np.int64)
+    order = np.argsort(days, kind='stable')
+    return days[order], np.array(weight, dtype=np.float64)[order], np.array(bmi, dtype=np.float64)[order]
+
+
+def lttb(x, y, points):
+    # Indices of the `points` samples that largest-triangle-three-buckets keeps; x must be sorted
+    n = len(x)
+    if points >= n or points < MIN_POINTS:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Interior points split into points - 2 buckets; the first and last points are always kept
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    keep = np.empty(points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for i in range(points - 2):
+        low, high = edges[i], edges[i + 1]
+        # Third corner: the mean of the next bucket (the last point for the final bucket)
+        following = slice(high, edges[i + 2]) if i + 2 < len(edges) else slice(n - 1, n)
+        next_x, next_y = x[following].mean(), y[following].mean()
+        # Twice the triangle area for every candidate in this bucket; the constant factor does not matter
+        area = np.abs((x[previous] - next_x) * (y[low:high] - y[previous]) -
+                      (x[previous] - x[low:high]) * (next_y - y[previous]))
+        previous = low + int(area.argmax())
+        keep[i + 1] = previous
+    return keep
+
+
+def clip(x, y, start, end):
+    # Drops samples outside start..end, ending the line exactly on a boundary it crosses
+    inside = (x >= start) & (x <= end)
+    x_out, y_out = x[inside].astype(np.float64), y[inside]
+    if len(x) > 1 and x[0] < start:
+        x_out, y_out = np.r_[start, x_out], np.r_[np.interp(start, x, y), y_out]
+    if len(x) > 1 and x[-1] > end:
+        x_out, y_out = np.r_[x_out, end], np.r_[y_out, np.interp(end, x, y)]
+    return x_out, y_out
+
+
+def downsample(x, y, points):
+    # (x, y) reduced to at most `points` samples
+    keep = lttb(x, y, points)
+    return x[keep], y[keep]
@@ -0,0 +1,440 @@
+import argparse
+import asyncio
+import base64
+import dataclasses
+import json
+import logging
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+import analytics
+import core
+import database
+import instrumentation
+import paging
+import search
+import series
+import transfer
+
+# Local HTTP/JSON API over the gym database, on asyncio and the standard library only:
+#   python server.py --db gym_simulation.db --port 8080
+#   curl 'localhost:8080/members?goal=Mindfulness&limit=50'
+# The event loop only parses requests and writes responses. Reads run on a thread pool as wide as
+# the database's reader pool, each on a pooled read-only connection (WAL lets them run alongside
+# a write); writes go through one single-threaded executor to the one writer connection, so they
+# queue up in order instead of failing with "database is locked". Every request is timed per
+# route, and GET /stats returns the timings with the database counters.
+
+HOST = "127.0.0.1"
+PORT = 8080
+MAX_LIMIT = 1000  # rows per page a client may ask for
+MAX_BODY = 1 << 20
+KEEP_ALIVE_SECONDS = 30  # idle time before a persistent connection is closed
+SLOW_REQUEST_SECONDS = 0.5
+STATS_STATEMENTS = 20  # slowest statements listed by /stats
+DEFAULT_POINTS, MAX_POINTS = 500, 5000  # samples per series returned by /members/<id>/series
+
+REQUEST_TIMINGS = instrumentation.Timings()
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+# JSON field names for the paging.MEMBERS / paging.TRAINERS columns, in the same order
+MEMBER_FIELDS = ("member_id", "name", "goal", "weight", "height", "trainer_id", "trainer", "expertise")
+TRAINER_FIELDS = ("trainer_id", "name", "expertise", "available_days")
+MEMBER_SORTS = {"id": "ID", "name": "Name", "goal": "Goal"}
+TRAINER_SORTS = {"id": "ID", "name": "Name", "expertise": "Expertise"}
+# paging.TRAINERS with the raw available_days mask, listed by core.mask_days rather than parsed from text
+TRAINER_LISTING = paging.Listing(paging.TRAINERS.source, paging.TRAINERS.key,
+                                 paging.TRAINERS.columns[:-1] + [("Available days", "t.available_days")],
+                                 paging.TRAINERS.sort_keys, paging.TRAINERS.filters)
+
+# (date, rowid) keyset, so entries sharing a date are not skipped between pages
+PROGRESS_PAGE = ("SELECT date, weight, bmi, rowid FROM progress WHERE member_id = ? AND (date, rowid) > (?, ?) "
+                 "ORDER BY date ASC, rowid ASC LIMIT ?")
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Request:
+    def __init__(self, method, path, query, body):
+        self.method = method
+        self.path = path
+        self.query = query  # {name: value}; a repeated parameter keeps its last value
+        self.body = body
+
+    def arg(self, name, default=None, kind=str):
+        value = self.query.get(name)
+        if value in (None, ""):
+            return default
+        try:
+            return kind(value)
+        except ValueError:
+            raise HttpError(400, f"{name} must be {'an integer' if kind is int else 'a number'}, not {value!r}")
+
+    def limit(self):
+        return min(max(self.arg("limit", paging.PAGE_SIZE, int), 1), MAX_LIMIT)
+
+    def json(self):
+        try:
+            data = json.loads(self.body or b"{}")
+        except ValueError:
+            raise HttpError(400, "request body is not valid JSON")
+        if not isinstance(data, dict):
+            raise HttpError(400, "request body must be a JSON object")
+        return data
+
+
+# Page cursors are the (sort value, id) keyset boundary, opaque to clients
+
+def encode_cursor(boundary):
+    return base64.urlsafe_b64encode(json.dumps(boundary).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, kinds):
+    # kinds is the type of each boundary element, e.g. (str, int) for a (name, id) cursor
+    try:
+        value = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HttpError(400, "invalid cursor")
+    if not isinstance(value, list) or len(value) != len(kinds):
+        raise HttpError(400, "invalid cursor")
+    for item, kind in zip(value, kinds):
+        if not isinstance(item, kind) or isinstance(item, bool):
+            raise HttpError(400, "invalid cursor")
+    return value
+
+
+def parse_body(parse, data):
+    # Request bodies get the same checks as imported records (transfer.parse_member / parse_trainer)
+    try:
+        return parse(data)
+    except (ValueError, TypeError) as e:
+        raise HttpError(400, str(e))
+
+
+class Api:
+    # Route handlers are plain functions run off the event loop; read=True ones on the read pool
+    def __init__(self, db):
+        self.db = db
+        self.routes = []  # (method, compiled path pattern, route name, handler, read)
+        for method, pattern, handler, read in (
+                ("GET", r"/members", self.list_members, True),
+                ("POST", r"/members", self.add_member, False),
+                ("GET", r"/members/search", self.search_members, True),
+                ("GET", r"/members/(\d+)", self.get_member, True),
+                ("GET", r"/members/(\d+)/progress", self.member_progress, True),
+                ("GET", r"/members/(\d+)/series", self.member_series, True),
+                ("GET", r"/trainers", self.list_trainers, True),
+                ("POST", r"/trainers", self.add_trainer, False),
+                ("GET", r"/trainers/available", self.trainers_available, True),
+                ("GET", r"/capacity", self.capacity, True),
+                ("GET", r"/analytics/weekly", self.weekly, True),
+                ("GET", r"/analytics/goals", self.goals_in_week, True),
+                ("POST", r"/assign", self.assign, False),
+                ("POST", r"/simulate", self.simulate, False),
+                ("GET", r"/stats", self.stats, True)):
+            self.routes.append((method, re.compile(pattern + "$"), f"{method} {pattern}", handler, read))
+
+    def resolve(self, method, path):
+        # -> (route name, handler, path arguments, read); 404 / 405 for anything else
+        allowed = False
+        for route_method, pattern, name, handler, read in self.routes:
+            match = pattern.match(path)
+            if match:
+                if route_method == method:
+                    return name, handler, match.groups(), read
+                allowed = True
+        if allowed:
+            raise HttpError(405, f"{method} is not supported on {path}")
+        raise HttpError(404, f"no such resource: {path}")
+
+    def _page(self, request, listing, sorts, fields, filters):
+        sort = request.arg("sort", "id")
+        if sort not in sorts:
+            raise HttpError(400, f"sort must be one of: {', '.join(sorts)}")
+        cursor = request.arg("cursor")
+        after = decode_cursor(cursor, (int if sorts[sort] == "ID" else str, int)) if cursor else None
+        limit = request.limit()
+        rows = paging.fetch_page(self.db, listing, sorts[sort], bool(request.arg("desc", 0, int)), filters,
+                                 after=after, limit=limit)
+        items = [dict(zip(fields, row)) for row in rows]
+        # A full page may have more after it; the client stops when next is null
+        after = encode_cursor(list(paging.page_bounds(listing, rows)[1])) if len(rows) == limit else None
+        return {"items": items, "next": after}
+
+    def list_members(self, request):
+        filters = {"goal": request.arg("goal"), "trainer": request.arg("trainer", kind=int),
+                   "expertise": request.arg("expertise")}
+        return self._page(request, paging.MEMBERS, MEMBER_SORTS, MEMBER_FIELDS, filters)
+
+    def list_trainers(self, request):
+        day = request.arg("day")
+        if day is not None and day not in core.DAY_BITS:
+            raise HttpError(400, f"unknown weekday {day!r}")
+        filters = {"expertise": request.arg("expertise"), "day": core.DAY_BITS.get(day)}
+        page = self._page(request, TRAINER_LISTING, TRAINER_SORTS, TRAINER_FIELDS, filters)
+        for item in page["items"]:
+            item["available_days"] = core.mask_days(item["available_days"])
+        return page
+
+    def search_members(self, request):
+        limit = min(max(request.arg("limit", search.LIMIT, int), 1), MAX_LIMIT)
+        matches = core.search_members(self.db, request.arg("q", ""), limit)
+        return {"items": [{"member_id": member_id, "name": name} for member_id, name in matches]}
+
+    def get_member(self, request, member_id):
+        detail = core.member_detail(self.db, int(member_id), history=False)
+        if detail is None:
+            raise HttpError(404, f"no member {member_id}")
+        data = dataclasses.asdict(detail)
+        del data["progress"]  # paged by /members/<id>/progress
+        if detail.trainer is not None:
+            data["trainer"]["available_days"] = core.mask_days(detail.trainer.available_days)
+        return data
+
+    def member_progress(self, request, member_id):
+        cursor = request.arg("cursor")
+        after = decode_cursor(cursor, (str, int)) if cursor else ["", 0]
+        limit = request.limit()
+        rows = self.db.query(PROGRESS_PAGE, (int(member_id), *after, limit))
+        items = [{"date": date, "weight": weight, "bmi": bmi} for date, weight, bmi, _ in rows]
+        return {"items": items, "next": encode_cursor([rows[-1][0], rows[-1][3]]) if len(rows) == limit else None}
+
+    def member_series(self, request, member_id):
+        # Weight and BMI between from= and to= (default: the whole history), each reduced to at
+        # most points= samples for a chart of that many pixels
+        points = min(max(request.arg("points", DEFAULT_POINTS, int), series.MIN_POINTS), MAX_POINTS)
+        with self.db.reader() as conn:
+            bounds = series.date_bounds(conn, int(member_id))
+            if bounds is None:
+                return {"rows": 0, "weight": [], "bmi": []}
+            try:
+                start = series.to_day(request.arg("from")) if request.arg("from") else bounds[0]
+                end = series.to_day(request.arg("to")) if request.arg("to") else bounds[1]
+            except ValueError:
+                raise HttpError(400, "from and to must be YYYY-MM-DD dates")
+            days, weight, bmi = series.progress_window(conn, int(member_id), start, end)
+        result = {"rows": len(days)}
+        for name, values in (("weight", weight), ("bmi", bmi)):
+            x, y = series.downsample(days, values, points)
+            result[name] = [[series.to_date(day), value] for day, value in zip(x.tolist(), y.tolist())]
+        return result
+
+    def trainers_available(self, request):
+        expertise = request.arg("expertise")
+        if expertise not in core.GOAL_OPTIONS:
+            raise HttpError(400, f"expertise must be one of: {', '.join(core.EXPERTISE_TYPES)}")
+        days = [day.strip() for day in request.arg("days", "").split(",") if day.strip()]
+        if not days:
+            raise HttpError(400, "days is required, e.g. days=Monday,Thursday")
+        trainers = core.trainers_available(self.db, expertise, days, match_all=request.arg("match", "all") != "any")
+        return {"items": [{"trainer_id": t.trainer_id, "name": t.name, "expertise": t.expertise,
+                           "available_days": core.mask_days(t.available_days)} for t in trainers]}
+
+    def capacity(self, request):
+        return core.free_capacity_by_day(self.db, request.arg("expertise"))
+
+    def weekly(self, request):
+        with self.db.reader() as conn:
+            rows = analytics.weekly(conn, request.arg("goal"), request.arg("trainer", kind=int))
+        fields = ("week", "rows", "weight", "bmi", "weight_change", "bmi_change")
+        return {"items": [dict(zip(fields, row)) for row in rows]}
+
+    def goals_in_week(self, request):
+        with self.db.reader() as conn:
+            week = request.arg("week") or (analytics.weeks(conn) or [None])[-1]
+            rows = analytics.goals_in_week(conn, week) if week else []
+        fields = ("goal", "rows", "weight", "bmi", "weight_change", "bmi_change",
+                  "weight_percentiles", "bmi_percentiles")
+        return {"week": week, "percentiles": analytics.PERCENTILES, "items": [dict(zip(fields, row)) for row in rows]}
+
+    def add_member(self, request):
+        data = request.json()
+        data.pop("trainer_id", None)  # members added here are assigned by expertise
+        name, birthday, height, weight, activity_level, goal, _, expertise = parse_body(transfer.parse_member, data)
+        if expertise is None:
+            raise HttpError(400, "missing expertise")
+        member_id = core.add_member(self.db, name, birthday, height, weight, activity_level, goal, expertise)
+        return 201, {"member_id": member_id}
+
+    def add_trainer(self, request):
+        data = request.json()
+        days = data.get("available_days")
+        # A list of day names, or anything parse_trainer takes: "Monday, Thursday" or a bitmask
+        if isinstance(days, list) and all(isinstance(day, str) for day in days):
+            data["available_days"] = ", ".join(days)
+        name, expertise, mask = parse_body(transfer.parse_trainer, data)
+        trainer_id = core.add_trainer(self.db, name, expertise, core.mask_days(mask))
+        return 201, {"trainer_id": trainer_id}
+
+    def assign(self, request):
+        report = core.assign_unassigned_members(self.db)
+        return {"assigned": report.assigned, "unassigned": report.unassigned, "message": str(report)}
+
+    def simulate(self, request):
+        data = request.json()
+        weeks = data.get("weeks")
+        if not isinstance(weeks, int) or weeks < 1:
+            raise HttpError(400, "weeks must be a positive integer")
+        simulate = core.simulate_horizon if data.get("horizon") else core.simulate_progress
+        written, skipped = simulate(self.db, weeks)
+        return {"weeks": weeks, "rows_written": written, "members_skipped": len(skipped)}
+
+    def stats(self, request):
+        diagnostics = self.db.diagnostics()
+        diagnostics["statements"] = diagnostics["statements"][:STATS_STATEMENTS]
+        return {"requests": REQUEST_TIMINGS.snapshot(), "database": diagnostics}
+
+
+class Server:
+    def __init__(self, db, host=HOST, port=PORT):
+        self.api = Api(db)
+        self.host = host
+        self.port = port
+        self.readers = ThreadPoolExecutor(max_workers=db.read_pool_size, thread_name_prefix="api-read")
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-write")
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port, backlog=1024)
+        self.port = self.server.sockets[0].getsockname()[1]  # the real port when started on port 0
+        return self
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.readers.shutdown(wait=True)
+        self.writer.shutdown(wait=True)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request, keep_alive = await asyncio.wait_for(read_request(reader), KEEP_ALIVE_SECONDS)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except HttpError as e:
+                    await write_response(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                status, body, seconds = await self.dispatch(request)
+                await write_response(writer, status, body, keep_alive, seconds)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, request):
+        # -> (status, JSON body, seconds); the time covers queueing for a worker as well as the work
+        start = time.perf_counter()
+        route = f"{request.method} {request.path}"
+        try:
+            route, handler, arguments, read = self.api.resolve(request.method, request.path)
+            executor = self.readers if read else self.writer
+            result = await asyncio.get_running_loop().run_in_executor(executor, handler, request, *arguments)
+            status, body = result if isinstance(result, tuple) else (200, result)
+        except HttpError as e:
+            status, body = e.status, {"error": str(e)}
+        except core.GymError as e:
+            status, body = 400, {"error": str(e)}
+        except Exception as e:
+            instrumentation.log.exception("request failed: %s", route)
+            status, body = 500, {"error": f"{type(e).__name__}: {e}"}
+        seconds = time.perf_counter() - start
+        REQUEST_TIMINGS.record(route, seconds)
+        if seconds >= SLOW_REQUEST_SECONDS:
+            instrumentation.log_event("slow_request", logging.WARNING, route=route, status=status,
+                                      ms=round(seconds * 1000, 3))
+        return status, body, seconds
+
+
+async def read_request(reader):
+    # -> (Request, keep alive) or (None, False) once the client has closed the connection
+    line = await reader.readline()
+    if not line:
+        return None, False
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HttpError(400, "invalid Content-Length")
+    if length > MAX_BODY:
+        raise HttpError(413, f"request body over {MAX_BODY} bytes")
+    body = await reader.readexactly(length) if length else b""
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    url = urlsplit(target)
+    return Request(method.upper(), url.path.rstrip("/") or "/", dict(parse_qsl(url.query)), body), keep_alive
+
+
+async def write_response(writer, status, body, keep_alive, seconds=None):
+    payload = json.dumps(body, default=str).encode()
+    head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", "Content-Type: application/json",
+            f"Content-Length: {len(payload)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    if seconds is not None:
+        head.append(f"Server-Timing: app;dur={seconds * 1000:.3f}")
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
+    await writer.drain()
+
+
+async def serve(db, host=HOST, port=PORT):
+    server = await Server(db, host, port).start()
+    print(f"Serving {db.path} on http://{server.host}:{server.port}", file=sys.stderr)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the gym database as a local JSON API")
+    parser.add_argument("--db", default=database.DB_PATH, help="path to the sqlite database")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--readers", type=int, default=database.READ_POOL_SIZE, help="pooled read connections")
+    parser.add_argument("--log-json", metavar="PATH", help="append slow-query and slow-request events as JSON lines")
+    args = parser.parse_args(argv)
+
+    if args.log_json:
+        instrumentation.enable_json_log(args.log_json)
+    db = core.open_database(args.db)
+    db.read_pool_size = args.readers
+    try:
+        asyncio.run(serve(db, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+from datetime import datetime
+
+import numpy as np
+
+# Weekly weight change per goal as a fraction of body weight (negative means weight loss)
+GOAL_RATES = {
+    "Weight Loss": -0.01,
+    "Muscle Gain": 0.005,
+    "Fat Loss": -0.007,
+    "Endurance": 0.002,
+    "Strength": 0.004,
+    "Powerlifting": 0.003,
+    "Core Strength": 0.002,
+    "Flexibility": 0.001,
+    "Rehabilitation": 0.001,
+}
+DEFAULT_RATE = 0.002  # General Health and every goal without its own rate
+
+# Position 0 of the rate table holds the default rate for unknown goals
+GOAL_CODES = {goal: i + 1 for i, goal in enumerate(GOAL_RATES)}
+RATE_TABLE = np.array([DEFAULT_RATE] + list(GOAL_RATES.values()), dtype=np.float64)
+
+# Latest dates come from the member_latest summary, not from scanning progress
+ROSTER_QUERY = ("SELECT m.member_id, m.name, m.weight, m.height, m.goal, m.activity_level, m.trainer_id, l.date "
+                "FROM members m "
+                "LEFT JOIN member_latest l ON m.member_id = l.member_id")
+
+INSERT_PROGRESS = "INSERT INTO progress (member_id, date, weight, bmi) VALUES (?, ?, ?, ?)"
+INSERT_BATCH_SIZE = 50_000  # rows per executemany between progress reports
+
+HORIZON_BATCH_SIZE = 50_000  # members per roster chunk; each week of a chunk is written as one batch
+
+HORIZON_ROSTER_QUERY = ("SELECT m.member_id, m.name, COALESCE(l.weight, m.weight), m.height, m.goal, m.activity_level, m.trainer_id, l.date "
+                        "FROM members m "
+                        "LEFT JOIN member_latest l ON m.member_id = l.member_id "
+                        "WHERE m.member_id > ? "
+                        "ORDER BY m.member_id LIMIT ?")
+
+
+def goal_rates(goals):
+    codes = np.fromiter((GOAL_CODES.get(goal, 0) for goal in goals), dtype=np.intp, count=len(goals))
+    return RATE_TABLE[codes]
+
+
+def compute_progress(initial_weight, height, rates, activity_level, weeks_passed):
+    # Same operation order as the original per-member formula so results match bit for bit
+    weight_change = initial_weight * (rates * weeks_passed * (1 + (activity_level - 5) * 0.1))
+    new_weight = initial_weight + weight_change
+    bmi = new_weight / ((height / 100) ** 2)
+    return new_weight, bmi
+
+
+def progress_dates(last_dates, weeks_passed, today=None):
+    # Members with history move weeks_passed after their last entry, everyone else starts today
+    if today is None:
+        today = datetime.now()
+    last = np.array(last_dates, dtype='datetime64[D]')
+    dates = np.where(np.isnat(last), np.datetime64(today.strftime('%Y-%m-%d'), 'D'), last + 7 * weeks_passed)
+    return np.datetime_as_string(dates, unit='D')
+
+
+def simulate_progress(conn, weeks_passed, today=None, progress=None, on_written=None):
+    # Returns (number of progress rows written, names of members skipped for lack of a trainer).
+    # on_written(member_ids) is called once the new rows are committed.
+    roster = conn.execute(ROSTER_QUERY).fetchall()
+
+    skipped = [row[1] for row in roster if row[6] is None]
+    roster = [row for row in roster if row[6] is not None]
+    if not roster:
+        return 0, skipped
+
+    member_ids, _, weights, heights, goals, activity_levels, _, last_dates = zip(*roster)
+    new_weight, bmi = compute_progress(np.array(weights, dtype=np.float64),
+                                       np.array(heights, dtype=np.float64),
+                                       goal_rates(goals),
+                                       np.array(activity_levels, dtype=np.float64),
+                                       weeks_passed)
+    dates = progress_dates(last_dates, weeks_passed, today)
+
+    rows = list(zip(member_ids, dates.tolist(), new_weight.tolist(), bmi.tolist()))
+    # One transaction for every batch: a cancel rolls back the whole run, not just the last batch
+    with conn:
+        for start in range(0, len(rows), INSERT_BATCH_SIZE):
+            if progress:
+                progress(start, len(rows))
+            conn.executemany(INSERT_PROGRESS, rows[start:start + INSERT_BATCH_SIZE])
+    if on_written:
+        on_written(member_ids)
+    return len(rows), skipped
+
+
+def simulate_horizon(conn, weeks, today=None, batch_size=HORIZON_BATCH_SIZE, progress=None, on_written=None):
+    # Simulates `weeks` consecutive weeks, each one compounding on the previous week's weight and
+    # starting from every member's latest recorded state. Returns the same tuple as simulate_progress.
+    if today is None:
+        today = datetime.now()
+    today = np.datetime64(today.strftime('%Y-%m-%d'), 'D')
+
+    total = conn.execute("SELECT COUNT(*) FROM members WHERE trainer_id IS NOT NULL").fetchone()[0] * weeks
+
+    written, skipped = 0, []
+    last_id = -1
+    while True:
+        roster = conn.execute(HORIZON_ROSTER_QUERY, (last_id, batch_size)).fetchall()
+        if not roster:
+            break
+        last_id = roster[-1][0]
+
+        skipped.extend(row[1] for row in roster if row[6] is None)
+        roster = [row for row in roster if row[6] is not None]
+        if not roster:
+            continue
+
+        member_ids, _, weights, heights, goals, activity_levels, _, last_dates = zip(*roster)
+        weight = np.array(weights, dtype=np.float64)
+        height = np.array(heights, dtype=np.float64)
+        activity_level = np.array(activity_levels, dtype=np.float64)
+        rates = goal_rates(goals)
+        # Week 1 lands one week after the last entry, or today for members without history
+        last = np.array(last_dates, dtype='datetime64[D]')
+        first_date = np.where(np.isnat(last), today, last + 7)
+
+        for week in range(weeks):
+            weight, bmi = compute_progress(weight, height, rates, activity_level, 1)
+            dates = np.datetime_as_string(first_date + 7 * week, unit='D')
+            # Checked before each write, so a cancel never follows the last committed week
+            if progress:
+                progress(written, total)
+            with conn:
+                conn.executemany(INSERT_PROGRESS, zip(member_ids, dates.tolist(), weight.tolist(), bmi.tolist()))
+            written += len(member_ids)
+            if on_written:
+                on_written(member_ids)
+
+    return written, skipped
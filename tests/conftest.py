@@ -0,0 +1,19 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# The modules live at the top of the repository rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrations  # noqa: E402
+
+
+@pytest.fixture
+def conn():
+    # A fresh database on the latest schema
+    connection = sqlite3.connect(":memory:")
+    migrations.migrate(connection)
+    yield connection
+    connection.close()
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+import analytics
+
+INSERT = "INSERT INTO progress (member_id, date, weight, bmi) VALUES (?, ?, ?, ?)"
+# The rollups recomputed straight from progress; weeks start on Monday
+EXPECTED_GOAL_WEEK = ("SELECT date(p.date, '-6 days', 'weekday 1'), COALESCE(m.goal, ''), COUNT(*), SUM(p.weight), "
+                      "SUM(p.bmi) FROM progress p LEFT JOIN members m ON m.member_id = p.member_id GROUP BY 1, 2")
+EXPECTED_TRAINER_WEEK = ("SELECT date(p.date, '-6 days', 'weekday 1'), COALESCE(m.trainer_id, 0), COUNT(*), "
+                         "SUM(p.weight), SUM(p.bmi) FROM progress p LEFT JOIN members m ON m.member_id = p.member_id "
+                         "GROUP BY 1, 2")
+
+
+@pytest.fixture
+def members(conn):
+    conn.executemany("INSERT INTO trainers (trainer_id, name, expertise, available_days) VALUES (?, ?, 'Yoga', 127)",
+                     [(1, "Pat Lee"), (2, "Kim Cho")])
+    conn.executemany("INSERT INTO members (member_id, name, goal, trainer_id) VALUES (?, ?, ?, ?)",
+                     [(1, "A", "Flexibility", 1), (2, "B", "Flexibility", 2), (3, "C", "Stress Relief", 2),
+                      (4, "D", "Mindfulness", None)])
+    return conn
+
+
+def add_progress(conn, count, seed):
+    rng = random.Random(seed)
+    conn.executemany(INSERT, [(rng.randint(1, 4), f"2024-01-{rng.randint(1, 31):02d}",
+                               round(rng.uniform(50, 100), 1), round(rng.uniform(18, 32), 1)) for _ in range(count)])
+    conn.commit()
+
+
+def assert_matches_progress(conn):
+    for table, key, expected in (("rollup_goal_week", "goal", EXPECTED_GOAL_WEEK),
+                                 ("rollup_trainer_week", "trainer_id", EXPECTED_TRAINER_WEEK)):
+        actual = conn.execute(f"SELECT week, {key}, n, weight_sum, bmi_sum FROM {table}").fetchall()
+        wanted = conn.execute(expected).fetchall()
+        assert sorted(row[:3] for row in actual) == sorted(row[:3] for row in wanted)
+        for got, want in zip(sorted(actual), sorted(wanted)):
+            assert got[3:] == pytest.approx(want[3:])
+    histogram = conn.execute("SELECT measure, SUM(n) FROM rollup_histogram GROUP BY measure").fetchall()
+    total = conn.execute("SELECT COUNT(*) FROM progress").fetchone()[0]
+    assert sorted(histogram) == [("bmi", total), ("weight", total)]
+
+
+def stale(conn):
+    return conn.execute("SELECT stale FROM rollup_state").fetchone()[0]
+
+
+def test_incremental_refresh_matches_a_full_group_by(members):
+    add_progress(members, 200, seed=1)
+    assert analytics.refresh(members).rows == 200
+    add_progress(members, 50, seed=2)
+    report = analytics.refresh(members)
+    assert (report.rows, report.rebuilt) == (50, False)
+    assert_matches_progress(members)
+    assert analytics.refresh(members).rows == 0
+
+
+def test_deleting_rolled_up_rows_forces_a_rebuild(members):
+    add_progress(members, 100, seed=3)
+    analytics.refresh(members)
+    members.execute("DELETE FROM progress WHERE member_id = 2")
+    members.commit()
+    assert stale(members) == 1
+    assert analytics.refresh(members).rebuilt
+    assert stale(members) == 0
+    assert_matches_progress(members)
+
+
+def test_deleting_rows_not_yet_rolled_up_does_not(members):
+    add_progress(members, 100, seed=4)
+    analytics.refresh(members)
+    add_progress(members, 10, seed=5)
+    members.execute("DELETE FROM progress WHERE rowid = (SELECT MAX(rowid) FROM progress)")
+    members.commit()
+    assert stale(members) == 0
+    assert not analytics.refresh(members).rebuilt
+    assert_matches_progress(members)
+
+
+def test_reused_rowid_forces_a_rebuild(members):
+    add_progress(members, 100, seed=6)
+    analytics.refresh(members)
+    members.execute("DELETE FROM progress WHERE rowid = 7")
+    members.execute("UPDATE rollup_state SET stale = 0")  # as if a rebuild had already run
+    members.execute("INSERT INTO progress (rowid, member_id, date, weight, bmi) VALUES (7, 1, '2024-02-05', 70, 22)")
+    members.commit()
+    assert stale(members) == 1
+    analytics.refresh(members)
+    assert_matches_progress(members)
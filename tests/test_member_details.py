@@ -0,0 +1,26 @@
+import core
+import generator
+import member_details
+
+
+def test_profile_changed_while_loading_is_not_cached(monkeypatch):
+    db = core.open_database(":memory:")
+    generator.generate_trainers(db, 3, seed=1)
+    generator.generate_members(db, 2, seed=1)
+    service = member_details.MemberDetailService(db)
+
+    load = core.member_detail
+
+    def load_then_change(*args, **kwargs):
+        detail = load(*args, **kwargs)
+        db.members_changed([detail.member.member_id])  # a write commits before the insert into the cache
+        return detail
+
+    monkeypatch.setattr(core, "member_detail", load_then_change)
+    assert service.get(1) is not None
+    assert service.stats()["size"] == 0
+
+    monkeypatch.setattr(core, "member_detail", load)
+    service.get(1)
+    service.get(1)
+    assert service.stats() == {"hits": 1, "misses": 2, "size": 1, "capacity": member_details.CACHE_SIZE}
@@ -0,0 +1,38 @@
+import latest
+
+INSERT = "INSERT INTO progress (member_id, date, weight, bmi) VALUES (?, ?, ?, ?)"
+
+
+def summary(conn, member_id):
+    return conn.execute("SELECT date, weight, bmi, row_count FROM member_latest WHERE member_id = ?",
+                        (member_id,)).fetchone()
+
+
+def test_insert_keeps_the_latest_row(conn):
+    conn.execute(INSERT, (1, "2024-01-08", 80.0, 25.0))
+    assert summary(conn, 1) == ("2024-01-08", 80.0, 25.0, 1)
+    conn.execute(INSERT, (1, "2024-01-15", 79.0, 24.7))
+    assert summary(conn, 1) == ("2024-01-15", 79.0, 24.7, 2)
+    # A backdated row only adds to the count
+    conn.execute(INSERT, (1, "2024-01-01", 81.0, 25.3))
+    assert summary(conn, 1) == ("2024-01-15", 79.0, 24.7, 3)
+    assert latest.verify(conn) == []
+
+
+def test_delete_falls_back_to_the_previous_row(conn):
+    conn.executemany(INSERT, [(1, "2024-01-01", 81.0, 25.3), (1, "2024-01-08", 80.0, 25.0), (2, "2024-01-08", 60.0, 21.0)])
+    conn.execute("DELETE FROM progress WHERE member_id = 1 AND date = '2024-01-08'")
+    assert summary(conn, 1) == ("2024-01-01", 81.0, 25.3, 1)
+    conn.execute("DELETE FROM progress WHERE member_id = 1")
+    assert summary(conn, 1) is None
+    assert summary(conn, 2) == ("2024-01-08", 60.0, 21.0, 1)
+    assert latest.verify(conn) == []
+
+
+def test_verify_and_rebuild(conn):
+    conn.executemany(INSERT, [(1, "2024-01-01", 81.0, 25.3), (2, "2024-01-08", 60.0, 21.0)])
+    conn.execute("UPDATE member_latest SET row_count = 5 WHERE member_id = 1")
+    conn.execute("DELETE FROM member_latest WHERE member_id = 2")
+    assert sorted(latest.verify(conn)) == [1, 2]
+    assert latest.rebuild(conn) == 2
+    assert latest.verify(conn) == []
@@ -0,0 +1,52 @@
+import sqlite3
+
+import pytest
+
+import migrations
+
+
+def test_hot_queries_use_indexes(conn):
+    assert migrations.full_scans(conn) == {}
+
+
+def test_unindexed_schema_is_caught():
+    # The check itself must notice scans, or the test above proves nothing
+    conn = sqlite3.connect(":memory:")
+    migrations.migrate(conn, target=1)
+    query = {"member by name": migrations.HOT_QUERIES["member by name"]}
+    assert migrations.full_scans(conn, query).keys() == {"member by name"}
+
+
+def test_upgrade_from_version_0_keeps_rows():
+    # Version 0: the tables the old create_database() made, without a user_version
+    conn = sqlite3.connect(":memory:")
+    migrations._create_tables(conn)
+    conn.execute("INSERT INTO trainers (trainer_id, name, expertise, available_weeks) "
+                 "VALUES (1, 'Pat Lee', 'Yoga', 'Monday, Thursday')")
+    conn.execute("INSERT INTO members (member_id, name, height, weight, goal, trainer_id) "
+                 "VALUES (1, 'Sam Park', 180, 80.0, 'Flexibility', 1)")
+    conn.executemany("INSERT INTO progress (member_id, date, weight, bmi) VALUES (1, ?, ?, ?)",
+                     [("2024-01-01", 80.0, 24.7), ("2024-01-08", 79.5, 24.5)])
+    conn.commit()
+    assert migrations.schema_version(conn) == 0
+
+    assert migrations.migrate(conn) == migrations.LATEST_VERSION
+    assert migrations.schema_version(conn) == migrations.LATEST_VERSION
+    assert conn.execute("SELECT trainer_id, name, expertise, available_days FROM trainers").fetchall() == \
+        [(1, "Pat Lee", "Yoga", 0b1001)]
+    assert conn.execute("SELECT member_id, name, trainer_id FROM members").fetchall() == [(1, "Sam Park", 1)]
+    assert conn.execute("SELECT COUNT(*) FROM progress").fetchone()[0] == 2
+    # Summary tables created by later migrations are filled from the existing rows
+    assert conn.execute("SELECT date, weight, row_count FROM member_latest").fetchall() == [("2024-01-08", 79.5, 2)]
+    assert conn.execute("SELECT rowid FROM member_search WHERE member_search MATCH 'sam'").fetchall() == [(1,)]
+
+
+def test_migrate_is_idempotent(conn):
+    assert migrations.migrate(conn) == migrations.LATEST_VERSION
+
+
+def test_newer_schema_is_refused():
+    conn = sqlite3.connect(":memory:")
+    conn.execute(f"PRAGMA user_version = {migrations.LATEST_VERSION + 1}")
+    with pytest.raises(RuntimeError):
+        migrations.migrate(conn)
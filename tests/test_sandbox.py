@@ -0,0 +1,78 @@
+import sqlite3
+import threading
+
+import pytest
+
+import core
+import member_details
+import sandbox
+
+
+@pytest.fixture
+def box(tmp_path):
+    path = str(tmp_path / "gym.db")
+    db = core.open_database(path)
+    with db.transaction() as conn:
+        conn.execute("INSERT INTO members (member_id, name, goal) VALUES (1, 'Sam Park', 'Flexibility')")
+    db.close()
+    box = sandbox.Sandbox(path)
+    yield box
+    box.close()
+
+
+def count(db):
+    return db.query_one("SELECT COUNT(*) FROM members")[0]
+
+
+def test_reads_do_not_wait_for_a_sandbox_write(box):
+    results = []
+    with box.db.transaction() as conn:
+        conn.execute("INSERT INTO members (member_id, name, goal) VALUES (2, 'Pat Lee', 'Flexibility')")
+        reader = threading.Thread(target=lambda: results.append(count(box.db)))
+        reader.start()
+        reader.join(timeout=5)
+        assert not reader.is_alive(), "the read waited for the write lock"
+    assert results == [2]  # uncommitted rows are visible
+
+
+def test_snapshot_restore_and_commit(box):
+    box.snapshot("start")
+    with box.db.transaction() as conn:
+        conn.execute("DELETE FROM members")
+    box.restore("start")
+    assert count(box.db) == 1
+    with pytest.raises(core.GymError):
+        box.restore("missing")
+
+    with box.db.transaction() as conn:
+        conn.execute("INSERT INTO members (member_id, name, goal) VALUES (2, 'Pat Lee', 'Flexibility')")
+    file = sqlite3.connect(box.path)
+    assert file.execute("SELECT COUNT(*) FROM members").fetchone()[0] == 1
+    box.commit()
+    assert file.execute("SELECT COUNT(*) FROM members").fetchone()[0] == 2
+    assert file.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    file.close()
+
+
+def test_commit_refuses_to_overwrite_other_changes(box):
+    other = sqlite3.connect(box.path)
+    other.execute("UPDATE members SET name = 'Sam Parker'")
+    other.commit()
+    other.close()
+    assert box.source_changed
+    with pytest.raises(core.GymError):
+        box.commit()
+    box.commit(force=True)
+    assert not box.source_changed
+
+
+def test_cache_forgets_rows_of_a_rolled_back_write(box):
+    details = member_details.MemberDetailService(box.db)
+    assert details.get(1).latest is None
+    with pytest.raises(core.Cancelled):
+        with box.db.transaction() as conn:
+            conn.execute("INSERT INTO progress (member_id, date, weight, bmi) VALUES (1, '2024-01-01', 80, 25)")
+            details.invalidate([1])
+            assert details.get(1).latest is not None  # read uncommitted while the write is open
+            raise core.Cancelled()
+    assert details.get(1).latest is None
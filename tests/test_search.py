@@ -0,0 +1,56 @@
+import search
+
+INSERT = "INSERT INTO members (member_id, name) VALUES (?, ?)"
+
+
+def names(conn, text):
+    return [name for _, name in search.search(conn, text)]
+
+
+def check_index(conn):
+    # Raises if the index disagrees with the names in members
+    conn.execute("INSERT INTO member_search (member_search) VALUES ('integrity-check')")
+
+
+def test_triggers_follow_inserts_renames_and_deletes(conn):
+    conn.executemany(INSERT, [(1, "Joan Smith"), (2, "John Smithers"), (3, "Ann O'Brien")])
+    assert names(conn, "jo smi") == ["Joan Smith", "John Smithers"]
+    assert names(conn, "o'brien") == ["Ann O'Brien"]
+
+    conn.execute("UPDATE members SET name = 'Joan Baker' WHERE member_id = 1")
+    assert names(conn, "smi") == ["John Smithers"]
+    assert names(conn, "bak") == ["Joan Baker"]
+
+    conn.execute("DELETE FROM members WHERE member_id = 2")
+    assert names(conn, "jo") == ["Joan Baker"]
+    check_index(conn)
+
+
+def test_deferred_indexing_indexes_the_bulk_rows(conn):
+    conn.execute(INSERT, (1, "Existing Member"))
+    with conn, search.deferred_indexing(conn):
+        conn.executemany(INSERT, [(i, f"Bulk Member {i}") for i in range(2, 102)])
+        assert names(conn, "bulk") == []  # not indexed until the block ends
+    assert len(search.search(conn, "bulk", limit=500)) == 100
+    assert conn.execute("SELECT deferred FROM member_search_state").fetchone()[0] == 0
+    # Single inserts are indexed by the trigger again
+    conn.execute(INSERT, (200, "Late Arrival"))
+    assert names(conn, "late") == ["Late Arrival"]
+    check_index(conn)
+
+
+def test_member_id_lookup(conn):
+    conn.executemany(INSERT, [(42, "Zed Adams"), (7, "Member 42")])
+    # A number finds the member with that id as well as names containing it
+    assert search.search(conn, "#42") == search.search(conn, "42") == [(7, "Member 42"), (42, "Zed Adams")]
+    assert search.search(conn, "#7") == [(7, "Member 42")]
+    assert search.search(conn, "  ") == []
+
+
+def test_rebuild(conn):
+    conn.execute(INSERT, (1, "Joan Smith"))
+    conn.execute("INSERT INTO member_search (member_search, rowid, name) VALUES ('delete', 1, 'Joan Smith')")
+    assert names(conn, "joan") == []
+    search.rebuild(conn)
+    assert names(conn, "joan") == ["Joan Smith"]
+    check_index(conn)
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+import core
+import server
+
+
+@pytest.fixture
+def api():
+    db = core.open_database(":memory:")
+    with db.transaction() as conn:
+        conn.executemany("INSERT INTO trainers (name, expertise, available_days) VALUES (?, 'Yoga', ?)",
+                         [("Pat Lee", 0b1001), ("Kim Cho", 0)])
+        conn.execute("INSERT INTO members (member_id, name, goal) VALUES (1, 'Sam Park', 'Flexibility')")
+        conn.executemany("INSERT INTO progress (member_id, date, weight, bmi) VALUES (1, ?, 80, 25)",
+                         [("2024-01-01",), ("2024-01-08",), ("2024-01-15",)])
+    yield server.Api(db)
+    db.close()
+
+
+def get(handler, query, *args):
+    return handler(server.Request("GET", "/", query, b""), *args)
+
+
+def test_progress_pages_follow_the_cursor(api):
+    first = get(api.member_progress, {"limit": "2"}, "1")
+    assert [item["date"] for item in first["items"]] == ["2024-01-01", "2024-01-08"]
+    rest = get(api.member_progress, {"limit": "2", "cursor": first["next"]}, "1")
+    assert [item["date"] for item in rest["items"]] == ["2024-01-15"] and rest["next"] is None
+
+
+@pytest.mark.parametrize("handler, query, boundary", [
+    ("member_progress", {}, [{}, "x"]),
+    ("member_progress", {}, ["2024-01-01", True]),
+    ("member_progress", {}, ["2024-01-01"]),
+    ("list_members", {}, ["Sam", 1]),
+    ("list_members", {"sort": "name"}, [1, 1]),
+    ("list_trainers", {"sort": "name"}, ["Pat", None]),
+])
+def test_malformed_cursors_are_rejected(api, handler, query, boundary):
+    args = ("1",) if handler == "member_progress" else ()
+    with pytest.raises(server.HttpError) as error:
+        get(getattr(api, handler), dict(query, cursor=server.encode_cursor(boundary)), *args)
+    assert error.value.status == 400
+    with pytest.raises(server.HttpError):
+        get(getattr(api, handler), dict(query, cursor="not base64!"), *args)
+
+
+def test_trainer_days_are_listed_from_the_mask(api):
+    items = get(api.list_trainers, {})["items"]
+    assert [item["available_days"] for item in items] == [["Monday", "Thursday"], []]
+
+
+def post(handler, body):
+    return handler(server.Request("POST", "/", {}, json.dumps(body).encode()))
+
+
+MEMBER = {"name": "Ann Lee", "birthday": "1990-01-01", "height": 170, "weight": 65.5, "activity_level": 5,
+          "goal": "Stress Relief", "expertise": "Yoga"}
+
+
+def test_add_member_and_trainer(api):
+    status, body = post(api.add_trainer, {"name": "Lou Kay", "expertise": "Yoga", "available_days": ["Monday"]})
+    assert status == 201
+    member = get(api.get_member, {}, str(post(api.add_member, MEMBER)[1]["member_id"]))
+    assert (member["member"]["height"], member["trainer"]["expertise"]) == (170, "Yoga")
+    assert post(api.add_trainer, {"name": "Max Roe", "expertise": "Yoga", "available_days": "Tuesday, Friday"})[0] == 201
+
+
+@pytest.mark.parametrize("change", [
+    {"birthday": "not a date"}, {"weight": "-5"}, {"activity_level": 99}, {"goal": "Bogus"}, {"height": [1]},
+    {"weight": float("nan")}, {"goal": "Core Strength"}, {"expertise": None}, {"name": ""},
+])
+def test_invalid_members_are_rejected(api, change):
+    with pytest.raises(server.HttpError) as error:
+        post(api.add_member, dict(MEMBER, **change))
+    assert error.value.status == 400
+
+
+@pytest.mark.parametrize("change", [
+    {"expertise": "Nope"}, {"available_days": [["Monday"]]}, {"available_days": ["Someday"]}, {"available_days": []},
+    {"available_days": 0}, {"name": None},
+])
+def test_invalid_trainers_are_rejected(api, change):
+    with pytest.raises(server.HttpError) as error:
+        post(api.add_trainer, dict({"name": "Lou Kay", "expertise": "Yoga", "available_days": ["Monday"]}, **change))
+    assert error.value.status == 400
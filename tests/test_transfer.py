@@ -0,0 +1,80 @@
+import pytest
+
+import core
+import search
+import transfer
+
+MEMBER = {"name": "Sam Park", "birthday": "1990-05-01", "height": 180, "weight": 80.5, "activity_level": 5,
+          "goal": "Flexibility", "trainer_id": 3}
+
+
+def test_integral_floats_fill_integer_columns():
+    record = dict(MEMBER, height=180.0, activity_level=5.0, trainer_id=3.0)
+    assert transfer.parse_member(record) == ("Sam Park", "1990-05-01", 180, 80.5, 5, "Flexibility", 3, None)
+    assert transfer.parse_member(dict(MEMBER, height="180.0"))[2] == 180
+    assert transfer.parse_progress({"member_id": 7.0, "date": "2024-01-01", "weight": 80, "bmi": 24.7})[0] == 7
+
+
+@pytest.mark.parametrize("height", [180.5, "180.5", "tall", "nan", "inf"])
+def test_other_values_are_rejected(height):
+    with pytest.raises(ValueError, match="height must be an integer"):
+        transfer.parse_member(dict(MEMBER, height=height))
+
+
+@pytest.mark.parametrize("field", ["weight", "bmi"])
+@pytest.mark.parametrize("value", [float("nan"), "nan", "NaN", float("inf"), "-inf"])
+def test_non_finite_measurements_are_rejected(field, value):
+    record = dict({"member_id": 1, "date": "2024-01-01", "weight": 80, "bmi": 24.7}, **{field: value})
+    with pytest.raises(ValueError, match=f"{field} must be a number"):
+        transfer.parse_progress(record)
+    if field == "weight":
+        with pytest.raises(ValueError, match="weight must be a number"):
+            transfer.parse_member(dict(MEMBER, weight=value))
+
+
+def test_integral_float_day_mask():
+    record = {"name": "Pat Lee", "expertise": "Yoga", "available_days": 9.0}
+    assert transfer.parse_trainer(record)[2] == 9
+
+
+def test_export_import_keeps_ids_in_a_populated_database(tmp_path):
+    source = core.open_database(":memory:")
+    with source.transaction() as conn:
+        conn.execute("INSERT INTO trainers (trainer_id, name, expertise, available_days) VALUES (3, 'Pat Lee', 'Yoga', 9)")
+        conn.executemany("INSERT INTO members (member_id, name, birthday, height, weight, activity_level, goal, "
+                         "trainer_id) VALUES (?, ?, '1990-01-01', 170, 70, 5, 'Stress Relief', 3)",
+                         [(2, "Ann Low"), (5, "Bo High")])
+        conn.executemany("INSERT INTO progress (member_id, date, weight, bmi) VALUES (?, '2024-01-01', ?, 24)",
+                         [(2, 69.0), (5, 71.0)])
+    for table in ("trainers", "members", "progress"):
+        core.export_file(source, table, str(tmp_path / f"{table}.csv"))
+
+    # The target already holds other trainers and members, some with higher ids
+    target = core.open_database(":memory:")
+    with target.transaction() as conn:
+        conn.executemany("INSERT INTO trainers (trainer_id, name, expertise, available_days) VALUES (?, 'Kim Cho', "
+                         "'Yoga', 1)", [(1,), (4,)])
+        conn.executemany("INSERT INTO members (member_id, name, goal) VALUES (?, ?, 'Mindfulness')",
+                         [(1, "Old One"), (4, "Old Four"), (6, "Old Six")])
+    for table in ("trainers", "members", "progress"):
+        report = core.import_file(target, table, str(tmp_path / f"{table}.csv"))
+        assert report.rejected == 0
+
+    assert target.query("SELECT member_id, name, trainer_id FROM members WHERE member_id = 2") == [(2, "Ann Low", 3)]
+    assert target.query("SELECT member_id, weight FROM progress ORDER BY member_id") == [(2, 69.0), (5, 71.0)]
+    # Member 2 was inserted below the highest existing id and must still be searchable
+    assert search.search(target.connection, "ann") == [(2, "Ann Low")]
+    target.connection.execute("INSERT INTO member_search (member_search) VALUES ('integrity-check')")
+
+    # Importing the same members again would duplicate them under their old ids
+    again = core.import_file(target, "members", str(tmp_path / "members.csv"))
+    assert (again.rows, again.errors) == (0, ["line 2: member 2 already exists", "line 3: member 5 already exists"])
+
+
+def test_ids_repeated_within_a_file_are_refused(tmp_path):
+    path = tmp_path / "trainers.csv"
+    path.write_text("trainer_id,name,expertise,available_days\n7,Pat Lee,Yoga,1\n7,Kim Cho,Yoga,2\n,Lou Kay,Yoga,4\n")
+    db = core.open_database(":memory:")
+    report = core.import_file(db, "trainers", str(path))
+    assert (report.rows, report.errors) == (2, ["line 3: trainer 7 already exists"])
+    assert db.query("SELECT trainer_id, name FROM trainers ORDER BY trainer_id") == [(7, "Pat Lee"), (8, "Lou Kay")]
@@ -0,0 +1,341 @@
+import csv
+import itertools
+import json
+import math
+import os
+import time
+from datetime import date
+
+import core
+import search
+
+# Streaming CSV / JSON-lines import and export for the trainers, members and progress tables.
+# Files are read and written a chunk at a time, so memory use depends on chunk_size only.
+# An import runs in one transaction: it is either applied completely or, when cancelled or in
+# strict mode on the first bad row, not at all. Imported trainers and members keep the ids they
+# were exported with, so the members and progress files of one export still refer to them; rows
+# without an id are numbered by SQLite, and rows whose id is already taken are refused.
+
+CHUNK_SIZE = 50_000
+MAX_ERRORS = 100  # invalid rows described in a report; all of them are counted
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+INSERT_PROGRESS = f"INSERT INTO progress ({core.PROGRESS_COLUMNS}) VALUES (?, ?, ?, ?)"
+# With the row's own id first; a NULL id is assigned by SQLite
+INSERT_TRAINER = f"INSERT INTO trainers ({core.TRAINER_COLUMNS}) VALUES (?, ?, ?, ?)"
+INSERT_MEMBER = f"INSERT INTO members ({core.MEMBER_COLUMNS}) VALUES ({', '.join(['?'] * 11)})"
+EXISTING_MEMBERS = "SELECT member_id FROM members WHERE member_id IN (SELECT value FROM json_each(?))"
+EXISTING_TRAINERS = "SELECT trainer_id FROM trainers WHERE trainer_id IN (SELECT value FROM json_each(?))"
+
+
+class TransferReport:
+    def __init__(self, table, rows, seconds, rejected=0, errors=()):
+        self.table = table
+        self.rows = rows
+        self.seconds = seconds
+        self.rejected = rejected
+        self.errors = list(errors)  # "line N: message" for the first MAX_ERRORS invalid rows
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else float('inf')
+
+    def __str__(self):
+        text = f"{self.rows} {self.table} rows in {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/s)"
+        if self.rejected:
+            text += f", {self.rejected} rejected"
+        return text
+
+
+def file_format(path, fmt=None):
+    fmt = fmt or FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt not in FORMATS.values():
+        raise core.GymError(f"Unknown file format for {os.path.basename(path)}; use .csv or .jsonl.")
+    return fmt
+
+
+def table_for_path(path):
+    # "members.csv", "progress-2024.jsonl" -> the table named at the start of the file name
+    stem = os.path.basename(path).lower()
+    for table in core.EXPORT_TABLES:
+        if stem.startswith(table):
+            return table
+    raise core.GymError(f"Cannot tell which table {os.path.basename(path)} belongs to; "
+                        f"start the file name with one of: {', '.join(core.EXPORT_TABLES)}.")
+
+
+# Reading
+
+class _CountingLines:
+    # Iterates a text file line by line, keeping count of the characters consumed for progress
+    def __init__(self, f):
+        self.f = f
+        self.consumed = 0
+
+    def __iter__(self):
+        for line in self.f:
+            self.consumed += len(line)
+            yield line
+
+
+def read_records(lines, fmt):
+    # Yields (line number, dict or None); None marks a line that is not a JSON object
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield number, record if isinstance(record, dict) else None
+
+
+# Validation: each parser turns one record into a row tuple or raises ValueError with the reason
+
+def _text(record, key):
+    value = record.get(key)
+    if value is None or not str(value).strip():
+        raise ValueError(f"missing {key}")
+    return str(value).strip()
+
+
+def _whole(text):
+    # "170.0" -> 170: many JSON and CSV writers give integer columns a fractional part; None otherwise
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    return int(value) if value.is_integer() else None
+
+
+def _number(record, key, kind, low=None, high=None):
+    text = _text(record, key)
+    try:
+        value = kind(text)
+    except ValueError:
+        value = _whole(text) if kind is int else None
+    if value is None or not math.isfinite(value):
+        raise ValueError(f"{key} must be {'an integer' if kind is int else 'a number'}, not {text!r}")
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise ValueError(f"{key} {value} is out of range")
+    return value
+
+
+def _date(record, key):
+    text = _text(record, key)
+    try:
+        return date.fromisoformat(text).isoformat()
+    except ValueError:
+        raise ValueError(f"{key} must be a YYYY-MM-DD date, not {text!r}")
+
+
+def _available_days(record):
+    # A bitmask, or day names as exported by older versions ("Monday, Thursday")
+    value = record.get("available_days", record.get("available_weeks"))
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, int) or (isinstance(value, str) and value.strip().isdigit()):
+        mask = int(value)
+        if not 0 < mask < 1 << len(core.WEEKDAYS):
+            raise ValueError(f"available_days {mask} is not a weekday mask")
+        return mask
+    days = [day.strip() for day in str(value or "").replace(";", ",").split(",") if day.strip()]
+    if not days:
+        raise ValueError("missing available_days")
+    try:
+        return core.days_mask(days)
+    except core.GymError as e:
+        raise ValueError(str(e))
+
+
+def parse_trainer(record):
+    expertise = _text(record, "expertise")
+    if expertise not in core.GOAL_OPTIONS:
+        raise ValueError(f"unknown expertise {expertise!r}")
+    return _text(record, "name"), expertise, _available_days(record)
+
+
+def parse_member(record):
+    # (name, birthday, height, weight, activity_level, goal, trainer_id or None, expertise or None);
+    # with neither a trainer nor an expertise the member is imported unassigned
+    goal = _text(record, "goal")
+    if goal not in core.NUTRITION_COEFFICIENTS:
+        raise ValueError(f"unknown goal {goal!r}")
+    trainer_id = _number(record, "trainer_id", int, 1) if str(record.get("trainer_id") or "").strip() else None
+    expertise = None
+    if trainer_id is None and str(record.get("expertise") or "").strip():
+        expertise = _text(record, "expertise")
+        if goal not in core.GOAL_OPTIONS.get(expertise, ()):
+            raise ValueError(f"goal {goal!r} is not offered by expertise {expertise!r}")
+    return (_text(record, "name"), _date(record, "birthday"), _number(record, "height", int, 50, 275),
+            _number(record, "weight", float, 20, 500), _number(record, "activity_level", int, 1, 10),
+            goal, trainer_id, expertise)
+
+
+def parse_progress(record):
+    return (_number(record, "member_id", int, 1), _date(record, "date"),
+            _number(record, "weight", float, 20, 500), _number(record, "bmi", float, 5, 150))
+
+
+def _with_id(parse, key):
+    # Import parser: the row's own id from an export (None when the file has none), then parse(record)
+    def parse_with_id(record):
+        row_id = _number(record, key, int, 1) if str(record.get(key) or "").strip() else None
+        return (row_id, *parse(record))
+    return parse_with_id
+
+
+PARSERS = {"trainers": _with_id(parse_trainer, "trainer_id"), "members": _with_id(parse_member, "member_id"),
+           "progress": parse_progress}
+
+
+class _Importer:
+    def __init__(self, conn, table, strict):
+        self.conn = conn
+        self.table = table
+        self.strict = strict
+        self.rows = 0
+        self.rejected = 0
+        self.errors = []
+        self.trainer_cycle = None
+
+    def reject(self, number, message):
+        if self.strict:
+            raise core.GymError(f"line {number}: {message}")
+        self.rejected += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(f"line {number}: {message}")
+
+    def parse(self, chunk):
+        parse = PARSERS[self.table]
+        parsed = []
+        for number, record in chunk:
+            if record is None:
+                self.reject(number, "not a JSON object")
+                continue
+            try:
+                parsed.append((number, parse(record)))
+            except ValueError as e:
+                self.reject(number, str(e))
+        return parsed
+
+    def existing(self, sql, ids):
+        return {row[0] for row in self.conn.execute(sql, (json.dumps(sorted(set(ids))),))}
+
+    def check_ids(self, sql, parsed, kind):
+        # Drops rows whose id is taken, in the database (earlier chunks included) or earlier in this chunk
+        taken = self.existing(sql, [row[0] for _, row in parsed if row[0] is not None])
+        kept = []
+        for number, row in parsed:
+            if row[0] is not None:
+                if row[0] in taken:
+                    self.reject(number, f"{kind} {row[0]} already exists")
+                    continue
+                taken.add(row[0])
+            kept.append((number, row))
+        return kept
+
+    def resolve_trainers(self, parsed):
+        # Explicit trainer ids must exist; members given an expertise go round-robin to its trainers
+        if self.trainer_cycle is None:
+            by_expertise = {}
+            for expertise, trainer_id in self.conn.execute("SELECT expertise, trainer_id FROM trainers ORDER BY trainer_id"):
+                by_expertise.setdefault(expertise, []).append(trainer_id)
+            self.trainer_cycle = {expertise: itertools.cycle(ids) for expertise, ids in by_expertise.items()}
+        known = self.existing(EXISTING_TRAINERS, [row[-2] for _, row in parsed if row[-2] is not None])
+
+        rows = []
+        for number, (member_id, *member, trainer_id, expertise) in parsed:
+            if expertise is not None:
+                if expertise not in self.trainer_cycle:
+                    self.reject(number, f"no trainer available with expertise {expertise!r}")
+                    continue
+                trainer_id = next(self.trainer_cycle[expertise])
+            elif trainer_id is not None and trainer_id not in known:
+                self.reject(number, f"trainer {trainer_id} does not exist")
+                continue
+            name, birthday, height, weight, activity_level, goal = member
+            rows.append((member_id, name, birthday, height, weight, activity_level, goal,
+                         *core.nutrition_needs(goal, weight), trainer_id))
+        return rows
+
+    def check_members(self, parsed):
+        known = self.existing(EXISTING_MEMBERS, [row[0] for _, row in parsed])
+        rows = []
+        for number, row in parsed:
+            if row[0] in known:
+                rows.append(row)
+            else:
+                self.reject(number, f"member {row[0]} does not exist")
+        return rows
+
+    def insert(self, chunk):
+        parsed = self.parse(chunk)
+        if self.table == "trainers":
+            sql, rows = INSERT_TRAINER, [row for _, row in self.check_ids(EXISTING_TRAINERS, parsed, "trainer")]
+        elif self.table == "members":
+            sql, rows = INSERT_MEMBER, self.resolve_trainers(self.check_ids(EXISTING_MEMBERS, parsed, "member"))
+        else:
+            sql, rows = INSERT_PROGRESS, self.check_members(parsed)
+        if self.table == "members":
+            with search.deferred_indexing(self.conn) as last_id:
+                self.conn.executemany(sql, rows)
+                # Ids below the old maximum fill gaps, which the deferred pass above last_id misses
+                search.index_members(self.conn, [row[0] for row in rows if row[0] is not None and row[0] <= last_id])
+        else:
+            self.conn.executemany(sql, rows)
+        self.rows += len(rows)
+
+
+def import_file(conn, table, path, fmt=None, strict=False, chunk_size=CHUNK_SIZE, progress=None, on_written=None):
+    # Returns a TransferReport; progress is reported in characters read out of the file size
+    start = time.perf_counter()
+    fmt = file_format(path, fmt)
+    total = os.path.getsize(path)
+    importer = _Importer(conn, table, strict)
+    with open(path, newline='', encoding='utf-8') as f, conn:
+        lines = _CountingLines(f)
+        records = read_records(lines, fmt)
+        while True:
+            chunk = list(itertools.islice(records, chunk_size))
+            if not chunk:
+                break
+            importer.insert(chunk)
+            if progress:
+                progress(min(lines.consumed, total), total)
+    if on_written and table == "progress":
+        on_written(None)
+    return TransferReport(table, importer.rows, time.perf_counter() - start, importer.rejected, importer.errors)
+
+
+# Writing
+
+def export_file(conn, table, out, fmt, batch_size=CHUNK_SIZE, progress=None):
+    # Writes the table to an open text file one fetchmany batch at a time; returns a TransferReport
+    start = time.perf_counter()
+    columns = [column.strip() for column in core.EXPORT_TABLES[table].split(",")]
+    total = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] if progress else None
+    cursor = conn.execute(f"SELECT {', '.join(columns)} FROM {table}")
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(columns)
+        write = writer.writerows
+    else:
+        def write(rows):
+            out.writelines(json.dumps(dict(zip(columns, row))) + "\n" for row in rows)
+
+    rows = 0
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            break
+        if progress:
+            progress(rows, total)
+        write(batch)
+        rows += len(batch)
+    return TransferReport(table, rows, time.perf_counter() - start)